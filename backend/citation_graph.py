@@ -0,0 +1,180 @@
+"""
+Opinion-to-opinion citation graph over metadata rows.
+
+Edges come from both sides of every record: an opinion's prior_opinions
+(where the cited id resolves to a row) and the cited_by lists of the opinions
+it cites. They are deduplicated and kept twice in CSR form, as int32 arrays:
+
+    forward  row → rows it cites        (indptr[row]:indptr[row + 1])
+    reverse  row → rows citing it
+
+Traversals work a whole BFS frontier at a time with NumPy gathers, so even
+multi-hop expansions over the full corpus (~14K rows, ~10K edges) take
+milliseconds. pagerank() scores how foundational each opinion is; the
+search index stores it as an offline ranking prior.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+def _csr(n_rows: int, sources: np.ndarray, targets: np.ndarray,
+         ) -> tuple[np.ndarray, np.ndarray]:
+    """indptr/indices of edges sorted by (source, target)."""
+    order = np.lexsort((targets, sources))
+    indptr = np.zeros(n_rows + 1, dtype=np.int32)
+    np.cumsum(np.bincount(sources, minlength=n_rows), out=indptr[1:])
+    return indptr, targets[order].astype(np.int32)
+
+
+def _gather(indptr: np.ndarray, indices: np.ndarray,
+            frontier: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(neighbor, frontier row it was reached from) for every edge of frontier."""
+    starts = indptr[frontier].astype(np.int64)
+    counts = indptr[frontier + 1] - starts
+    total = int(counts.sum())
+    if not total:
+        empty = np.empty(0, dtype=np.int32)
+        return empty, empty
+    # Edge positions: start of each row's run plus the offset inside it
+    run_starts = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    positions = run_starts + np.arange(total)
+    return indices[positions], np.repeat(frontier, counts).astype(np.int32)
+
+
+class CitationGraph:
+    """Forward and reverse CSR adjacency of the citation edges."""
+
+    def __init__(self, fwd_indptr: np.ndarray, fwd_indices: np.ndarray,
+                 rev_indptr: np.ndarray, rev_indices: np.ndarray):
+        self.fwd_indptr = fwd_indptr
+        self.fwd_indices = fwd_indices
+        self.rev_indptr = rev_indptr
+        self.rev_indices = rev_indices
+
+    @classmethod
+    def from_edges(cls, n_rows: int, sources: np.ndarray,
+                   targets: np.ndarray) -> CitationGraph:
+        """Build from parallel source → target row arrays (-1 = unresolved)."""
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        keep = (sources >= 0) & (targets >= 0) & (sources != targets)
+        edges = np.unique(sources[keep] * max(n_rows, 1) + targets[keep])
+        sources, targets = np.divmod(edges, max(n_rows, 1))
+        return cls(*_csr(n_rows, sources, targets), *_csr(n_rows, targets, sources))
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.fwd_indptr) - 1
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.fwd_indices)
+
+    @property
+    def nbytes(self) -> int:
+        return (self.fwd_indptr.nbytes + self.fwd_indices.nbytes
+                + self.rev_indptr.nbytes + self.rev_indices.nbytes)
+
+    def in_degree(self) -> np.ndarray:
+        """Times each row is cited."""
+        return np.diff(self.rev_indptr)
+
+    def cites(self, row: int) -> np.ndarray:
+        return self.fwd_indices[self.fwd_indptr[row]:self.fwd_indptr[row + 1]]
+
+    def cited_by(self, row: int) -> np.ndarray:
+        return self.rev_indices[self.rev_indptr[row]:self.rev_indptr[row + 1]]
+
+    def _step(self, frontier: np.ndarray,
+              direction: str) -> tuple[np.ndarray, np.ndarray]:
+        if direction == "cites":
+            return _gather(self.fwd_indptr, self.fwd_indices, frontier)
+        if direction == "cited_by":
+            return _gather(self.rev_indptr, self.rev_indices, frontier)
+        if direction == "both":
+            fwd, fwd_from = _gather(self.fwd_indptr, self.fwd_indices, frontier)
+            rev, rev_from = _gather(self.rev_indptr, self.rev_indices, frontier)
+            return np.concatenate([fwd, rev]), np.concatenate([fwd_from, rev_from])
+        raise ValueError(f"Unknown direction: {direction!r}")
+
+    def neighborhood(self, rows: list[int] | np.ndarray, hops: int,
+                     direction: str = "both") -> tuple[np.ndarray, np.ndarray]:
+        """Rows within `hops` edges of the seed rows, with their hop distance.
+
+        Seeds themselves are excluded. Ordered by distance, then most cited.
+        """
+        dist = np.full(self.n_rows, -1, dtype=np.int32)
+        frontier = np.unique(np.asarray(rows, dtype=np.int32))
+        dist[frontier] = 0
+        for hop in range(1, hops + 1):
+            if not len(frontier):
+                break
+            reached, _ = self._step(frontier, direction)
+            frontier = np.unique(reached[dist[reached] < 0])
+            dist[frontier] = hop
+        found = np.flatnonzero(dist > 0)
+        order = np.lexsort((found, -self.in_degree()[found], dist[found]))
+        return found[order], dist[found[order]]
+
+    def shortest_path(self, source: int, target: int, direction: str = "both",
+                      max_hops: int = 6) -> list[int] | None:
+        """Rows of a shortest source → target path (inclusive), or None."""
+        if source == target:
+            return [source]
+        parent = np.full(self.n_rows, -1, dtype=np.int32)
+        parent[source] = source
+        frontier = np.array([source], dtype=np.int32)
+        for _ in range(max_hops):
+            reached, reached_from = self._step(frontier, direction)
+            new = parent[reached] < 0
+            reached, reached_from = reached[new], reached_from[new]
+            if not len(reached):
+                return None
+            # First edge into each new row wins
+            frontier, first = np.unique(reached, return_index=True)
+            parent[frontier] = reached_from[first]
+            if parent[target] >= 0:
+                path = [target]
+                while path[-1] != source:
+                    path.append(int(parent[path[-1]]))
+                return path[::-1]
+        return None
+
+    def co_cited(self, row: int) -> tuple[np.ndarray, np.ndarray]:
+        """Rows cited alongside `row`, with how many opinions cite both.
+
+        Ordered by count (descending), then row.
+        """
+        citing = self.cited_by(row)
+        together, _ = _gather(self.fwd_indptr, self.fwd_indices, citing)
+        counts = np.bincount(together, minlength=self.n_rows)
+        counts[row] = 0
+        found = np.flatnonzero(counts)
+        order = np.lexsort((found, -counts[found]))
+        return found[order], counts[found[order]]
+
+    def pagerank(self, damping: float = 0.85, tol: float = 1e-10,
+                 max_iter: int = 200) -> np.ndarray:
+        """PageRank of every row (sums to 1), authority flowing to cited rows.
+
+        Rows that cite nothing spread their rank uniformly.
+        """
+        n = self.n_rows
+        if not n:
+            return np.empty(0, dtype=np.float64)
+        out_degree = np.diff(self.fwd_indptr)
+        sources = np.repeat(np.arange(n), out_degree)
+        share = 1.0 / out_degree[sources]
+        dangling = out_degree == 0
+        rank = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            flow = np.bincount(self.fwd_indices, weights=rank[sources] * share,
+                               minlength=n)
+            new = damping * (flow + rank[dangling].sum() / n) + (1 - damping) / n
+            delta = np.abs(new - rank).sum()
+            rank = new
+            if delta < tol:
+                break
+        return rank
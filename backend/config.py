@@ -9,6 +9,27 @@ class Settings(BaseSettings):
     openai_api_key: str = ""
     r2_pdf_base_url: str = ""
     r2_index_base_url: str = ""
+    workers: int = 1
+    embedding_provider: str = "openai"  # openai | http | hash
+    embedding_model: str = ""  # empty: the model the index was built with
+    embedding_base_url: str = ""  # OpenAI-compatible endpoint for "http"
+    embedding_batch_window_ms: float = 0.0  # >0 coalesces concurrent queries
+    embedding_timeout_s: float = 5.0  # async path falls back to BM25 after this
+    result_cache_size: int = 1024  # ranked result lists kept per worker
+    result_cache_ttl_s: float = 600.0
+    search_threads: int = 0  # scoring thread pool size; 0 = one per core (max 32)
+    authority_weight: float = 0.0  # citation-authority prior in fused rankings; 0 = off
+    # Rank citation-only queries from the citation postings even when fusion
+    # is available (it always is used when no query embedding can be had)
+    citation_fast_path: bool = False
+    embedding_cache_size: int = 2048
+    embedding_cache_path: str = ""  # SQLite file; empty keeps the cache in memory
+    detail_cache_bytes: int = 64 * 2**20  # rendered opinion details per worker
+    corpus_store_build: bool = True  # (re)build indexes/corpus at startup when stale
+    # Cache-Control per route; responses also carry data-versioned ETags
+    cache_control_filters: str = "public, max-age=3600"
+    cache_control_opinions: str = "public, max-age=3600"
+    cache_control_search: str = "public, max-age=300"
 
     model_config = {
         "env_file": ".env",
@@ -0,0 +1,273 @@
+"""
+Packed, memory-mapped store of the opinion records served by the detail APIs.
+
+Each extracted JSON file carries the full text and an embedding blob next to
+the handful of sections the API returns. The store keeps only the served
+fields (see SERVED_FIELDS) of every opinion, each record zlib-compressed JSON,
+in one segment array, plus a sorted id table and record offsets:
+
+    manifest.json                 format/version, counts, per-array sha256,
+                                  and data_version: the metadata version of
+                                  the files it was built from
+    opinion_ids.{blob,offsets}    sorted opinion ids (bisected in place)
+    record_offsets                int64; record i is records[off[i]:off[i+1]]
+    records                       uint8 segment of compressed records
+
+It is written with the search index's IndexWriter, so arrays are mapped with
+np.load(mmap_mode="r") and a lookup touches only the pages of one record.
+read_opinion() falls back to the JSON file when no store is built or an id
+is missing from it. A store built from other data (its data_version differs
+from the loaded metadata's) is not opened. The server builds a missing or
+stale store at startup (ensure_corpus_store(), settings.corpus_store_build);
+until then every read uses the JSON files.
+
+Usage: python -m backend.corpus build    (from project root)
+       python -m backend.corpus verify
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import sys
+import time
+import zlib
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+
+from backend.config import settings
+from backend.metadata import (
+    _DATA_DIR, _PROJECT_ROOT, file_fingerprints, fingerprints_version, record_id,
+)
+from backend.search.index_format import (
+    MANIFEST, IndexWriter, StringTable, verify_index,
+)
+
+logger = logging.getLogger(__name__)
+
+_CORPUS_DIR = os.path.join(_PROJECT_ROOT, "indexes", "corpus")
+
+FORMAT_NAME = "fppc-corpus-store"
+FORMAT_VERSION = 1
+
+# Top-level key → sub-keys kept (None keeps the whole value)
+SERVED_FIELDS: dict[str, tuple[str, ...] | None] = {
+    "id": None,
+    "year": None,
+    "local_pdf_path": None,
+    "pdf_url": None,
+    "parsed": ("date", "document_type", "requestor_name", "requestor_title",
+               "requestor_city"),
+    "sections": ("question", "question_synthetic", "conclusion",
+                 "conclusion_synthetic", "facts", "analysis",
+                 "has_standard_format"),
+    "citations": ("government_code", "regulations", "prior_opinions",
+                  "cited_by"),
+    "classification": ("topic_primary", "topic_secondary", "topic_tags"),
+    "extraction": ("page_count", "word_count"),
+}
+
+
+def project(data: dict) -> dict:
+    """The served subset of an extracted opinion record."""
+    out = {}
+    for key, sub_keys in SERVED_FIELDS.items():
+        if key not in data:
+            continue
+        value = data[key]
+        if sub_keys is not None and isinstance(value, dict):
+            value = {k: value[k] for k in sub_keys if k in value}
+        out[key] = value
+    return out
+
+
+class CorpusStore:
+    """Read-only opinion id → served record lookups over a mapped segment."""
+
+    def __init__(self, path: str, manifest: dict, ids: StringTable,
+                 offsets: np.ndarray, records: np.ndarray):
+        self.path = path
+        self.manifest = manifest
+        self._ids = ids
+        self._offsets = offsets
+        self._records = records
+
+    @property
+    def version(self) -> str:
+        return self.manifest["index_id"]
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, opinion_id: object) -> bool:
+        return isinstance(opinion_id, str) and self._ids.get(opinion_id) is not None
+
+    def get(self, opinion_id: str) -> dict | None:
+        """The served record, or None if the id is not in the store."""
+        i = self._ids.get(opinion_id)
+        if i is None:
+            return None
+        raw = self._records[self._offsets[i]:self._offsets[i + 1]].tobytes()
+        try:
+            return json.loads(zlib.decompress(raw))
+        except zlib.error as e:
+            raise ValueError(f"Corrupt corpus record for {opinion_id}") from e
+
+
+def open_corpus_store(path: str = _CORPUS_DIR,
+                      data_version: str | None = None) -> CorpusStore | None:
+    """Map a store written by build_corpus_store(); None if none is built.
+
+    With a data_version (MetadataIndex.version), a store built from other
+    data is refused with a warning and None is returned.
+    """
+    manifest_path = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+    if (manifest.get("format") != FORMAT_NAME
+            or manifest.get("version") != FORMAT_VERSION):
+        raise ValueError(f"Not a {FORMAT_NAME} v{FORMAT_VERSION} directory: {path}")
+    if data_version is not None and manifest.get("data_version") != data_version:
+        logger.warning("Corpus store in %s was built from other data (%s, "
+                       "loaded %s); reading JSON files until it is rebuilt",
+                       path, manifest.get("data_version"), data_version)
+        return None
+
+    def arr(name: str) -> np.ndarray:
+        return np.asarray(np.load(
+            os.path.join(path, manifest["arrays"][name]["file"]), mmap_mode="r"))
+
+    return CorpusStore(
+        path, manifest,
+        StringTable(arr("opinion_ids_blob"), arr("opinion_ids_offsets")),
+        arr("record_offsets"), arr("records"),
+    )
+
+
+def ensure_corpus_store(data_version: str, data_dir: str = _DATA_DIR,
+                        path: str = _CORPUS_DIR) -> CorpusStore | None:
+    """open_corpus_store(), first (re)building a missing or stale store.
+
+    Workers started side by side take a lock, so the first builds and the
+    rest open its store (as the search index conversion does). A failed
+    build is logged and leaves reads on the JSON files.
+    """
+    if data_version and settings.corpus_store_build and _stale(path, data_version):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".lock", "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    if _stale(path, data_version):
+                        t0 = time.time()
+                        logger.info("Building corpus store in %s...", path)
+                        manifest = build_corpus_store(opinion_files(data_dir), path)
+                        logger.info("Corpus store built in %.1fs: %d opinions",
+                                    time.time() - t0, manifest["n_opinions"])
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+        except (OSError, ValueError) as e:
+            logger.warning("Could not build corpus store in %s: %s", path, e)
+    return open_corpus_store(path, data_version)
+
+
+def _stale(path: str, data_version: str) -> bool:
+    try:
+        with open(os.path.join(path, MANIFEST), "r") as f:
+            return json.load(f).get("data_version") != data_version
+    except (OSError, ValueError):
+        return True
+
+
+def read_opinion(opinion_id: str, meta: dict, corpus: CorpusStore | None) -> dict:
+    """Served record for an opinion: from the store, else its JSON file.
+
+    Raises OSError or ValueError when the record cannot be read.
+    """
+    if corpus is not None:
+        data = corpus.get(opinion_id)
+        if data is not None:
+            return data
+    with open(meta["file_path"], "r") as f:
+        return json.load(f)
+
+
+def opinion_files(data_dir: str = _DATA_DIR) -> Iterator[str]:
+    """data/extracted/{year}/*.json in year, then filename order."""
+    for year_dir in sorted(os.listdir(data_dir)):
+        year_path = os.path.join(data_dir, year_dir)
+        if not os.path.isdir(year_path):
+            continue
+        for filename in sorted(os.listdir(year_path)):
+            if filename.endswith(".json"):
+                yield os.path.join(year_path, filename)
+
+
+def build_corpus_store(files: Iterable[str], out_dir: str = _CORPUS_DIR) -> dict:
+    """Pack the served fields of every file into a store at out_dir.
+
+    Ids resolve like the metadata index (metadata.record_id); a later file
+    with the same id replaces an earlier one. The manifest records the
+    files' data_version, checked by open_corpus_store().
+    """
+    files = list(files)
+    fingerprints = file_fingerprints(files)
+    records: dict[str, bytes] = {}
+    source_bytes = 0
+    for file_path in files:
+        try:
+            with open(file_path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            logger.warning("Skipping malformed file: %s", file_path)
+            continue
+        source_bytes += os.path.getsize(file_path)
+        opinion_id = record_id(data, file_path)
+        if not opinion_id:
+            continue  # "id": null: not servable (see metadata.record_id)
+        encoded = json.dumps(project(data), separators=(",", ":"))
+        records[opinion_id] = zlib.compress(encoded.encode("utf-8"), 6)
+
+    ids = sorted(records, key=lambda k: k.encode("utf-8"))
+    offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+    np.cumsum([len(records[oid]) for oid in ids], out=offsets[1:])
+    segment = np.frombuffer(b"".join(records[oid] for oid in ids), dtype=np.uint8)
+
+    writer = IndexWriter(out_dir, FORMAT_NAME, FORMAT_VERSION)
+    try:
+        writer.add_strings("opinion_ids", ids)
+        writer.add_array("record_offsets", offsets)
+        writer.add_array("records", segment)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.commit(n_opinions=len(ids), source_bytes=source_bytes,
+                         segment_bytes=int(offsets[-1]),
+                         data_version=fingerprints_version(fingerprints))
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "build":
+        t0 = time.time()
+        manifest = build_corpus_store(opinion_files())
+        print(f"Wrote {_CORPUS_DIR} ({manifest['n_opinions']} opinions, "
+              f"{manifest['source_bytes'] / 2**20:.0f} MB of JSON → "
+              f"{manifest['segment_bytes'] / 2**20:.1f} MB segment) "
+              f"in {time.time() - t0:.1f}s")
+    elif command == "verify":
+        bad = verify_index(_CORPUS_DIR)
+        print("OK" if not bad else f"Checksum mismatch: {', '.join(bad)}")
+        sys.exit(1 if bad else 0)
+    else:
+        print(__doc__)
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
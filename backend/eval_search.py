@@ -0,0 +1,425 @@
+"""
+Eval checks for search engine optimizations, run against the queries in
+eval/dataset.json.
+
+Usage: python -m backend.eval_search <check>   (from project root)
+
+    bm25  Compare the memory-mapped index's BM25 rankings and latency against
+          the pickled rank_bm25 BM25Okapi index.
+    topk  Compare top_k() against a full score + argsort at the depths the
+          engine uses.
+    quantized
+          Fused-ranking drift of the int8 embedding store (with and without
+          full-precision rescoring) against exact float32 similarities.
+    fused Latency/throughput of the fused citation path through the
+          configured embedding provider (EMBEDDING_PROVIDER=hash or http for
+          offline runs), serially and with concurrent queries.
+    batch Throughput of search_many() over every dataset query against
+          sequential search_ranked() calls, and ranking agreement.
+    prior nDCG@20 of the fused citation path at several citation-authority
+          prior weights, and the prior's cost per fusion (needs the index's
+          authority array: python -m backend.search.index_format authority).
+    citation
+          Citation-only forms of the dataset's citation queries ("Section
+          87103(a)"): nDCG@20 and latency of the citation-postings fast path
+          at several recency weights, against the general BM25/fusion path.
+"""
+
+import json
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Ensure project root is on sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.config import settings
+from backend.metadata import build_metadata_index
+from backend.search.engine import (
+    _BM25_INDEX,
+    _INDEX_DIR,
+    _PROJECT_ROOT,
+    _SEM_RESCORE,
+    CitationScoreFusion,
+    _FusionPool,
+)
+from backend.search.embedders import HashEmbedder, MicroBatcher
+from backend.search.embedding_cache import EmbeddingCache
+from backend.search.result_cache import ResultCache
+from backend.search.index_format import open_index
+from backend.search.utils import citation_only, parse_query_citations, tokenize
+
+_DATASET = os.path.join(_PROJECT_ROOT, "eval", "dataset.json")
+_DEPTH = 200  # ranking depth compared (matches the API over-fetch)
+
+
+def _load_queries() -> list[str]:
+    return [q["text"] for q in _load_dataset()]
+
+
+def _load_dataset() -> list[dict]:
+    with open(_DATASET, "r") as f:
+        return json.load(f)["queries"]
+
+
+def _ndcg(ranked: list[str], judgments: list[dict], k: int = 20) -> float:
+    gains = {j["opinion_id"]: j["score"] for j in judgments}
+    dcg = sum(gains.get(oid, 0) / np.log2(i + 2) for i, oid in enumerate(ranked[:k]))
+    ideal = sorted(gains.values(), reverse=True)[:k]
+    idcg = sum(g / np.log2(i + 2) for i, g in enumerate(ideal))
+    return dcg / idcg if idcg else 0.0
+
+
+def _citation_queries() -> list[dict]:
+    return [
+        q for q in _load_dataset()
+        if any(parse_query_citations(q["text"]).values())
+    ]
+
+
+def _query_vectors(engine: CitationScoreFusion, queries: list[dict]) -> dict:
+    """Query embeddings from OpenAI, or an offline stand-in.
+
+    Without an API key each query is represented by the normalized centroid
+    of its judged-relevant opinions' embeddings, which exercises the same
+    pool similarities the fused ranking depends on.
+    """
+    vectors = {}
+    for q in queries:
+        if settings.openai_api_key:
+            vectors[q["text"]] = engine._embed_query(q["text"])
+            continue
+        rows = [engine._id_to_row[j["opinion_id"]]
+                for j in q["relevance_judgments"]
+                if j["opinion_id"] in engine._id_to_row
+                and engine._has_embedding[engine._id_to_row[j["opinion_id"]]]]
+        vec = np.asarray(engine._embeddings.full[sorted(rows)], dtype=np.float32)
+        vec = vec.mean(axis=0) if len(rows) else np.ones(
+            engine._embeddings.codes.shape[1], dtype=np.float32)
+        vectors[q["text"]] = vec / np.linalg.norm(vec)
+    return vectors
+
+
+def eval_bm25() -> bool:
+    with open(_BM25_INDEX, "rb") as f:
+        okapi = pickle.load(f)["bm25"]
+    t0 = time.time()
+    sparse = open_index(_INDEX_DIR).bm25
+    print(f"Index opened in {time.time() - t0:.3f}s "
+          f"({len(sparse.doc_ids)} postings)\n")
+
+    mismatches = 0
+    old_total = new_total = 0.0
+    queries = _load_queries()
+    for query in queries:
+        tokens = tokenize(query)
+
+        t0 = time.perf_counter()
+        ref = okapi.get_scores(tokens)
+        old_total += time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        scores = sparse.get_scores(tokens)[:okapi.corpus_size]
+        new_total += time.perf_counter() - t0
+
+        ref_top = ref.argsort()[::-1][:_DEPTH]
+        new_top = scores.argsort()[::-1][:_DEPTH]
+        if list(ref_top) != list(new_top):
+            mismatches += 1
+            print(f"  MISMATCH: {query[:70]}")
+
+    n = len(queries)
+    print(f"Queries: {n}, ranking mismatches (top {_DEPTH}): {mismatches}")
+    print(f"BM25Okapi.get_scores: {old_total / n * 1000:.2f} ms/query")
+    print(f"SparseBM25.get_scores: {new_total / n * 1000:.2f} ms/query")
+    return mismatches == 0
+
+
+def eval_topk() -> bool:
+    sparse = open_index(_INDEX_DIR).bm25
+
+    mismatches = 0
+    queries = _load_queries()
+    for k in (20, 100, _DEPTH):
+        full_total = topk_total = 0.0
+        for query in queries:
+            tokens = tokenize(query)
+
+            t0 = time.perf_counter()
+            scores = sparse.get_scores(tokens)
+            ref = [i for i in scores.argsort()[::-1][:k] if scores[i] > 0]
+            full_total += time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            rows, top_scores = sparse.top_k(tokens, k)
+            topk_total += time.perf_counter() - t0
+
+            # argsort's tie order is unspecified, so compare the score
+            # sequence and the returned rows' own scores
+            if not (np.array_equal(scores[ref], top_scores)
+                    and np.array_equal(scores[rows], top_scores)):
+                mismatches += 1
+                print(f"  MISMATCH k={k}: {query[:70]}")
+
+        n = len(queries)
+        print(f"k={k}: get_scores+argsort {full_total / n * 1000:.2f} ms/query, "
+              f"top_k {topk_total / n * 1000:.2f} ms/query")
+
+    print(f"Mismatches: {mismatches}")
+    return mismatches == 0
+
+
+def eval_quantized() -> bool:
+    engine = CitationScoreFusion()
+    queries = _citation_queries()
+    vectors = _query_vectors(engine, queries)
+    if not settings.openai_api_key:
+        print("\nOPENAI_API_KEY not set: using judged-opinion centroids as "
+              "query vectors")
+    engine._embedder = engine._embedder or HashEmbedder(1)
+    engine._embed_query = vectors.__getitem__
+    engine._result_cache = ResultCache(capacity=0)  # variants must re-rank
+
+    def run(rescore: int) -> dict[str, list[str]]:
+        engine._sem_rescore = rescore
+        return {q["text"]: engine.search(q["text"], top_k=20) for q in queries}
+
+    exact = run(rescore=len(engine._embeddings))  # every pool row rescored
+    variants = {"int8 + rescore": run(rescore=_SEM_RESCORE),
+                "int8 only": run(rescore=0)}
+
+    full_mb = engine._embeddings.codes.size * 4 / 2**20
+    print(f"\nEmbeddings: float32 {full_mb:.1f} MB -> int8 "
+          f"{engine._embeddings.nbytes / 2**20:.1f} MB on heap")
+    print(f"Citation-path queries: {len(queries)}\n")
+
+    ok = True
+    ndcg_exact = np.mean([_ndcg(exact[q["text"]], q["relevance_judgments"])
+                          for q in queries])
+    print(f"{'variant':<16} {'identical@20':>12} {'overlap@20':>10} "
+          f"{'nDCG@20':>8}")
+    print(f"{'float32 exact':<16} {len(queries):>12} {1.0:>10.3f} "
+          f"{ndcg_exact:>8.4f}")
+    for label, ranked in variants.items():
+        identical = sum(ranked[t] == exact[t] for t in exact)
+        overlap = np.mean([
+            len(set(ranked[t]) & set(exact[t])) / max(len(exact[t]), 1)
+            for t in exact
+        ])
+        ndcg = np.mean([_ndcg(ranked[q["text"]], q["relevance_judgments"])
+                        for q in queries])
+        print(f"{label:<16} {identical:>12} {overlap:>10.3f} {ndcg:>8.4f}")
+        if label == "int8 + rescore":
+            ok = overlap >= 0.99 and abs(ndcg - ndcg_exact) < 0.005
+    return ok
+
+
+def eval_fused(concurrency: int = 8) -> bool:
+    engine = CitationScoreFusion()
+    if engine._embedder is None:
+        print("No embedding provider available (set EMBEDDING_PROVIDER=hash)")
+        return False
+    # Measure the provider and scoring, not the caches
+    engine._embedding_cache = EmbeddingCache(capacity=0)
+    engine._result_cache = ResultCache(capacity=0)
+    texts = [q["text"] for q in _citation_queries()]
+    print(f"\nProvider: {engine._embedder.model} "
+          f"({type(engine._embedder).__name__}), {len(texts)} citation queries")
+
+    t0 = time.time()
+    serial = [engine.search(t, top_k=20) for t in texts]
+    serial_s = time.time() - t0
+    print(f"serial:       {serial_s / len(texts) * 1000:.1f} ms/query")
+
+    t0 = time.time()
+    with ThreadPoolExecutor(concurrency) as pool:
+        concurrent = list(pool.map(lambda t: engine.search(t, top_k=20), texts))
+    concurrent_s = time.time() - t0
+    print(f"concurrent x{concurrency}: "
+          f"{len(texts) / concurrent_s:.1f} queries/s "
+          f"(serial {len(texts) / serial_s:.1f} queries/s)")
+    if isinstance(engine._embedder, MicroBatcher):
+        batcher = engine._embedder
+        print(f"micro-batches: {batcher.batches}, "
+              f"{batcher.batched_texts / max(batcher.batches, 1):.1f} "
+              f"queries/batch")
+
+    mismatches = sum(a != b for a, b in zip(serial, concurrent))
+    print(f"Serial/concurrent ranking mismatches: {mismatches}")
+    return mismatches == 0
+
+
+def eval_batch() -> bool:
+    engine = CitationScoreFusion()
+    engine._embedding_cache = EmbeddingCache(capacity=0)
+    engine._result_cache = ResultCache(capacity=0)
+    texts = _load_queries()
+    provider = type(engine._embedder).__name__ if engine._embedder else "none"
+    print(f"\n{len(texts)} queries, embedding provider: {provider}")
+
+    t0 = time.time()
+    sequential = [engine.search_ranked(t, top_k=_DEPTH) for t in texts]
+    sequential_s = time.time() - t0
+    t0 = time.time()
+    batched = engine.search_many(texts, top_k=_DEPTH)
+    batched_s = time.time() - t0
+    print(f"sequential: {len(texts) / sequential_s:.0f} queries/s, "
+          f"search_many: {len(texts) / batched_s:.0f} queries/s "
+          f"({sequential_s / batched_s:.1f}x)")
+
+    mismatches = sum(a.ids != b.ids or a.total != b.total
+                     for a, b in zip(sequential, batched))
+    print(f"Ranking mismatches: {mismatches}")
+    return mismatches == 0
+
+
+def eval_prior(weights: tuple[float, ...] = (0.0, 0.05, 0.1, 0.2, 0.3),
+               repeats: int = 20) -> bool:
+    engine = CitationScoreFusion(w_prior=0.0)
+    if engine._prior is None:
+        print("The index has no authority array: run "
+              "python -m backend.search.index_format authority")
+        return False
+    queries = _citation_queries()
+    vectors = _query_vectors(engine, queries)
+    if not settings.openai_api_key:
+        print("\nOPENAI_API_KEY not set: using judged-opinion centroids as "
+              "query vectors")
+    engine._embedder = engine._embedder or HashEmbedder(1)
+
+    # Candidate pools are prior-independent: retrieve once, fuse per weight
+    pools = {}
+    for q in queries:
+        pool = engine._retrieve(q["text"], 20)
+        if isinstance(pool, _FusionPool):
+            pools[q["text"]] = pool
+    fused = [q for q in queries if q["text"] in pools]
+    prior = engine._prior
+    relevant = [engine._id_to_row[j["opinion_id"]] for q in fused
+                for j in q["relevance_judgments"]
+                if j["opinion_id"] in engine._id_to_row]
+    print(f"\nCitation-path queries: {len(queries)} ({len(fused)} fused, "
+          f"the rest stop at the circuit breaker)")
+    print(f"Mean prior: corpus {prior.mean():.3f}, judged-relevant "
+          f"{prior[relevant].mean():.3f}\n")
+
+    def run(weight: float) -> tuple[dict[str, list[str]], float]:
+        engine._w_prior = weight
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            ranked = {t: engine._fuse(pool, vectors[t]).ids
+                      for t, pool in pools.items()}
+        return ranked, (time.perf_counter() - t0) / (repeats * len(pools))
+
+    run(0.0)  # warm up the mapped embedding pages
+    base, _ = run(0.0)
+    print(f"{'weight':>6} {'nDCG@20':>8} {'changed@20':>10} {'fuse ms':>8}")
+    for weight in weights:
+        ranked, fuse_s = run(weight)
+        ndcg = np.mean([_ndcg(ranked[q["text"]], q["relevance_judgments"])
+                        for q in fused])
+        changed = sum(ranked[t] != base[t] for t in base)
+        print(f"{weight:>6.2f} {ndcg:>8.4f} {changed:>10} {fuse_s * 1000:>8.3f}")
+
+    # Weight 0 must leave the rankings exactly as without a prior
+    engine._prior = None
+    unchanged = run(0.0)[0] == base
+    print(f"\nWeight 0 identical to no prior: {unchanged}")
+    return unchanged
+
+
+def _citation_only_form(text: str) -> str | None:
+    """The query reduced to its citations, if it parses back as citation-only."""
+    parsed = parse_query_citations(text)
+    with_subsection = {c["base"] for c in parsed["gov_code"] if c["subsection"]}
+    parts = [f"Section {c['raw']}" for c in parsed["gov_code"]
+             if c["subsection"] or c["base"] not in with_subsection]
+    parts += [f"Regulation {c['raw']}" for c in parsed["regulations"]]
+    form = ", ".join(parts)
+    return form if citation_only(form) is not None else None
+
+
+def eval_citation(weights: tuple[float, ...] = (0.0, 0.5, 1.0, 2.0),
+                  repeats: int = 20) -> bool:
+    engine = CitationScoreFusion()
+    engine.attach_metadata(build_metadata_index())
+    queries = []
+    for q in _citation_queries():
+        form = _citation_only_form(q["text"])
+        if form is not None:
+            queries.append({**q, "text": form})
+    print(f"\nCitation-only queries: {len(queries)}")
+
+    def ndcg(ranked: dict[str, list[str]]) -> float:
+        return float(np.mean([_ndcg(ranked[q["text"]], q["relevance_judgments"])
+                              for q in queries]))
+
+    # General paths on the same text: BM25 alone, and the fused pool
+    vectors = _query_vectors(engine, queries)
+    if not settings.openai_api_key:
+        print("OPENAI_API_KEY not set: fused rankings use judged-opinion "
+              "centroids as query vectors (an upper bound)")
+    engine._embedder = engine._embedder or HashEmbedder(1)
+    bm25, fused = {}, {}
+    t0 = time.perf_counter()
+    for q in queries:
+        rows, _ = engine._bm25.top_k(tokenize(q["text"]), 20)
+        bm25[q["text"]] = [engine._ids[r] for r in rows]
+    bm25_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for q in queries:
+        text = q["text"]
+        pool = engine._retrieve_pool(text, tokenize(text),
+                                     parse_query_citations(text), 20, None)
+        fused[text] = (engine._fuse(pool, vectors[text]).ids
+                       if isinstance(pool, _FusionPool) else pool.ids)
+    fused_s = time.perf_counter() - t0
+
+    per_query = 1000 / max(len(queries), 1)
+    print(f"\n{'path':>14} {'nDCG@20':>8} {'ms/query':>9}")
+    print(f"{'bm25':>14} {ndcg(bm25):>8.4f} {bm25_s * per_query:>9.3f}")
+    print(f"{'fused':>14} {ndcg(fused):>8.4f} {fused_s * per_query:>9.3f}"
+          f"  (+ query embedding)")
+    fast_ndcg = {}
+    engine._cite_fast = True  # settings.citation_fast_path
+    for weight in weights:
+        engine._cite_recency = weight
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            ranked = {q["text"]: engine._retrieve(q["text"], 20).ids
+                      for q in queries}
+        fast_s = (time.perf_counter() - t0) / repeats
+        fast_ndcg[weight] = ndcg(ranked)
+        print(f"{f'recency {weight:.2f}':>14} {fast_ndcg[weight]:>8.4f} "
+              f"{fast_s * per_query:>9.3f}")
+
+    # The fast path replaces BM25 when no query embedding can be had (and is
+    # off otherwise, as fusion ranks far better): it must not rank worse
+    return fast_ndcg[max(weights, key=fast_ndcg.get)] >= ndcg(bm25)
+
+
+CHECKS = {
+    "bm25": eval_bm25,
+    "topk": eval_topk,
+    "quantized": eval_quantized,
+    "fused": eval_fused,
+    "batch": eval_batch,
+    "prior": eval_prior,
+    "citation": eval_citation,
+}
+
+
+def main():
+    if len(sys.argv) != 2 or sys.argv[1] not in CHECKS:
+        print(__doc__)
+        sys.exit(2)
+    ok = CHECKS[sys.argv[1]]()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+HTTP conditional caching for the read-only API.
+
+The corpus and indexes only change between deploys, so every GET response is
+a function of the loaded data plus the request's path and query. ETags hash
+exactly that: the data version (search index, ranking settings, metadata
+files and corpus store, fixed at startup) and the canonical path/query. A
+request whose If-None-Match carries the current tag gets a bodyless 304
+before any work is done, and each route sends its own configurable
+Cache-Control policy. Responses that are not that function of the data (an
+engine error, a degraded ranking) drop the ETag and are sent no-store.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from urllib.parse import urlencode
+
+from fastapi import Request
+from fastapi.responses import Response
+
+
+def data_version(engine, metadata, corpus) -> str:
+    """Identifier of everything a response can depend on."""
+    parts = [
+        engine.index_version() if engine is not None else "",
+        json.dumps(engine.ranking_settings() if engine is not None else {},
+                   sort_keys=True),
+        metadata.version if metadata is not None else "",
+        corpus.version if corpus is not None else "",
+    ]
+    return hashlib.sha256("\0".join(map(str, parts)).encode("utf-8")).hexdigest()[:16]
+
+
+def etag_for(request: Request) -> str:
+    """Strong ETag for this request against the loaded data."""
+    # Sorted by name, so parameter order doesn't split the cache; repeated
+    # values keep their order, which can order the body (opinions/batch)
+    items = request.query_params.multi_items()
+    query = urlencode(sorted(items, key=lambda item: item[0]))
+    key = f"{request.app.state.data_version}\0{request.url.path}\0{query}"
+    return '"' + hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def cache_headers(etag: str, cache_control: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def uncacheable(response: Response) -> None:
+    """Strip caching headers already set on a response that must not be reused."""
+    if "ETag" in response.headers:
+        del response.headers["ETag"]
+    response.headers["Cache-Control"] = "no-store"
+
+
+def not_modified(request: Request, etag: str, cache_control: str) -> Response | None:
+    """A 304 response if the client already holds this ETag, else None."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    # If-None-Match uses weak comparison: ignore any W/ prefix
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers=cache_headers(etag, cache_control))
+    return None
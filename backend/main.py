@@ -1,6 +1,8 @@
 """FastAPI app — serves the REST API, MCP server, and (in production) the built React frontend."""
 
+import asyncio
 import logging
+import os
 import time
 from contextlib import asynccontextmanager
 from pathlib import Path
@@ -11,13 +13,17 @@ from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
 from backend.config import settings
+from backend.corpus import ensure_corpus_store
 from backend.exceptions import register_exception_handlers
+from backend.http_cache import data_version
 from backend.mcp_server import init as mcp_init
 from backend.mcp_server import mcp_server
 from backend.metadata import build_metadata_index
 from backend.middleware import RequestLoggingMiddleware
-from backend.routers import filters, opinions, search
+from backend.opinion_detail import detail_cache
+from backend.routers import citations, export, filters, opinions, search
 from backend.search.engine import CitationScoreFusion
+from backend.search.filters import FilterIndex
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,7 +32,12 @@ FRONTEND_DIST = Path(__file__).resolve().parent.parent / "frontend" / "dist"
 
 
 async def _download_indexes_from_r2():
-    """Download search index pickle files from R2 if not present locally."""
+    """Download the search index pickles from R2 when they are new or changed.
+
+    A local copy is revalidated with its stored ETag (If-None-Match), so an
+    unchanged pickle costs one 304; the engine reconverts the index when a
+    pickle was replaced. An unreachable R2 keeps the local copies.
+    """
     if not settings.r2_index_base_url:
         return
 
@@ -43,18 +54,38 @@ async def _download_indexes_from_r2():
 
     for filename in index_files:
         local_path = index_dir / filename
-        if local_path.exists():
-            logger.info("Index already exists: %s", filename)
-            continue
+        etag_path = index_dir / f"{filename}.etag"
+        headers = {}
+        if local_path.exists() and etag_path.exists():
+            headers["If-None-Match"] = etag_path.read_text().strip()
 
         url = f"{settings.r2_index_base_url.rstrip('/')}/{filename}"
-        logger.info("Downloading index: %s", url)
+        logger.info("Checking index: %s", url)
         t0 = time.monotonic()
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, follow_redirects=True, timeout=300.0)
-            response.raise_for_status()
-            local_path.write_bytes(response.content)
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await client.get(url, headers=headers,
+                                            follow_redirects=True, timeout=300.0)
+                response.raise_for_status()
+        except httpx.HTTPError as e:
+            if not local_path.exists():
+                raise
+            logger.warning("Could not check %s (%s); keeping the local copy",
+                           filename, e)
+            continue
+        if response.status_code == 304:
+            logger.info("Index unchanged: %s", filename)
+            continue
+
+        # Replaced atomically: a concurrent worker never reads a partial file
+        tmp_path = local_path.with_name(f"{filename}.tmp-{os.getpid()}")
+        tmp_path.write_bytes(response.content)
+        os.replace(tmp_path, local_path)
+        if response.headers.get("etag"):
+            etag_path.write_text(response.headers["etag"])
+        else:
+            etag_path.unlink(missing_ok=True)
 
         elapsed = time.monotonic() - t0
         size_mb = local_path.stat().st_size / (1024 * 1024)
@@ -74,18 +105,41 @@ def _create_mcp_session_manager():
     return sm
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    t0 = time.monotonic()
+# Engine/metadata loaded in a parent process before forking workers
+# (see backend.prefork); empty when each worker loads its own.
+_preloaded: dict = {}
+
+
+async def _load_search_state():
+    """Return (engine, metadata), reusing the pre-fork copies when present."""
+    if _preloaded:
+        logger.info("Using indexes preloaded by parent process")
+        return _preloaded["engine"], _preloaded["metadata"]
 
     # Download indexes from R2 if needed (production)
     await _download_indexes_from_r2()
 
-    app.state.engine = CitationScoreFusion()
-    engine = app.state.engine
+    engine = CitationScoreFusion()
     logger.info("Search engine loaded: %s", engine.name())
+    metadata = build_metadata_index()
+    engine.attach_metadata(metadata)
+    return engine, metadata
 
-    app.state.metadata = build_metadata_index()
+
+def preload() -> None:
+    """Load engine and metadata once so forked workers share the pages."""
+    engine, metadata = asyncio.run(_load_search_state())
+    _preloaded.update(engine=engine, metadata=metadata)
+    # Workers then only open it
+    ensure_corpus_store(metadata.version)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    t0 = time.monotonic()
+
+    app.state.engine, app.state.metadata = await _load_search_state()
+    engine = app.state.engine
     meta = app.state.metadata
     logger.info(
         "Corpus: %d opinions, %d topics, %d statutes, years %d–%d",
@@ -96,12 +150,28 @@ async def lifespan(app: FastAPI):
         meta.year_max,
     )
 
+    app.state.corpus = await asyncio.to_thread(ensure_corpus_store, meta.version)
+    if app.state.corpus is not None:
+        logger.info("Corpus store: %d opinions (%s)", len(app.state.corpus),
+                    app.state.corpus.version)
+    else:
+        logger.info("No corpus store; opinion details read JSON files")
+
+    # Rendered details from any previously loaded data are stale
+    detail_cache.clear()
+    app.state.data_version = data_version(engine, meta, app.state.corpus)
+    app.state.filters_body = filters.render_filters(meta)
+    # Filter masks over metadata rows, for exports without a query
+    app.state.metadata_filters = FilterIndex.from_metadata(meta.ids, meta)
+
     # Share engine/metadata with MCP server
-    mcp_init(engine, meta)
+    mcp_init(engine, meta, app.state.corpus)
     logger.info("MCP server initialized")
 
-    openai_available = getattr(engine, "_openai_available", False)
-    logger.info("OpenAI available: %s", openai_available)
+    # Configuration only: a probe request would be billed on every boot
+    logger.info("Query embeddings: provider=%s model=%s configured=%s",
+                settings.embedding_provider, engine.embedding_model,
+                engine.has_embedder)
 
     elapsed = time.monotonic() - t0
     logger.info("Startup completed in %.1fs", elapsed)
@@ -129,6 +199,8 @@ app.add_middleware(
 app.include_router(search.router)
 app.include_router(opinions.router)
 app.include_router(filters.router)
+app.include_router(export.router)
+app.include_router(citations.router)
 
 # MCP ASGI handler — session_manager is set during lifespan
 from mcp.server.fastmcp.server import StreamableHTTPASGIApp
@@ -151,6 +223,7 @@ async def health(request: Request):
         "engine_loaded": engine is not None,
         "engine_name": engine.name() if engine else None,
         "opinions_indexed": metadata.total_opinions if metadata else 0,
+        "detail_cache": detail_cache.stats(),
         "mcp_endpoint": "/mcp",
     }
 
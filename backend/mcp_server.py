@@ -8,11 +8,21 @@ import time
 
 from mcp.server.fastmcp import FastMCP
 
+from backend.opinion_detail import opinion_detail_json
+from backend.search.filters import SearchFilters
+from backend.services import (
+    MAX_BATCH_IDS,
+    opinion_summaries,
+    search_page,
+    search_results,
+)
+
 logger = logging.getLogger(__name__)
 
 # Module-level references set by FastAPI lifespan (avoids double-loading indexes)
 _engine = None
 _metadata = None
+_corpus = None
 
 mcp_server = FastMCP(
     name="FPPC Opinions",
@@ -20,30 +30,22 @@ mcp_server = FastMCP(
         "Search and retrieve California Fair Political Practices Commission (FPPC) "
         "advisory opinion letters (1975–2025). Use search_opinions to find relevant "
         "opinions by keyword, statute, or topic. Use get_opinion to read the full text "
-        "of a specific opinion. Use list_topics to discover available topics and statutes."
+        "of a specific opinion, or get_opinion_summaries to look up many opinions (e.g. a "
+        "citation list) at once. Use list_topics to discover available topics and statutes."
     ),
 )
 
 
-def init(engine, metadata):
+def init(engine, metadata, corpus=None):
     """Called during FastAPI lifespan to share engine/metadata with MCP tools."""
-    global _engine, _metadata
+    global _engine, _metadata, _corpus
     _engine = engine
     _metadata = metadata
-
-
-def _truncate(text: str | None, max_len: int = 300) -> str | None:
-    if not text or len(text) <= max_len:
-        return text
-    truncated = text[:max_len]
-    last_space = truncated.rfind(" ")
-    if last_space > 0:
-        truncated = truncated[:last_space]
-    return truncated + "..."
+    _corpus = corpus
 
 
 @mcp_server.tool()
-def search_opinions(
+async def search_opinions(
     query: str,
     topic: str | None = None,
     statute: str | None = None,
@@ -51,6 +53,8 @@ def search_opinions(
     year_end: int | None = None,
     page: int = 1,
     per_page: int = 20,
+    regulation: str | None = None,
+    document_type: str | None = None,
 ) -> str:
     """Search ~14,100 FPPC advisory opinion letters (1975–2025).
 
@@ -67,6 +71,8 @@ def search_opinions(
         year_end: Filter to opinions from this year or earlier.
         page: Page number (default 1).
         per_page: Results per page (default 20, max 100).
+        regulation: Filter by FPPC regulation section (e.g. "18700").
+        document_type: Filter by document type (e.g. "opinion", "informal").
     """
     if not _engine or not _metadata:
         return json.dumps({"error": "Server not ready — engine not loaded yet"})
@@ -80,46 +86,18 @@ def search_opinions(
 
     t0 = time.monotonic()
 
-    try:
-        result_ids = _engine.search(query, top_k=200)
-    except Exception:
-        logger.exception("Search engine error for query: %s", query)
-        result_ids = []
-
-    # Post-hoc filtering (same logic as REST endpoint)
-    filtered = []
-    for opinion_id in result_ids:
-        meta = _metadata.opinions.get(opinion_id)
-        if meta is None:
-            continue
-        if topic and meta["topic_primary"] != topic:
-            continue
-        if statute and statute not in meta["government_code_sections"]:
-            continue
-        if year_start is not None and meta["year"] < year_start:
-            continue
-        if year_end is not None and meta["year"] > year_end:
-            continue
-        filtered.append((opinion_id, meta))
-
-    total_results = len(filtered)
-    start = (page - 1) * per_page
-    page_items = filtered[start : start + per_page]
-
-    results = []
-    for i, (opinion_id, meta) in enumerate(page_items, start=start + 1):
-        topics = [t for t in [meta["topic_primary"], meta["topic_secondary"]] if t]
-        results.append({
-            "opinion_id": opinion_id,
-            "opinion_number": meta["opinion_number"],
-            "date": meta["date"],
-            "year": meta["year"],
-            "question": meta["question"],
-            "conclusion": _truncate(meta["conclusion"]),
-            "topics": topics,
-            "statutes": meta["government_code_sections"],
-            "rank": i,
-        })
+    filters = SearchFilters(
+        topics=topic or (),
+        statute=statute,
+        regulation=regulation,
+        year_start=year_start,
+        year_end=year_end,
+        document_types=document_type or (),
+    )
+    ranking = await search_page(_engine, query, filters, page, per_page)
+    total_results = ranking.total
+    results = search_results(ranking.ids, _metadata,
+                             first_rank=(page - 1) * per_page + 1)
 
     elapsed_ms = (time.monotonic() - t0) * 1000
     logger.info("MCP search query=%r total=%d elapsed=%.0fms", query, total_results, elapsed_ms)
@@ -130,7 +108,7 @@ def search_opinions(
         "page": page,
         "per_page": per_page,
         "total_pages": (total_results + per_page - 1) // per_page if total_results else 0,
-        "results": results,
+        "results": [result.model_dump() for result in results],
     })
 
 
@@ -147,59 +125,35 @@ def get_opinion(opinion_id: str) -> str:
     if not _metadata:
         return json.dumps({"error": "Server not ready — metadata not loaded yet"})
 
-    meta = _metadata.opinions.get(opinion_id)
-    if meta is None:
-        return json.dumps({"error": f"Opinion '{opinion_id}' not found"})
-
     try:
-        with open(meta["file_path"], "r") as f:
-            data = json.load(f)
-    except (OSError, json.JSONDecodeError):
-        logger.exception("Failed to load opinion file: %s", meta["file_path"])
+        body = opinion_detail_json(opinion_id, _metadata, _corpus)
+    except (OSError, ValueError):
+        logger.exception("Failed to load opinion data: %s", opinion_id)
         return json.dumps({"error": f"Failed to load opinion data for '{opinion_id}'"})
+    if body is None:
+        return json.dumps({"error": f"Opinion '{opinion_id}' not found"})
+    # Same rendered bytes as GET /api/opinions/{id}
+    return body.decode("utf-8")
+
 
-    sections = data.get("sections", {})
-    citations = data.get("citations", {})
-    classification = data.get("classification", {})
-    parsed = data.get("parsed", {})
-    extraction = data.get("extraction", {})
+@mcp_server.tool()
+def get_opinion_summaries(opinion_ids: list[str]) -> str:
+    """Get summary records (date, question, conclusion, topics, statutes) for many opinions.
 
-    question = sections.get("question") or sections.get("question_synthetic")
-    conclusion = sections.get("conclusion") or sections.get("conclusion_synthetic")
+    Much cheaper than calling get_opinion repeatedly, e.g. to triage the
+    prior_opinions or cited_by list of an opinion. Unknown ids are listed
+    under "missing".
 
-    # Build cited opinion lists with corpus existence check
-    prior_opinions = [
-        {"opinion_number": op_id, "exists_in_corpus": op_id in _metadata.opinions}
-        for op_id in citations.get("prior_opinions", [])
-    ]
-    cited_by = [
-        {"opinion_number": op_id, "exists_in_corpus": op_id in _metadata.opinions}
-        for op_id in citations.get("cited_by", [])
-    ]
+    Args:
+        opinion_ids: Opinion IDs (e.g. ["A-24-003", "90-200"]), at most 1000.
+    """
+    if not _metadata:
+        return json.dumps({"error": "Server not ready — metadata not loaded yet"})
+    if len(opinion_ids) > MAX_BATCH_IDS:
+        return json.dumps({"error": f"At most {MAX_BATCH_IDS} opinion ids per call"})
 
-    return json.dumps({
-        "id": opinion_id,
-        "opinion_number": opinion_id,
-        "date": parsed.get("date"),
-        "year": data.get("year"),
-        "requestor_name": parsed.get("requestor_name"),
-        "requestor_title": parsed.get("requestor_title"),
-        "requestor_city": parsed.get("requestor_city"),
-        "document_type": parsed.get("document_type"),
-        "question": question,
-        "conclusion": conclusion,
-        "facts": sections.get("facts"),
-        "analysis": sections.get("analysis"),
-        "topic_primary": classification.get("topic_primary"),
-        "topic_secondary": classification.get("topic_secondary"),
-        "topic_tags": classification.get("topic_tags", []),
-        "government_code_sections": citations.get("government_code", []),
-        "regulations": citations.get("regulations", []),
-        "prior_opinions": prior_opinions,
-        "cited_by": cited_by,
-        "page_count": extraction.get("page_count"),
-        "word_count": extraction.get("word_count"),
-    })
+    # Same records as /api/opinions/batch
+    return opinion_summaries(opinion_ids, _metadata).model_dump_json()
 
 
 @mcp_server.tool()
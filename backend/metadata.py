@@ -1,19 +1,61 @@
-"""In-memory metadata index built at startup from ~14K opinion JSON files."""
+"""In-memory metadata index built at startup from ~14K opinion JSON files.
+
+Stored column-wise rather than as one dict per opinion: years and the
+categorical fields are small NumPy code arrays, statute/regulation/opinion
+citations are interned ids in CSR form, and the text fields live in one UTF-8
+blob per field that is only decoded when a row is read. The long question and
+conclusion fields are additionally zlib-compressed in blocks of rows. `opinions` is a
+read-only mapping view that materializes an OpinionMeta dict per lookup, so
+callers that index by opinion id keep working.
+
+The opinion-to-opinion citations are also resolved to rows and kept as a CSR
+CitationGraph (`citations`), derived from the list columns on every build
+or load.
+
+Parsing the JSON files dominates cold start, so build_metadata_index() keeps a
+snapshot next to the search indexes (indexes/metadata/):
+
+    manifest.json       fingerprint of every year directory's files (name,
+                        size, content hash) at the time of the build, and of
+                        its listing (name, size, mtime) so unchanged
+                        directories are not re-hashed
+    index.npz           the built columns, loaded directly when nothing changed
+    years/{year}.json.z zlib-compressed records of one year directory
+
+When some year directories changed, only those are re-parsed and the rest come
+from their shards. Without any snapshot, the years are parsed in parallel
+across a process pool.
+"""
 
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
+import multiprocessing
 import os
 import time
-from collections import Counter
-from dataclasses import dataclass, field
+import zlib
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
 from typing import TypedDict
 
+import numpy as np
+
+from backend.citation_graph import CitationGraph
+from backend.search.index_format import StringTable, encode_strings
+
 logger = logging.getLogger(__name__)
 
 _PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 _DATA_DIR = os.path.join(_PROJECT_ROOT, "data", "extracted")
+_SNAPSHOT_DIR = os.path.join(_PROJECT_ROOT, "indexes", "metadata")
+
+SNAPSHOT_FORMAT = "fppc-metadata-snapshot"
+SNAPSHOT_VERSION = 4  # 4: content fingerprints; 3: "id": null records left out
+_PARALLEL_MIN_FILES = 1000  # fewer files to parse than this: no process pool
 
 
 class OpinionMeta(TypedDict):
@@ -33,106 +75,657 @@ class OpinionMeta(TypedDict):
     local_pdf_path: str | None
 
 
-@dataclass
+_TEXT_FIELDS = ("opinion_number", "date", "file_path", "local_pdf_path")
+_LONG_TEXT_FIELDS = ("question", "conclusion")
+_CATEGORICAL_FIELDS = ("topic_primary", "topic_secondary", "document_type")
+_LIST_FIELDS = ("government_code_sections", "regulations",
+                "prior_opinions", "cited_by")
+
+_TEXT_BLOCK_ROWS = 64  # rows per zlib block (~2.9× on question/conclusion)
+_TEXT_BLOCK_CACHE = 256  # decoded blocks kept per column
+
+
+# ---------------------------------------------------------------------------
+# Columns
+# ---------------------------------------------------------------------------
+class Categorical:
+    """Per-row int16 codes into a list of values (-1 = None)."""
+
+    def __init__(self, values: list[str], codes: np.ndarray):
+        self.values = values
+        self.codes = codes
+        self._lookup = {v: i for i, v in enumerate(values)}
+
+    @classmethod
+    def build(cls, column: list[str | None]) -> Categorical:
+        lookup: dict[str, int] = {}
+        codes = np.array(
+            [-1 if v is None else lookup.setdefault(v, len(lookup)) for v in column],
+            dtype=np.int16,
+        )
+        return cls(list(lookup), codes)
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        blob, offsets = encode_strings(self.values)
+        return {"values_blob": blob, "values_offsets": offsets, "codes": self.codes}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, np.ndarray]) -> Categorical:
+        values = StringTable(arrays["values_blob"], arrays["values_offsets"])
+        return cls(values.to_list(), arrays["codes"])
+
+    def __getitem__(self, row: int) -> str | None:
+        code = self.codes[row]
+        return None if code < 0 else self.values[code]
+
+    def code(self, value: str) -> int | None:
+        return self._lookup.get(value)
+
+
+class ListColumn:
+    """Per-row lists of interned strings in CSR form."""
+
+    def __init__(self, vocab: list[str], indptr: np.ndarray, items: np.ndarray):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.items = items
+        self._lookup = {v: i for i, v in enumerate(vocab)}
+
+    @classmethod
+    def build(cls, column: list[list[str]]) -> ListColumn:
+        lookup: dict[str, int] = {}
+        indptr = np.zeros(len(column) + 1, dtype=np.int64)
+        np.cumsum([len(values) for values in column], out=indptr[1:])
+        items = np.array(
+            [lookup.setdefault(v, len(lookup)) for values in column for v in values],
+            dtype=np.int32,
+        )
+        return cls(list(lookup), indptr, items)
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        blob, offsets = encode_strings(self.vocab)
+        return {"vocab_blob": blob, "vocab_offsets": offsets,
+                "indptr": self.indptr, "items": self.items}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, np.ndarray]) -> ListColumn:
+        vocab = StringTable(arrays["vocab_blob"], arrays["vocab_offsets"])
+        return cls(vocab.to_list(), arrays["indptr"], arrays["items"])
+
+    def __getitem__(self, row: int) -> list[str]:
+        vocab = self.vocab
+        return [vocab[i] for i in self.items[self.indptr[row]:self.indptr[row + 1]]]
+
+    def code(self, value: str) -> int | None:
+        return self._lookup.get(value)
+
+    def owners(self) -> np.ndarray:
+        """Row of every item (parallel to self.items)."""
+        return np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int32),
+                         np.diff(self.indptr))
+
+    def counts(self) -> dict[str, int]:
+        """Occurrences per value, in first-seen order."""
+        counts = np.bincount(self.items, minlength=len(self.vocab))
+        return dict(zip(self.vocab, counts.tolist()))
+
+
+class TextColumn:
+    """Nullable strings in a UTF-8 blob, decoded on access."""
+
+    def __init__(self, table: StringTable, null: np.ndarray):
+        self.table = table
+        self.null = null
+
+    @classmethod
+    def build(cls, column: list[str | None]) -> TextColumn:
+        null = np.array([v is None for v in column], dtype=bool)
+        blob, offsets = encode_strings(["" if v is None else v for v in column])
+        return cls(StringTable(blob, offsets), null)
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        return {"blob": self.table.blob, "offsets": self.table.offsets,
+                "null": self.null}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, np.ndarray]) -> TextColumn:
+        return cls(StringTable(arrays["blob"], arrays["offsets"]), arrays["null"])
+
+    def __getitem__(self, row: int) -> str | None:
+        return None if self.null[row] else self.table[row]
+
+    @property
+    def nbytes(self) -> int:
+        return self.table.nbytes + self.null.nbytes
+
+
+class PackedTextColumn:
+    """Nullable strings zlib-compressed in blocks of rows.
+
+    Reading a row decompresses its block; recently used blocks are cached.
+    """
+
+    def __init__(self, blocks: list[bytes], offsets: np.ndarray, null: np.ndarray):
+        self.blocks = blocks
+        self.offsets = offsets  # per-row [start, end) within its block
+        self.null = null
+        self._block = lru_cache(maxsize=_TEXT_BLOCK_CACHE)(self._decompress)
+
+    @classmethod
+    def build(cls, column: list[str | None]) -> PackedTextColumn:
+        null = np.array([v is None for v in column], dtype=bool)
+        offsets = np.zeros(len(column) + 1, dtype=np.int32)
+        blocks = []
+        for start in range(0, len(column), _TEXT_BLOCK_ROWS):
+            encoded = [("" if v is None else v).encode("utf-8")
+                       for v in column[start:start + _TEXT_BLOCK_ROWS]]
+            # Offsets restart at 0 in every block
+            offsets[start + 1:start + 1 + len(encoded)] = np.cumsum(
+                [len(b) for b in encoded])
+            blocks.append(zlib.compress(b"".join(encoded), 6))
+        return cls(blocks, offsets, null)
+
+    def to_arrays(self) -> dict[str, np.ndarray]:
+        blob, block_offsets = encode_strings([])
+        if self.blocks:
+            block_offsets = np.zeros(len(self.blocks) + 1, dtype=np.int64)
+            np.cumsum([len(b) for b in self.blocks], out=block_offsets[1:])
+            blob = np.frombuffer(b"".join(self.blocks), dtype=np.uint8)
+        return {"blocks": blob, "block_offsets": block_offsets,
+                "offsets": self.offsets, "null": self.null}
+
+    @classmethod
+    def from_arrays(cls, arrays: dict[str, np.ndarray]) -> PackedTextColumn:
+        data = arrays["blocks"].tobytes()
+        bounds = arrays["block_offsets"].tolist()
+        blocks = [data[a:b] for a, b in zip(bounds, bounds[1:])]
+        return cls(blocks, arrays["offsets"], arrays["null"])
+
+    def __getitem__(self, row: int) -> str | None:
+        if self.null[row]:
+            return None
+        data = self._block(row // _TEXT_BLOCK_ROWS)
+        start = 0 if row % _TEXT_BLOCK_ROWS == 0 else self.offsets[row]
+        return data[start:self.offsets[row + 1]].decode("utf-8")
+
+    def _decompress(self, block: int) -> bytes:
+        return zlib.decompress(self.blocks[block])
+
+    @property
+    def nbytes(self) -> int:
+        return (sum(len(b) for b in self.blocks) + self.offsets.nbytes
+                + self.null.nbytes)
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+class OpinionsView(Mapping):
+    """Read-only opinion id → OpinionMeta mapping over a MetadataIndex."""
+
+    def __init__(self, index: MetadataIndex):
+        self._index = index
+
+    def __getitem__(self, opinion_id: str) -> OpinionMeta:
+        row = self._index.row_of.get(opinion_id)
+        if row is None:
+            raise KeyError(opinion_id)
+        return self._index.meta(row)
+
+    def __contains__(self, opinion_id: object) -> bool:
+        return opinion_id in self._index.row_of
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index.ids)
+
+    def __len__(self) -> int:
+        return len(self._index.ids)
+
+
 class MetadataIndex:
-    opinions: dict[str, OpinionMeta] = field(default_factory=dict)
-    topic_counts: dict[str, int] = field(default_factory=dict)
-    statute_counts: dict[str, int] = field(default_factory=dict)
-    year_min: int = 9999
-    year_max: int = 0
-    total_opinions: int = 0
+    """Columnar opinion metadata; rows are in load order."""
 
+    def __init__(self):
+        self.ids: list[str] = []
+        self.row_of: dict[str, int] = {}
+        self.years = np.empty(0, dtype=np.int16)
+        self.categorical: dict[str, Categorical] = {
+            f: Categorical.build([]) for f in _CATEGORICAL_FIELDS}
+        self.lists: dict[str, ListColumn] = {
+            f: ListColumn.build([]) for f in _LIST_FIELDS}
+        self.text: dict[str, TextColumn | PackedTextColumn] = {
+            f: TextColumn.build([]) for f in _TEXT_FIELDS}
+        self.text.update({f: PackedTextColumn.build([]) for f in _LONG_TEXT_FIELDS})
+        self.topic_counts: dict[str, int] = {}
+        self.statute_counts: dict[str, int] = {}
+        self.year_min = 9999
+        self.year_max = 0
+        self.total_opinions = 0
+        self.citations = CitationGraph.from_edges(0, np.empty(0), np.empty(0))
+        # Fingerprint of the source files; set by build_metadata_index()
+        self.version = ""
 
-def build_metadata_index() -> MetadataIndex:
-    """Walk data/extracted/{year}/{id}.json and build an in-memory index."""
-    t0 = time.time()
-    index = MetadataIndex()
-    topic_counter: Counter[str] = Counter()
-    statute_counter: Counter[str] = Counter()
+    @classmethod
+    def from_records(cls, records: Mapping[str, OpinionMeta]) -> MetadataIndex:
+        """Build the columns from opinion id → OpinionMeta records."""
+        index = cls()
+        index.ids = list(records)
+        index.row_of = {oid: i for i, oid in enumerate(index.ids)}
+        rows = list(records.values())
+        index.years = np.array([r["year"] or 0 for r in rows], dtype=np.int16)
+        index.categorical = {f: Categorical.build([r[f] for r in rows])
+                             for f in _CATEGORICAL_FIELDS}
+        index.lists = {f: ListColumn.build([r[f] for r in rows])
+                       for f in _LIST_FIELDS}
+        index.text = {f: TextColumn.build([r[f] for r in rows])
+                      for f in _TEXT_FIELDS}
+        index.text.update({f: PackedTextColumn.build([r[f] for r in rows])
+                           for f in _LONG_TEXT_FIELDS})
+        index._compute_aggregates()
+        return index
+
+    def save(self, path: str) -> None:
+        """Write the columns to one .npz file (atomically replaced)."""
+        blob, offsets = encode_strings(self.ids)
+        arrays = {"ids_blob": blob, "ids_offsets": offsets, "years": self.years}
+        columns = {**self.categorical, **self.lists, **self.text}
+        for field, column in columns.items():
+            for name, array in column.to_arrays().items():
+                arrays[f"{field}.{name}"] = array
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
 
-    if not os.path.isdir(_DATA_DIR):
-        logger.warning("Data directory not found: %s", _DATA_DIR)
+    @classmethod
+    def load(cls, path: str) -> MetadataIndex:
+        """Read columns written by save()."""
+        with np.load(path, allow_pickle=False) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+
+        def column(field: str) -> dict[str, np.ndarray]:
+            prefix = f"{field}."
+            return {name[len(prefix):]: array for name, array in arrays.items()
+                    if name.startswith(prefix)}
+
+        index = cls()
+        index.ids = StringTable(arrays["ids_blob"], arrays["ids_offsets"]).to_list()
+        index.row_of = {oid: i for i, oid in enumerate(index.ids)}
+        index.years = arrays["years"]
+        index.categorical = {f: Categorical.from_arrays(column(f))
+                             for f in _CATEGORICAL_FIELDS}
+        index.lists = {f: ListColumn.from_arrays(column(f)) for f in _LIST_FIELDS}
+        index.text = {f: TextColumn.from_arrays(column(f)) for f in _TEXT_FIELDS}
+        index.text.update({f: PackedTextColumn.from_arrays(column(f))
+                           for f in _LONG_TEXT_FIELDS})
+        index._compute_aggregates()
         return index
 
-    for year_dir in sorted(os.listdir(_DATA_DIR)):
-        year_path = os.path.join(_DATA_DIR, year_dir)
-        if not os.path.isdir(year_path):
+    def _compute_aggregates(self) -> None:
+        """Topic/statute counts and year range, derived from the columns."""
+        topics = self.categorical["topic_primary"]
+        # Non-empty topics only, in first-seen order
+        counts = np.bincount(topics.codes[topics.codes >= 0],
+                             minlength=len(topics.values))
+        self.topic_counts = {v: int(n) for v, n in zip(topics.values, counts)
+                             if v and n}
+        self.statute_counts = self.lists["government_code_sections"].counts()
+        self.citations = self._citation_graph()
+
+        self.total_opinions = len(self.ids)
+        known = self.years[self.years != 0]
+        if len(known):
+            self.year_min = int(known.min())
+            self.year_max = int(known.max())
+        elif self.total_opinions == 0:
+            # Handle edge case where no opinions were loaded
+            self.year_min = 0
+            self.year_max = 0
+
+    def _citation_graph(self) -> CitationGraph:
+        """Edges from prior_opinions and cited_by, resolved to rows."""
+        prior = self.lists["prior_opinions"]
+        cited_by = self.lists["cited_by"]
+        sources = np.concatenate([prior.owners(),
+                                  self.rows(cited_by.vocab)[cited_by.items]])
+        targets = np.concatenate([self.rows(prior.vocab)[prior.items],
+                                  cited_by.owners()])
+        return CitationGraph.from_edges(len(self.ids), sources, targets)
+
+    @property
+    def opinions(self) -> OpinionsView:
+        return OpinionsView(self)
+
+    def row(self, opinion_id: str) -> int | None:
+        return self.row_of.get(opinion_id)
+
+    def rows(self, opinion_ids: list[str]) -> np.ndarray:
+        """Metadata rows for the ids (-1 where unknown)."""
+        row_of = self.row_of
+        return np.array([row_of.get(oid, -1) for oid in opinion_ids],
+                        dtype=np.int64)
+
+    def meta(self, row: int) -> OpinionMeta:
+        """Materialize one row as an OpinionMeta dict."""
+        text = self.text
+        cat = self.categorical
+        lists = self.lists
+        return {
+            "opinion_number": text["opinion_number"][row],
+            "date": text["date"][row],
+            "year": int(self.years[row]),
+            "question": text["question"][row],
+            "conclusion": text["conclusion"][row],
+            "topic_primary": cat["topic_primary"][row],
+            "topic_secondary": cat["topic_secondary"][row],
+            "government_code_sections": lists["government_code_sections"][row],
+            "regulations": lists["regulations"][row],
+            "prior_opinions": lists["prior_opinions"][row],
+            "cited_by": lists["cited_by"][row],
+            "document_type": cat["document_type"][row],
+            "file_path": text["file_path"][row],
+            "local_pdf_path": text["local_pdf_path"][row],
+        }
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate size of the column arrays (excluding the id mapping)."""
+        return (self.years.nbytes
+                + sum(c.codes.nbytes for c in self.categorical.values())
+                + sum(c.indptr.nbytes + c.items.nbytes for c in self.lists.values())
+                + sum(c.nbytes for c in self.text.values())
+                + self.citations.nbytes)
+
+
+def record_id(data: dict, file_path: str) -> str:
+    """The id a data file is keyed by in metadata, the corpus store and the index.
+
+    The record's "id", or the file stem when the key is absent. A few
+    extracted files carry "id": null; those get the empty string. The search
+    index keeps a row for them (its postings stay row-aligned) but the
+    engine masks such rows out of every ranking, and the metadata index and
+    corpus store leave them out, so they are never served.
+    """
+    return data.get("id", os.path.basename(file_path).removesuffix(".json")) or ""
+
+
+def _read_record(file_path: str, filename: str) -> tuple[str, OpinionMeta] | None:
+    try:
+        with open(file_path, "r") as f:
+            data = json.load(f)
+    except Exception:
+        logger.warning("Skipping malformed file: %s", file_path)
+        return None
+
+    opinion_id = record_id(data, filename)
+    if not opinion_id:
+        return None  # "id": null: not servable (see record_id)
+    sections = data.get("sections", {})
+    citations = data.get("citations", {})
+    classification = data.get("classification", {})
+    parsed = data.get("parsed", {})
+
+    # Question/conclusion with fallback to synthetic
+    question = sections.get("question") or sections.get("question_synthetic")
+    conclusion = sections.get("conclusion") or sections.get("conclusion_synthetic")
+
+    meta: OpinionMeta = {
+        "opinion_number": opinion_id,
+        "date": parsed.get("date"),
+        "year": data.get("year", 0),
+        "question": question,
+        "conclusion": conclusion,
+        "topic_primary": classification.get("topic_primary"),
+        "topic_secondary": classification.get("topic_secondary"),
+        "government_code_sections": citations.get("government_code", []),
+        "regulations": citations.get("regulations", []),
+        "prior_opinions": citations.get("prior_opinions", []),
+        "cited_by": citations.get("cited_by", []),
+        "document_type": parsed.get("document_type"),
+        "file_path": file_path,
+        "local_pdf_path": data.get("local_pdf_path"),
+    }
+    return opinion_id, meta
+
+
+def _read_year(year_path: str, filenames: list[str]) -> list[tuple[str, OpinionMeta]]:
+    """Parse one year directory (runs in pool workers, so module-level)."""
+    records = []
+    for filename in filenames:
+        record = _read_record(os.path.join(year_path, filename), filename)
+        if record is not None:
+            records.append(record)
+    return records
+
+
+# ---------------------------------------------------------------------------
+# Snapshot
+# ---------------------------------------------------------------------------
+def _scan(data_dir: str) -> dict[str, list[tuple[str, int, int]]]:
+    """Year directory → sorted (filename, size, mtime_ns) of its JSON files."""
+    listing = {}
+    for entry in sorted(os.scandir(data_dir), key=lambda e: e.name):
+        if not entry.is_dir():
             continue
-        for filename in os.listdir(year_path):
-            if not filename.endswith(".json"):
-                continue
-            file_path = os.path.join(year_path, filename)
-            try:
-                with open(file_path, "r") as f:
-                    data = json.load(f)
-            except Exception:
-                logger.warning("Skipping malformed file: %s", file_path)
-                continue
-
-            opinion_id = data.get("id", filename.removesuffix(".json"))
-            year = data.get("year", 0)
-            sections = data.get("sections", {})
-            citations = data.get("citations", {})
-            classification = data.get("classification", {})
-            parsed = data.get("parsed", {})
-
-            # Question/conclusion with fallback to synthetic
-            question = sections.get("question") or sections.get("question_synthetic")
-            conclusion = sections.get("conclusion") or sections.get("conclusion_synthetic")
-
-            topic_primary = classification.get("topic_primary")
-            topic_secondary = classification.get("topic_secondary")
-            gov_code = citations.get("government_code", [])
-            regulations = citations.get("regulations", [])
-            prior_opinions = citations.get("prior_opinions", [])
-            cited_by = citations.get("cited_by", [])
-
-            meta: OpinionMeta = {
-                "opinion_number": opinion_id,
-                "date": parsed.get("date"),
-                "year": year,
-                "question": question,
-                "conclusion": conclusion,
-                "topic_primary": topic_primary,
-                "topic_secondary": topic_secondary,
-                "government_code_sections": gov_code,
-                "regulations": regulations,
-                "prior_opinions": prior_opinions,
-                "cited_by": cited_by,
-                "document_type": parsed.get("document_type"),
-                "file_path": file_path,
-                "local_pdf_path": data.get("local_pdf_path"),
-            }
-
-            index.opinions[opinion_id] = meta
-
-            # Aggregations
-            if topic_primary:
-                topic_counter[topic_primary] += 1
-            for section in gov_code:
-                statute_counter[section] += 1
-
-            if year:
-                if year < index.year_min:
-                    index.year_min = year
-                if year > index.year_max:
-                    index.year_max = year
-
-    index.topic_counts = dict(topic_counter)
-    index.statute_counts = dict(statute_counter)
-    index.total_opinions = len(index.opinions)
-
-    # Handle edge case where no opinions were loaded
-    if index.total_opinions == 0:
-        index.year_min = 0
-        index.year_max = 0
+        files = []
+        for file_entry in os.scandir(entry.path):
+            if file_entry.name.endswith(".json") and file_entry.is_file():
+                st = file_entry.stat()
+                files.append((file_entry.name, st.st_size, st.st_mtime_ns))
+        listing[entry.name] = sorted(files)
+    return listing
+
+
+def _fingerprint(files: list[tuple[str, int, int | str]]) -> str:
+    digest = hashlib.sha256()
+    for name, size, stamp in files:
+        digest.update(f"{name}\0{size}\0{stamp}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def _content_fingerprint(dir_path: str, files: list[tuple[str, int, int]]) -> str:
+    """_fingerprint() of a directory's files by size and content hash.
+
+    Unlike the listing's mtimes, it survives a fresh checkout or an image
+    copy of the same files.
+    """
+    hashed = []
+    for name, size, _ in files:
+        with open(os.path.join(dir_path, name), "rb") as f:
+            hashed.append((name, size, hashlib.sha256(f.read()).hexdigest()))
+    return _fingerprint(hashed)
+
+
+def file_fingerprints(paths: Iterable[str]) -> dict[str, str]:
+    """Per-directory content fingerprints of data files, as the metadata keys them."""
+    by_dir: dict[str, list[tuple[str, int, int]]] = {}
+    for path in paths:
+        st = os.stat(path)
+        by_dir.setdefault(os.path.dirname(path), []).append(
+            (os.path.basename(path), st.st_size, st.st_mtime_ns))
+    return {os.path.basename(d): _content_fingerprint(d, sorted(files))
+            for d, files in sorted(by_dir.items())}
+
+
+def fingerprints_version(fingerprints: dict[str, str]) -> str:
+    """Short hash of per-year fingerprints: the MetadataIndex.version of that data."""
+    return hashlib.sha256(
+        json.dumps(fingerprints, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+def _read_manifest(snapshot_dir: str, data_dir: str) -> dict | None:
+    """The snapshot manifest, or None if absent or written for other data."""
+    try:
+        with open(os.path.join(snapshot_dir, "manifest.json"), "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (manifest.get("format") != SNAPSHOT_FORMAT
+            or manifest.get("version") != SNAPSHOT_VERSION
+            or manifest.get("data_dir") != os.path.abspath(data_dir)):
+        return None
+    return manifest
+
+
+def _shard_path(snapshot_dir: str, year: str) -> str:
+    return os.path.join(snapshot_dir, "years", f"{year}.json.z")
+
+
+def _read_shard(snapshot_dir: str, year: str) -> list[tuple[str, OpinionMeta]] | None:
+    try:
+        with open(_shard_path(snapshot_dir, year), "rb") as f:
+            return [tuple(pair) for pair in json.loads(zlib.decompress(f.read()))]
+    except (OSError, ValueError, zlib.error):
+        return None
+
+
+def _write_shard(snapshot_dir: str, year: str,
+                 records: list[tuple[str, OpinionMeta]]) -> None:
+    path = _shard_path(snapshot_dir, year)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(zlib.compress(json.dumps(records).encode("utf-8"), 1))
+    os.replace(tmp, path)
+
+
+def _parse_years(data_dir: str, listing: dict[str, list],
+                 years: list[str]) -> dict[str, list[tuple[str, OpinionMeta]]]:
+    """Parse the given year directories, across processes when it pays off."""
+    paths = [os.path.join(data_dir, year) for year in years]
+    filenames = [[name for name, _, _ in listing[year]] for year in years]
+    n_files = sum(len(names) for names in filenames)
+    workers = min(os.cpu_count() or 1, len(years))
+    if workers > 1 and n_files >= _PARALLEL_MIN_FILES:
+        try:
+            # spawn: the caller may be a pre-fork parent with live threads
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            ) as pool:
+                return dict(zip(years, pool.map(_read_year, paths, filenames)))
+        except (OSError, BrokenProcessPool) as e:
+            logger.warning("Parallel metadata parse failed (%s); parsing serially", e)
+    return {year: _read_year(p, names)
+            for year, p, names in zip(years, paths, filenames)}
+
+
+def _write_manifest(snapshot_dir: str, data_dir: str, fingerprints: dict[str, str],
+                    listings: dict[str, str]) -> None:
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "data_dir": os.path.abspath(data_dir),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "years": fingerprints,
+        "listings": listings,
+    }
+    path = os.path.join(snapshot_dir, "manifest.json")
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _write_snapshot(snapshot_dir: str, data_dir: str, fingerprints: dict[str, str],
+                    listings: dict[str, str], index: MetadataIndex,
+                    shards: dict[str, list[tuple[str, OpinionMeta]]]) -> None:
+    """Write changed shards and the columns, then the manifest that covers them.
+
+    The manifest goes last, so a partial write never matches on the next boot.
+    """
+    os.makedirs(os.path.join(snapshot_dir, "years"), exist_ok=True)
+    for year, records in shards.items():
+        _write_shard(snapshot_dir, year, records)
+    for filename in os.listdir(os.path.join(snapshot_dir, "years")):
+        if filename.removesuffix(".json.z") not in fingerprints:
+            os.remove(os.path.join(snapshot_dir, "years", filename))
+    index.save(os.path.join(snapshot_dir, "index.npz"))
+    _write_manifest(snapshot_dir, data_dir, fingerprints, listings)
+
+
+def build_metadata_index(data_dir: str = _DATA_DIR,
+                         snapshot_dir: str | None = _SNAPSHOT_DIR) -> MetadataIndex:
+    """Walk data/extracted/{year}/{id}.json and build an in-memory index.
+
+    With a snapshot_dir, an unchanged corpus is loaded from the snapshot and
+    only changed year directories are re-parsed; None always parses everything.
+    """
+    t0 = time.time()
+
+    if not os.path.isdir(data_dir):
+        logger.warning("Data directory not found: %s", data_dir)
+        return MetadataIndex()
+
+    listing = _scan(data_dir)
+    listings = {year: _fingerprint(files) for year, files in listing.items()}
+    manifest = _read_manifest(snapshot_dir, data_dir) if snapshot_dir else None
+
+    # Only directories whose listing changed are re-hashed
+    known = manifest["years"] if manifest is not None else {}
+    known_listings = manifest["listings"] if manifest is not None else {}
+    fingerprints = {}
+    for year, files in listing.items():
+        if year in known and known_listings.get(year) == listings[year]:
+            fingerprints[year] = known[year]
+        else:
+            fingerprints[year] = _content_fingerprint(
+                os.path.join(data_dir, year), files)
+    version = fingerprints_version(fingerprints)
+
+    if manifest is not None and manifest["years"] == fingerprints:
+        try:
+            index = MetadataIndex.load(os.path.join(snapshot_dir, "index.npz"))
+        except (OSError, ValueError, KeyError):
+            logger.warning("Unreadable metadata snapshot in %s; rebuilding",
+                           snapshot_dir)
+        else:
+            index.version = version
+            if known_listings != listings:  # touched, not changed
+                try:
+                    _write_manifest(snapshot_dir, data_dir, fingerprints, listings)
+                except OSError as e:
+                    logger.warning("Could not update metadata snapshot "
+                                   "manifest in %s: %s", snapshot_dir, e)
+            logger.info("Metadata index loaded from snapshot in %.2fs: "
+                        "%d opinions", time.time() - t0, index.total_opinions)
+            return index
+
+    # Reuse the shards of unchanged years; parse the rest
+    by_year: dict[str, list[tuple[str, OpinionMeta]] | None] = {
+        year: _read_shard(snapshot_dir, year)
+        if known.get(year) == fingerprint else None
+        for year, fingerprint in fingerprints.items()
+    }
+    stale = [year for year, records in by_year.items() if records is None]
+    parsed = _parse_years(data_dir, listing, stale)
+    by_year.update(parsed)
+
+    records: dict[str, OpinionMeta] = {}
+    for year in listing:
+        for opinion_id, meta in by_year[year]:
+            records[opinion_id] = meta
+    index = MetadataIndex.from_records(records)
+    index.version = version
+
+    if snapshot_dir:
+        try:
+            _write_snapshot(snapshot_dir, data_dir, fingerprints, listings,
+                            index, parsed)
+        except OSError as e:
+            logger.warning("Could not write metadata snapshot to %s: %s",
+                           snapshot_dir, e)
 
     elapsed = time.time() - t0
     logger.info(
-        "Metadata index built in %.1fs: %d opinions, years %d–%d",
+        "Metadata index built in %.1fs (%d of %d year dirs parsed): "
+        "%d opinions, %d citation edges, years %d–%d, %.1f MB columns",
         elapsed,
+        len(stale),
+        len(listing),
         index.total_opinions,
+        index.citations.n_edges,
         index.year_min,
         index.year_max,
+        index.nbytes / 2**20,
     )
     return index
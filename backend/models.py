@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class SearchResult(BaseModel):
@@ -27,6 +27,80 @@ class SearchResponse(BaseModel):
     filters_applied: dict
 
 
+class BatchSearchRequest(BaseModel):
+    queries: list[str] = Field(..., min_length=1, max_length=256)
+    top_k: int = Field(20, ge=1, le=100)
+    topic: list[str] | None = None
+    statute: str | None = None
+    regulation: str | None = None
+    document_type: list[str] | None = None
+    year_start: int | None = None
+    year_end: int | None = None
+
+
+class BatchSearchItem(BaseModel):
+    query: str
+    total_results: int
+    results: list[SearchResult]
+
+
+class BatchSearchResponse(BaseModel):
+    results: list[BatchSearchItem]
+    filters_applied: dict
+
+
+class OpinionSummary(BaseModel):
+    opinion_id: str
+    opinion_number: str
+    date: str | None
+    year: int
+    question: str | None
+    conclusion: str | None
+    topics: list[str]
+    statutes: list[str]
+    document_type: str | None
+
+
+class CitationNode(OpinionSummary):
+    hops: int
+
+
+class CitationNeighborhood(BaseModel):
+    opinion_id: str
+    direction: str
+    hops: int
+    total: int
+    nodes: list[CitationNode]
+
+
+class CitationPath(BaseModel):
+    source: str
+    target: str
+    direction: str
+    hops: int | None
+    path: list[OpinionSummary]
+
+
+class CoCitedOpinion(OpinionSummary):
+    count: int
+
+
+class CoCitationResponse(BaseModel):
+    opinion_id: str
+    citing_opinions: int
+    total: int
+    results: list[CoCitedOpinion]
+
+
+class OpinionBatchRequest(BaseModel):
+    ids: list[str] = Field(..., min_length=1, max_length=1000)
+
+
+class OpinionBatchResponse(BaseModel):
+    opinions: list[OpinionSummary]
+    missing: list[str]
+
+
 class CitedOpinion(BaseModel):
     opinion_number: str
     exists_in_corpus: bool
@@ -0,0 +1,174 @@
+"""
+Rendered opinion details, shared by GET /api/opinions/{id} and the MCP
+get_opinion tool.
+
+Rendering reads the served record (corpus store or JSON file), resolves the
+cited-opinion lists against the metadata index and validates OpinionDetail.
+The serialized JSON bytes are kept in a byte-budgeted LRU, so repeat requests
+for popular opinions skip all of that. The cache is cleared whenever the
+app (re)loads its data.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import urllib.parse
+from collections import OrderedDict
+
+from backend.config import settings
+from backend.corpus import CorpusStore, read_opinion
+from backend.metadata import MetadataIndex
+from backend.models import CitedOpinion, OpinionDetail
+
+logger = logging.getLogger(__name__)
+
+
+class DetailCache:
+    """LRU of opinion id → rendered JSON bytes, bounded by total size."""
+
+    def __init__(self, max_bytes: int = 64 * 2**20):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, opinion_id: str) -> bytes | None:
+        with self._lock:
+            body = self._entries.get(opinion_id)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(opinion_id)
+            self.hits += 1
+            return body
+
+    def put(self, opinion_id: str, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return  # would evict everything else
+        with self._lock:
+            old = self._entries.pop(opinion_id, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[opinion_id] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+detail_cache = DetailCache(settings.detail_cache_bytes)
+
+
+def opinion_detail_json(opinion_id: str, metadata: MetadataIndex,
+                        corpus: CorpusStore | None) -> bytes | None:
+    """Serialized OpinionDetail for an opinion, or None if it is unknown.
+
+    Raises OSError or ValueError when the opinion's record cannot be read.
+    """
+    body = detail_cache.get(opinion_id)
+    if body is not None:
+        return body
+    meta = metadata.opinions.get(opinion_id)
+    if meta is None:
+        return None
+    data = read_opinion(opinion_id, meta, corpus)
+    body = render_opinion(opinion_id, data, metadata).model_dump_json().encode("utf-8")
+    detail_cache.put(opinion_id, body)
+    return body
+
+
+def render_opinion(opinion_id: str, data: dict,
+                   metadata: MetadataIndex) -> OpinionDetail:
+    """Build the OpinionDetail response from an opinion's served record."""
+    sections = data.get("sections", {})
+    citations = data.get("citations", {})
+    classification = data.get("classification", {})
+    parsed = data.get("parsed", {})
+    extraction = data.get("extraction", {})
+
+    # Question/conclusion/facts/analysis with synthetic fallbacks
+    question = sections.get("question") or sections.get("question_synthetic")
+    conclusion = sections.get("conclusion") or sections.get("conclusion_synthetic")
+    facts = sections.get("facts")
+    analysis = sections.get("analysis")
+
+    # Build PDF URL
+    pdf_url = _build_pdf_url(data)
+
+    # Build cited opinion lists with corpus existence check
+    prior_opinions = [
+        CitedOpinion(
+            opinion_number=op_id,
+            exists_in_corpus=op_id in metadata.opinions,
+        )
+        for op_id in citations.get("prior_opinions", [])
+    ]
+    cited_by = [
+        CitedOpinion(
+            opinion_number=op_id,
+            exists_in_corpus=op_id in metadata.opinions,
+        )
+        for op_id in citations.get("cited_by", [])
+    ]
+
+    return OpinionDetail(
+        id=opinion_id,
+        opinion_number=opinion_id,
+        date=parsed.get("date"),
+        year=data.get("year", 0),
+        requestor_name=parsed.get("requestor_name"),
+        requestor_title=parsed.get("requestor_title"),
+        requestor_city=parsed.get("requestor_city"),
+        document_type=parsed.get("document_type"),
+        question=question,
+        conclusion=conclusion,
+        facts=facts,
+        analysis=analysis,
+        topic_primary=classification.get("topic_primary"),
+        topic_secondary=classification.get("topic_secondary"),
+        topic_tags=classification.get("topic_tags", []),
+        government_code_sections=citations.get("government_code", []),
+        regulations=citations.get("regulations", []),
+        prior_opinions=prior_opinions,
+        cited_by=cited_by,
+        pdf_url=pdf_url,
+        page_count=extraction.get("page_count"),
+        word_count=extraction.get("word_count"),
+        has_standard_format=sections.get("has_standard_format"),
+    )
+
+
+def _build_pdf_url(data: dict) -> str | None:
+    """Construct R2 PDF URL, falling back to the FPPC source URL."""
+    local_pdf_path = data.get("local_pdf_path")
+    if settings.r2_pdf_base_url and local_pdf_path:
+        # Strip "raw_pdfs/" prefix, URL-encode (preserve slashes)
+        relative = local_pdf_path.removeprefix("raw_pdfs/")
+        encoded = urllib.parse.quote(relative, safe="/")
+        return f"{settings.r2_pdf_base_url.rstrip('/')}/{encoded}"
+    # Fallback to FPPC website URL
+    return data.get("pdf_url")
@@ -0,0 +1,138 @@
+"""Pre-fork server: load indexes once, then fork uvicorn workers that share them.
+
+`uvicorn --workers N` spawns fresh interpreters, so every worker repeats the
+engine and metadata load and holds a private copy. Here the parent process
+loads both, freezes the GC (so collections don't write to inherited object
+headers), binds the listening socket and forks the workers. Workers inherit
+the loaded state copy-on-write; the memory-mapped index arrays are shared
+through the page cache regardless. Crashed workers are replaced; workers
+that keep dying right after start are restarted with a growing delay, and
+the server gives up after a few such exits in a row.
+
+Usage: python -m backend.prefork --port 8000 --workers 4   (from project root)
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+_QUICK_EXIT_S = 10.0  # a worker exiting sooner than this died at startup
+_MAX_QUICK_EXITS = 5  # consecutive startup deaths before giving up
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _spawn(app, sock: socket.socket, args: argparse.Namespace) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+    # Child: never return into the parent's supervision loop, even on error
+    code = 1
+    try:
+        # uvicorn installs its own SIGINT/SIGTERM handlers in run()
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        config = uvicorn.Config(app, host=args.host, port=args.port,
+                                log_level=args.log_level, proxy_headers=True)
+        server = uvicorn.Server(config)
+        server.run(sockets=[sock])
+        code = 0 if server.started else 3
+    except BaseException:
+        logger.exception("Worker %d failed", os.getpid())
+    finally:
+        logging.shutdown()
+        os._exit(code)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=settings.port)
+    parser.add_argument("--workers", type=int, default=settings.workers)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    from backend.main import app, preload
+
+    preload()
+    sock = _bind(args.host, args.port)
+    # Everything allocated so far is long-lived and shared with the workers
+    gc.collect()
+    gc.freeze()
+
+    workers: dict[int, float] = {}  # pid → start time
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(max(args.workers, 1)):
+        workers[_spawn(app, sock, args)] = time.monotonic()
+    logger.info("Pre-fork server: %d workers on %s:%d",
+                len(workers), args.host, args.port)
+
+    quick_exits = 0
+    exit_code = 0
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = workers.pop(pid, None)
+        if stopping or started is None:
+            continue
+        if time.monotonic() - started < _QUICK_EXIT_S:
+            quick_exits += 1
+        else:
+            quick_exits = 0
+        if quick_exits >= _MAX_QUICK_EXITS:
+            logger.error("Workers keep exiting at startup (last: %d, status "
+                         "%d); shutting down", pid, status)
+            exit_code = 1
+            stop(None, None)
+            continue
+        delay = min(2 ** quick_exits, 30) if quick_exits else 1
+        logger.warning("Worker %d exited (status %d); restarting in %ds",
+                       pid, status, delay)
+        time.sleep(delay)
+        if not stopping:
+            workers[_spawn(app, sock, args)] = time.monotonic()
+
+    sock.close()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""GET /api/citations/... — citation graph traversals (neighborhood, path, co-citation)."""
+
+from __future__ import annotations
+
+from typing import Literal
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response
+
+from backend.config import settings
+from backend.http_cache import cache_headers, etag_for, not_modified
+from backend.metadata import MetadataIndex
+from backend.models import (
+    CitationNeighborhood,
+    CitationNode,
+    CitationPath,
+    CoCitationResponse,
+    CoCitedOpinion,
+)
+from backend.services import opinion_summary
+
+router = APIRouter(prefix="/api/citations", tags=["citations"])
+
+Direction = Literal["cites", "cited_by", "both"]
+
+
+def _row(metadata: MetadataIndex, opinion_id: str) -> int:
+    row = metadata.row(opinion_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Opinion '{opinion_id}' not found")
+    return row
+
+
+def _cached(request: Request, render) -> Response:
+    etag = etag_for(request)
+    policy = settings.cache_control_opinions
+    cached = not_modified(request, etag, policy)
+    if cached is not None:
+        return cached
+    return Response(content=render().model_dump_json(), media_type="application/json",
+                    headers=cache_headers(etag, policy))
+
+
+@router.get("/path", response_model=CitationPath)
+def citation_path(
+    request: Request,
+    source: str = Query(..., description="Opinion id to start from"),
+    target: str = Query(..., description="Opinion id to reach"),
+    direction: Direction = Query("both", description="Edges to follow from source"),
+    max_hops: int = Query(6, ge=1, le=12),
+):
+    metadata = request.app.state.metadata
+    source_row, target_row = _row(metadata, source), _row(metadata, target)
+
+    def render():
+        rows = metadata.citations.shortest_path(source_row, target_row,
+                                                direction, max_hops)
+        return CitationPath(
+            source=source,
+            target=target,
+            direction=direction,
+            hops=None if rows is None else len(rows) - 1,
+            path=[opinion_summary(metadata.ids[r], metadata.meta(r))
+                  for r in rows or []],
+        )
+
+    return _cached(request, render)
+
+
+@router.get("/{opinion_id}/neighborhood", response_model=CitationNeighborhood)
+def citation_neighborhood(
+    opinion_id: str,
+    request: Request,
+    hops: int = Query(2, ge=1, le=6),
+    direction: Direction = Query("both", description="cites: opinions it cites, "
+                                 "cited_by: opinions citing it, both: either"),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    metadata = request.app.state.metadata
+    row = _row(metadata, opinion_id)
+
+    def render():
+        rows, dist = metadata.citations.neighborhood([row], hops, direction)
+        return CitationNeighborhood(
+            opinion_id=opinion_id,
+            direction=direction,
+            hops=hops,
+            total=len(rows),
+            nodes=[
+                opinion_summary(metadata.ids[r], metadata.meta(r), CitationNode, hops=d)
+                for r, d in zip(rows[:limit].tolist(), dist[:limit].tolist())
+            ],
+        )
+
+    return _cached(request, render)
+
+
+@router.get("/{opinion_id}/co-cited", response_model=CoCitationResponse)
+def co_cited(
+    opinion_id: str,
+    request: Request,
+    limit: int = Query(20, ge=1, le=1000),
+):
+    metadata = request.app.state.metadata
+    row = _row(metadata, opinion_id)
+
+    def render():
+        graph = metadata.citations
+        rows, counts = graph.co_cited(row)
+        return CoCitationResponse(
+            opinion_id=opinion_id,
+            citing_opinions=len(graph.cited_by(row)),
+            total=len(rows),
+            results=[
+                opinion_summary(metadata.ids[r], metadata.meta(r), CoCitedOpinion, count=n)
+                for r, n in zip(rows[:limit].tolist(), counts[:limit].tolist())
+            ],
+        )
+
+    return _cached(request, render)
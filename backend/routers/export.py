@@ -0,0 +1,129 @@
+"""GET /api/export — stream matching opinions as NDJSON."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections.abc import AsyncIterator
+
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from backend.corpus import read_opinion
+from backend.middleware import check_rate_limit
+from backend.models import OpinionDetail
+from backend.opinion_detail import render_opinion
+from backend.search.filters import SearchFilters
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api", tags=["export"])
+
+# Served from the in-memory metadata index; any other OpinionDetail field
+# needs the opinion's full record
+META_FIELDS = (
+    "opinion_number", "date", "year", "question", "conclusion",
+    "topic_primary", "topic_secondary", "government_code_sections",
+    "regulations", "document_type",
+)
+DETAIL_FIELDS = tuple(f for f in OpinionDetail.model_fields if f != "id")
+
+# Opinions rendered per worker-thread hop; bounds memory per stream
+EXPORT_CHUNK = 64
+
+
+@router.get("/export", dependencies=[Depends(check_rate_limit)])
+async def export(
+    request: Request,
+    q: str = Query("", description="Search query; empty exports every match in index order"),
+    topic: list[str] | None = Query(None, description="Filter by topic_primary (repeatable)"),
+    statute: str | None = Query(None, description="Filter by government code section"),
+    regulation: str | None = Query(None, description="Filter by regulation section"),
+    document_type: list[str] | None = Query(None, description="Filter by document type (repeatable)"),
+    year_start: int | None = Query(None, description="Filter by minimum year"),
+    year_end: int | None = Query(None, description="Filter by maximum year"),
+    fields: list[str] | None = Query(None, description="Fields per line (repeatable or comma-separated)"),
+    limit: int | None = Query(None, ge=1, description="Maximum number of opinions"),
+):
+    selected = _parse_fields(fields)
+    filters = SearchFilters(
+        topics=topic or (),
+        statute=statute,
+        regulation=regulation,
+        year_start=year_start,
+        year_end=year_end,
+        document_types=document_type or (),
+    )
+    metadata = request.app.state.metadata
+
+    query = q.strip()
+    if query:
+        # Rank every match: the export has no page cap
+        try:
+            ranking = await request.app.state.engine.asearch_ranked(
+                query, top_k=max(metadata.total_opinions, 1), filters=filters
+            )
+        except Exception:
+            logger.exception("Search engine error for export query: %s", query)
+            raise HTTPException(status_code=500, detail="Search failed")
+        ids = ranking.ids
+    else:
+        mask = request.app.state.metadata_filters.mask(filters)
+        ids = metadata.ids if mask is None else [
+            metadata.ids[row] for row in np.flatnonzero(mask)
+        ]
+    if limit is not None:
+        ids = ids[:limit]
+
+    logger.info("export query=%r opinions=%d fields=%s", query, len(ids),
+                ",".join(selected))
+    return StreamingResponse(
+        _stream(ids, selected, metadata, request.app.state.corpus),
+        media_type="application/x-ndjson",
+    )
+
+
+def _parse_fields(fields: list[str] | None) -> list[str]:
+    if not fields:
+        return list(META_FIELDS)
+    selected = [f.strip() for value in fields for f in value.split(",") if f.strip()]
+    unknown = sorted(set(selected) - set(DETAIL_FIELDS) - {"id"})
+    if unknown:
+        raise HTTPException(status_code=422,
+                            detail=f"Unknown export field(s): {', '.join(unknown)}")
+    return [f for f in dict.fromkeys(selected) if f != "id"]
+
+
+async def _stream(ids: list[str], selected: list[str], metadata,
+                  corpus) -> AsyncIterator[bytes]:
+    """NDJSON lines, EXPORT_CHUNK opinions at a time off the event loop."""
+    from_meta = set(selected) <= set(META_FIELDS)
+    for start in range(0, len(ids), EXPORT_CHUNK):
+        chunk = ids[start:start + EXPORT_CHUNK]
+        yield await asyncio.to_thread(
+            _render_chunk, chunk, selected, from_meta, metadata, corpus
+        )
+
+
+def _render_chunk(ids: list[str], selected: list[str], from_meta: bool,
+                  metadata, corpus) -> bytes:
+    lines = []
+    for opinion_id in ids:
+        meta = metadata.opinions.get(opinion_id)
+        if meta is None:
+            continue
+        if from_meta:
+            record = {"id": opinion_id, **{f: meta[f] for f in selected}}
+        else:
+            try:
+                data = read_opinion(opinion_id, meta, corpus)
+            except (OSError, ValueError):
+                logger.exception("Failed to load opinion data: %s", opinion_id)
+                record = {"id": opinion_id, "error": "Failed to load opinion data"}
+            else:
+                detail = render_opinion(opinion_id, data, metadata).model_dump()
+                record = {"id": opinion_id, **{f: detail[f] for f in selected}}
+        lines.append(json.dumps(record, ensure_ascii=False))
+    return ("\n".join(lines) + "\n").encode("utf-8") if lines else b""
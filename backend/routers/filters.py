@@ -1,7 +1,11 @@
 """GET /api/filters — pre-computed filter aggregations."""
 
 from fastapi import APIRouter, Request
+from fastapi.responses import Response
 
+from backend.config import settings
+from backend.http_cache import cache_headers, etag_for, not_modified
+from backend.metadata import MetadataIndex
 from backend.models import FilterOption, FiltersResponse
 
 router = APIRouter(prefix="/api", tags=["filters"])
@@ -9,7 +13,19 @@ router = APIRouter(prefix="/api", tags=["filters"])
 
 @router.get("/filters", response_model=FiltersResponse)
 async def get_filters(request: Request):
-    metadata = request.app.state.metadata
+    # The body only depends on the loaded metadata: rendered once at startup
+    etag = etag_for(request)
+    policy = settings.cache_control_filters
+    cached = not_modified(request, etag, policy)
+    if cached is not None:
+        return cached
+    return Response(content=request.app.state.filters_body,
+                    media_type="application/json",
+                    headers=cache_headers(etag, policy))
+
+
+def render_filters(metadata: MetadataIndex) -> bytes:
+    """Serialized FiltersResponse for a metadata index."""
 
     # Topics: sorted by count desc, exclude None, human-readable labels
     topics = [
@@ -41,4 +57,4 @@ async def get_filters(request: Request):
         year_min=metadata.year_min,
         year_max=metadata.year_max,
         total_opinions=metadata.total_opinions,
-    )
+    ).model_dump_json().encode("utf-8")
@@ -1,101 +1,66 @@
-"""GET /api/opinions/{opinion_id} — full opinion detail."""
+"""GET /api/opinions/{opinion_id} — full opinion detail; /api/opinions/batch — summaries."""
 
 from __future__ import annotations
 
-import json
 import logging
-import urllib.parse
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response
 
 from backend.config import settings
-from backend.models import CitedOpinion, OpinionDetail
+from backend.http_cache import cache_headers, etag_for, not_modified
+from backend.models import OpinionBatchRequest, OpinionBatchResponse, OpinionDetail
+from backend.opinion_detail import opinion_detail_json
+from backend.services import MAX_BATCH_IDS, opinion_summaries
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["opinions"])
 
 
-@router.get("/opinions/{opinion_id}", response_model=OpinionDetail)
-def get_opinion(opinion_id: str, request: Request):
-    metadata = request.app.state.metadata
-    meta = metadata.opinions.get(opinion_id)
-    if meta is None:
-        raise HTTPException(status_code=404, detail="Opinion not found")
-
-    # Load full JSON
-    try:
-        with open(meta["file_path"], "r") as f:
-            data = json.load(f)
-    except (OSError, json.JSONDecodeError):
-        logger.exception("Failed to load opinion file: %s", meta["file_path"])
-        raise HTTPException(status_code=500, detail="Failed to load opinion data")
+# Declared before /opinions/{opinion_id}, which would otherwise match "batch"
+@router.get("/opinions/batch", response_model=OpinionBatchResponse)
+def get_opinions_batch(
+    request: Request,
+    ids: list[str] = Query(..., description="Opinion ids (repeatable or comma-separated)"),
+):
+    etag = etag_for(request)
+    policy = settings.cache_control_opinions
+    cached = not_modified(request, etag, policy)
+    if cached is not None:
+        return cached
 
-    sections = data.get("sections", {})
-    citations = data.get("citations", {})
-    classification = data.get("classification", {})
-    parsed = data.get("parsed", {})
-    extraction = data.get("extraction", {})
+    opinion_ids = [i.strip() for value in ids for i in value.split(",") if i.strip()]
+    if len(opinion_ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=422,
+                            detail=f"At most {MAX_BATCH_IDS} ids per request")
+    body = opinion_summaries(opinion_ids, request.app.state.metadata)
+    return Response(content=body.model_dump_json(), media_type="application/json",
+                    headers=cache_headers(etag, policy))
 
-    # Question/conclusion/facts/analysis with synthetic fallbacks
-    question = sections.get("question") or sections.get("question_synthetic")
-    conclusion = sections.get("conclusion") or sections.get("conclusion_synthetic")
-    facts = sections.get("facts")
-    analysis = sections.get("analysis")
 
-    # Build PDF URL
-    pdf_url = _build_pdf_url(data)
+@router.post("/opinions/batch", response_model=OpinionBatchResponse)
+def post_opinions_batch(request: Request, body: OpinionBatchRequest):
+    return opinion_summaries(body.ids, request.app.state.metadata)
 
-    # Build cited opinion lists with corpus existence check
-    prior_opinions = [
-        CitedOpinion(
-            opinion_number=op_id,
-            exists_in_corpus=op_id in metadata.opinions,
-        )
-        for op_id in citations.get("prior_opinions", [])
-    ]
-    cited_by = [
-        CitedOpinion(
-            opinion_number=op_id,
-            exists_in_corpus=op_id in metadata.opinions,
-        )
-        for op_id in citations.get("cited_by", [])
-    ]
-
-    return OpinionDetail(
-        id=opinion_id,
-        opinion_number=opinion_id,
-        date=parsed.get("date"),
-        year=data.get("year", 0),
-        requestor_name=parsed.get("requestor_name"),
-        requestor_title=parsed.get("requestor_title"),
-        requestor_city=parsed.get("requestor_city"),
-        document_type=parsed.get("document_type"),
-        question=question,
-        conclusion=conclusion,
-        facts=facts,
-        analysis=analysis,
-        topic_primary=classification.get("topic_primary"),
-        topic_secondary=classification.get("topic_secondary"),
-        topic_tags=classification.get("topic_tags", []),
-        government_code_sections=citations.get("government_code", []),
-        regulations=citations.get("regulations", []),
-        prior_opinions=prior_opinions,
-        cited_by=cited_by,
-        pdf_url=pdf_url,
-        page_count=extraction.get("page_count"),
-        word_count=extraction.get("word_count"),
-        has_standard_format=sections.get("has_standard_format"),
-    )
 
+@router.get("/opinions/{opinion_id}", response_model=OpinionDetail)
+def get_opinion(opinion_id: str, request: Request):
+    etag = etag_for(request)
+    policy = settings.cache_control_opinions
+    cached = not_modified(request, etag, policy)
+    if cached is not None:
+        return cached
 
-def _build_pdf_url(data: dict) -> str | None:
-    """Construct R2 PDF URL, falling back to the FPPC source URL."""
-    local_pdf_path = data.get("local_pdf_path")
-    if settings.r2_pdf_base_url and local_pdf_path:
-        # Strip "raw_pdfs/" prefix, URL-encode (preserve slashes)
-        relative = local_pdf_path.removeprefix("raw_pdfs/")
-        encoded = urllib.parse.quote(relative, safe="/")
-        return f"{settings.r2_pdf_base_url.rstrip('/')}/{encoded}"
-    # Fallback to FPPC website URL
-    return data.get("pdf_url")
+    # Rendered bytes, usually straight from the detail cache
+    try:
+        body = opinion_detail_json(
+            opinion_id, request.app.state.metadata, request.app.state.corpus
+        )
+    except (OSError, ValueError):
+        logger.exception("Failed to load opinion data: %s", opinion_id)
+        raise HTTPException(status_code=500, detail="Failed to load opinion data")
+    if body is None:
+        raise HTTPException(status_code=404, detail="Opinion not found")
+    return Response(content=body, media_type="application/json",
+                    headers=cache_headers(etag, policy))
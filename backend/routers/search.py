@@ -1,51 +1,58 @@
-"""GET /api/search — full-text and citation search with filtering/pagination."""
+"""GET /api/search and POST /api/search/batch — full-text and citation search with filtering/pagination."""
 
 from __future__ import annotations
 
 import logging
 import time
 
-from fastapi import APIRouter, Depends, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
+from backend.config import settings
+from backend.http_cache import cache_headers, etag_for, not_modified, uncacheable
 from backend.middleware import check_rate_limit
-from backend.models import SearchResponse, SearchResult
+from backend.models import (
+    BatchSearchItem,
+    BatchSearchRequest,
+    BatchSearchResponse,
+    SearchResponse,
+)
+from backend.search.filters import SearchFilters
+from backend.services import search_page, search_results
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api", tags=["search"])
 
 
-def _truncate(text: str | None, max_len: int = 300) -> str | None:
-    if not text or len(text) <= max_len:
-        return text
-    # Truncate at last space before max_len
-    truncated = text[:max_len]
-    last_space = truncated.rfind(" ")
-    if last_space > 0:
-        truncated = truncated[:last_space]
-    return truncated + "..."
-
-
 @router.get("/search", response_model=SearchResponse, dependencies=[Depends(check_rate_limit)])
 async def search(
     request: Request,
+    response: Response,
     q: str = Query("", description="Search query"),
     topic: list[str] | None = Query(None, description="Filter by topic_primary (repeatable)"),
     statute: str | None = Query(None, description="Filter by government code section"),
+    regulation: str | None = Query(None, description="Filter by regulation section"),
+    document_type: list[str] | None = Query(None, description="Filter by document type (repeatable)"),
     year_start: int | None = Query(None, description="Filter by minimum year"),
     year_end: int | None = Query(None, description="Filter by maximum year"),
     page: int = Query(1, ge=1, description="Page number"),
     per_page: int = Query(20, ge=1, le=100, description="Results per page"),
 ):
-    filters_applied = {}
-    if topic:
-        filters_applied["topic"] = topic
-    if statute:
-        filters_applied["statute"] = statute
-    if year_start is not None:
-        filters_applied["year_start"] = year_start
-    if year_end is not None:
-        filters_applied["year_end"] = year_end
+    filters = SearchFilters(
+        topics=topic or (),
+        statute=statute,
+        regulation=regulation,
+        year_start=year_start,
+        year_end=year_end,
+        document_types=document_type or (),
+    )
+    filters_applied = filters.applied()
+
+    etag = etag_for(request)
+    cached = not_modified(request, etag, settings.cache_control_search)
+    if cached is not None:
+        return cached
+    response.headers.update(cache_headers(etag, settings.cache_control_search))
 
     query = q.strip()
     if not query:
@@ -58,65 +65,18 @@ async def search(
             filters_applied=filters_applied,
         )
 
-    engine = request.app.state.engine
-    metadata = request.app.state.metadata
-
     t0 = time.monotonic()
 
-    # Over-fetch for post-hoc filtering; engine handles OpenAI fallback internally
-    try:
-        result_ids = engine.search(query, top_k=200)
-    except Exception:
-        logger.exception("Search engine error for query: %s", query)
-        result_ids = []
-
-    # Look up metadata and apply filters
-    filtered = []
-    for opinion_id in result_ids:
-        meta = metadata.opinions.get(opinion_id)
-        if meta is None:
-            continue
-
-        # Post-hoc filters (AND-combined)
-        if topic and meta["topic_primary"] not in topic:
-            continue
-        if statute and statute not in meta["government_code_sections"]:
-            continue
-        if year_start is not None and meta["year"] < year_start:
-            continue
-        if year_end is not None and meta["year"] > year_end:
-            continue
-
-        filtered.append((opinion_id, meta))
-
-    total_results = len(filtered)
-
-    # Paginate
-    start = (page - 1) * per_page
-    page_items = filtered[start : start + per_page]
-
-    # Build results with 1-based rank relative to full filtered list
-    results = []
-    for i, (opinion_id, meta) in enumerate(page_items, start=start + 1):
-        topics = [
-            t
-            for t in [meta["topic_primary"], meta["topic_secondary"]]
-            if t is not None
-        ]
-        results.append(
-            SearchResult(
-                opinion_id=opinion_id,
-                opinion_number=meta["opinion_number"],
-                date=meta["date"],
-                year=meta["year"],
-                question=meta["question"],
-                conclusion=_truncate(meta["conclusion"]),
-                topics=topics,
-                statutes=meta["government_code_sections"],
-                rank=i,
-                document_type=meta["document_type"],
-            )
-        )
+    # Filters are applied inside the engine before top-k selection
+    ranking = await search_page(request.app.state.engine, query, filters,
+                                page, per_page)
+    if ranking.degraded:
+        # An error or fallback page must not be revalidated as the real results
+        uncacheable(response)
+    total_results = ranking.total
+    # Build results with 1-based rank relative to the full ranking
+    results = search_results(ranking.ids, request.app.state.metadata,
+                             first_rank=(page - 1) * per_page + 1)
 
     elapsed_ms = (time.monotonic() - t0) * 1000
     logger.info("query=%r total_results=%d elapsed_ms=%.0f", query, total_results, elapsed_ms)
@@ -129,3 +89,40 @@ async def search(
         results=results,
         filters_applied=filters_applied,
     )
+
+
+@router.post("/search/batch", response_model=BatchSearchResponse,
+             dependencies=[Depends(check_rate_limit)])
+async def search_batch(request: Request, body: BatchSearchRequest):
+    """Run many queries with shared filters; scored together by the engine."""
+    filters = SearchFilters(
+        topics=body.topic or (),
+        statute=body.statute,
+        regulation=body.regulation,
+        year_start=body.year_start,
+        year_end=body.year_end,
+        document_types=body.document_type or (),
+    )
+    engine = request.app.state.engine
+    metadata = request.app.state.metadata
+
+    t0 = time.monotonic()
+    queries = [q.strip() for q in body.queries]
+    try:
+        rankings = await engine.asearch_many(queries, top_k=body.top_k,
+                                             filters=filters)
+    except Exception:
+        logger.exception("Search engine error for batch of %d queries", len(queries))
+        raise HTTPException(status_code=500, detail="Search failed")
+
+    items = [
+        BatchSearchItem(
+            query=query,
+            total_results=ranking.total,
+            results=search_results(ranking.ids, metadata),
+        )
+        for query, ranking in zip(body.queries, rankings)
+    ]
+    elapsed_ms = (time.monotonic() - t0) * 1000
+    logger.info("batch queries=%d elapsed_ms=%.0f", len(queries), elapsed_ms)
+    return BatchSearchResponse(results=items, filters_applied=filters.applied())
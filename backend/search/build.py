@@ -0,0 +1,379 @@
+"""
+Build the search index directly from data/extracted, without the pickles.
+
+The pickled indexes come from the search-lab repo; this rebuilds the same
+index format from the extracted opinion files:
+
+- BM25 over tokenize(content.full_text), one row per file in
+  opinion_files() order, with BM25Okapi's parameters and idf (including its
+  epsilon floor), so the arrays match a converted BM25FullText pickle of
+  the same corpus bit for bit.
+- gc_exact / gc_base / reg_exact citation postings from each file's
+  citations.government_code and citations.regulations.
+- the embedding matrix of embedding.qa_text. Vectors are carried over by
+  opinion id from an existing index (when it records text hashes, only for
+  unchanged text); the rest are embedded with the configured provider, or
+  left absent when none is available.
+
+Files are read and tokenized in a process pool, a chunk of files per task.
+Workers return compact per-chunk arrays (local term ids, frequencies, doc
+lengths) instead of token lists, and the parent merges chunks in file order
+as they arrive, so memory holds the postings rather than the texts and the
+output is identical for any worker count. The manifest carries the sha256
+of every array, and index_id hashes those, so an unchanged corpus rebuilds
+to the same index_id.
+
+Each row's emb_text_hash records the text its vector came from. Malformed
+files are skipped with a warning. The authority prior is not part of the
+build; it is added afterwards when the reused index has one (with the same
+damping) or with --authority.
+
+Usage: python -m backend.search.build            (from project root)
+       python -m backend.search.build --workers 4 --authority
+       python -m backend.search.build --no-reuse --no-authority --out DIR
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+
+import numpy as np
+
+from backend.config import settings
+from backend.corpus import opinion_files
+from backend.metadata import _DATA_DIR, record_id
+from backend.search.bm25 import SparseBM25
+from backend.search.embedders import EmbeddingProvider, make_embedder
+from backend.search.index_format import (
+    CITATION_TABLES, MANIFEST, IndexWriter, _write_arrays, add_authority,
+    open_index,
+)
+from backend.search.utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+# BM25Okapi defaults, as used for the search-lab pickles
+K1, B, EPSILON = 1.5, 0.75, 0.25
+_CHUNK_FILES = 256  # files per worker task
+_EMBED_BATCH = 256  # texts per embedding request
+_DEFAULT_DIM = 1536  # text-embedding-3-small, when no index to reuse from
+
+
+@dataclass
+class _Chunk:
+    """Tokenized postings of consecutive files, with chunk-local term ids."""
+
+    paths: list[str]  # files read (malformed ones are skipped), one per row
+    opinion_ids: list[str]
+    doc_len: np.ndarray  # int32 tokens per file
+    terms: list[str]  # local term id → term, in order of first appearance
+    term_col: np.ndarray  # int32 local term id per posting
+    tf_col: np.ndarray  # int32 term frequency per posting
+    doc_col: np.ndarray  # int32 file index within the chunk per posting
+    gov_code: list[list[str]]
+    regulations: list[list[str]]
+    text_hash: np.ndarray  # uint64 hash of each file's embedding text
+
+
+def text_hash(text: str) -> int:
+    """64-bit digest of an embedding text."""
+    return int.from_bytes(
+        hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _embedding_text(data: dict) -> str:
+    return (data.get("embedding") or {}).get("qa_text") or ""
+
+
+def _read_chunk(paths: list[str]) -> _Chunk:
+    """Read and tokenize files; postings follow file, then first-token order."""
+    kept, ids, doc_len, hashes, gov_code, regulations = [], [], [], [], [], []
+    posting_terms, tf_col, doc_col = [], [], []
+    for path in paths:
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            logger.warning("Skipping malformed file: %s", path)
+            continue
+        i = len(kept)
+        kept.append(path)
+        tokens = tokenize((data.get("content") or {}).get("full_text") or "")
+        counts = Counter(tokens)  # keeps first-appearance order
+        posting_terms.extend(counts)
+        tf_col.extend(counts.values())
+        doc_col.extend([i] * len(counts))
+
+        # "id": null files keep an empty id, as in the pickles and metadata
+        ids.append(record_id(data, path))
+        doc_len.append(len(tokens))
+        citations = data.get("citations") or {}
+        gov_code.append(citations.get("government_code") or [])
+        regulations.append(citations.get("regulations") or [])
+        hashes.append(text_hash(_embedding_text(data)))
+    terms = list(dict.fromkeys(posting_terms))
+    local = {term: tid for tid, term in enumerate(terms)}
+    term_col = np.fromiter(map(local.__getitem__, posting_terms), dtype=np.int32,
+                           count=len(posting_terms))
+    return _Chunk(kept, ids, np.array(doc_len, dtype=np.int32), terms,
+                  term_col, np.array(tf_col, dtype=np.int32),
+                  np.array(doc_col, dtype=np.int32), gov_code, regulations,
+                  np.array(hashes, dtype=np.uint64))
+
+
+def _read_chunks(paths: list[str], workers: int):
+    """_read_chunk() over consecutive slices of paths, yielded in order."""
+    chunks = [paths[i:i + _CHUNK_FILES] for i in range(0, len(paths), _CHUNK_FILES)]
+    if workers > 1 and len(chunks) > 1:
+        try:
+            # spawn: the caller may be a pre-fork parent with live threads
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            ) as pool:
+                yield from pool.map(_read_chunk, chunks)
+            return
+        except (OSError, BrokenProcessPool) as e:
+            logger.warning("Parallel index build failed (%s); reading serially", e)
+    for chunk in chunks:
+        yield _read_chunk(chunk)
+
+
+def _okapi_idf(doc_freq: np.ndarray, n_docs: int) -> np.ndarray:
+    """BM25Okapi's idf per term, terms in order of first appearance.
+
+    Summed in that order, like rank_bm25, so the epsilon floor for terms in
+    more than half the documents comes out identical.
+    """
+    idf = np.empty(len(doc_freq), dtype=np.float64)
+    idf_sum = 0.0
+    for tid, freq in enumerate(doc_freq.tolist()):
+        value = math.log(n_docs - freq + 0.5) - math.log(freq + 0.5)
+        idf[tid] = value
+        idf_sum += value
+    if len(idf):
+        idf[idf < 0] = EPSILON * (idf_sum / len(idf))
+    return idf
+
+
+def build_index(paths: list[str], out_dir: str, reuse_dir: str | None = None,
+                embedder: EmbeddingProvider | None = None,
+                workers: int | None = None) -> dict:
+    """Build an index of the given files into out_dir; returns the manifest.
+
+    reuse_dir: index whose embeddings are carried over by opinion id.
+    embedder: embeds the texts with no reusable vector (None leaves them out).
+    """
+    workers = workers or os.cpu_count() or 1
+    vocab: dict[str, int] = {}  # term → id in order of first appearance
+    row_paths: list[str] = []
+    opinion_ids: list[str] = []
+    doc_lens, term_cols, tf_cols, doc_cols, hashes = [], [], [], [], []
+    gov_code: list[list[str]] = []
+    regulations: list[list[str]] = []
+    for chunk in _read_chunks(paths, workers):
+        to_global = np.fromiter(
+            (vocab.setdefault(t, len(vocab)) for t in chunk.terms),
+            dtype=np.int32, count=len(chunk.terms))
+        term_cols.append(to_global[chunk.term_col])
+        tf_cols.append(chunk.tf_col)
+        doc_cols.append((chunk.doc_col + len(opinion_ids)).astype(np.int32))
+        doc_lens.append(chunk.doc_len)
+        hashes.append(chunk.text_hash)
+        row_paths.extend(chunk.paths)
+        opinion_ids.extend(chunk.opinion_ids)
+        gov_code.extend(chunk.gov_code)
+        regulations.extend(chunk.regulations)
+    if not opinion_ids:
+        raise ValueError("No opinion files to index")
+
+    def concat(parts, dtype):
+        return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+    term_col = concat(term_cols, np.int32)
+    doc_col = concat(doc_cols, np.int32)
+    tf_col = concat(tf_cols, np.int32)
+    doc_len = concat(doc_lens, np.int32)
+    n_docs = len(opinion_ids)
+    avgdl = int(doc_len.sum(dtype=np.int64)) / n_docs
+
+    # Term ids become positions in the sorted vocabulary, as in from_okapi()
+    idf = _okapi_idf(np.bincount(term_col, minlength=len(vocab)), n_docs)
+    terms = list(vocab)
+    by_term = sorted(range(len(terms)), key=terms.__getitem__)
+    position = np.empty(len(terms), dtype=np.int32)
+    position[by_term] = np.arange(len(terms), dtype=np.int32)
+    bm25 = SparseBM25.from_postings(
+        {terms[tid]: i for i, tid in enumerate(by_term)}, position[term_col],
+        doc_col, tf_col, idf[by_term], doc_len, avgdl, K1, B)
+    del term_col, doc_col, tf_col
+
+    id_to_row = {oid: row for row, oid in enumerate(opinion_ids)}
+    citations: dict[str, dict[str, set[int]]] = {t: {} for t in CITATION_TABLES}
+    for oid, sections, regs in zip(opinion_ids, gov_code, regulations):
+        row = id_to_row[oid]
+        for section in sections:
+            citations["gc_exact"].setdefault(section, set()).add(row)
+            citations["gc_base"].setdefault(section.split("(")[0], set()).add(row)
+        for reg in regs:
+            citations["reg_exact"].setdefault(reg, set()).add(row)
+    postings = {
+        table: {key: np.array(sorted(rows), dtype=np.int32)
+                for key, rows in entries.items()}
+        for table, entries in citations.items()
+    }
+
+    text_hashes = concat(hashes, np.uint64)
+    full, present, model, stats = _embeddings(row_paths, opinion_ids, text_hashes,
+                                              reuse_dir, embedder)
+
+    writer = IndexWriter(out_dir)
+    try:
+        _write_arrays(writer, opinion_ids, bm25, doc_len, full, present, postings)
+        writer.add_array("emb_text_hash", text_hashes)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.commit(
+        source="build",
+        n_docs=n_docs,
+        n_bm25_docs=n_docs,
+        bm25={"k1": K1, "b": B, "epsilon": EPSILON, "avgdl": avgdl},
+        embedding_model=model,
+        embedding_dim=int(full.shape[1]),
+        embeddings=stats,
+    )
+
+
+def _embeddings(paths: list[str], opinion_ids: list[str], text_hashes: np.ndarray,
+                reuse_dir: str | None, embedder: EmbeddingProvider | None,
+                ) -> tuple[np.ndarray, np.ndarray, str, dict]:
+    """(full, present, model, counts) of the embedding matrix; paths by row.
+
+    Rows with an empty id are never returned by the engine and get no vector.
+    """
+    source = None
+    if reuse_dir and os.path.exists(os.path.join(reuse_dir, MANIFEST)):
+        source = open_index(reuse_dir)
+    model = embedder.model if embedder is not None else ""
+    if source is not None:
+        model = source.manifest.get("embedding_model", "")
+        if embedder is not None and embedder.model != model:
+            logger.warning("Embedding provider model %s differs from the reused "
+                           "index's %s; embedding nothing", embedder.model, model)
+            embedder = None
+
+    # Rows whose vector carries over: same id and, where recorded, same text
+    reuse: dict[int, int] = {}
+    if source is not None:
+        source_row = {oid: row for row, oid in enumerate(source.opinion_ids)}
+        source_hash = None
+        if "emb_text_hash" in source.manifest["arrays"]:
+            source_hash = np.load(os.path.join(reuse_dir, "emb_text_hash.npy"))
+        for row, oid in enumerate(opinion_ids):
+            src = source_row.get(oid) if oid else None
+            if src is None or not source.has_embedding[src]:
+                continue
+            if source_hash is None or source_hash[src] == text_hashes[row]:
+                reuse[row] = src
+
+    todo = [row for row, oid in enumerate(opinion_ids) if oid and row not in reuse]
+    embedded_rows: list[int] = []
+    vectors: list[np.ndarray] = []
+    for start in range(0, len(todo) if embedder is not None else 0, _EMBED_BATCH):
+        rows, texts = [], []
+        for row in todo[start:start + _EMBED_BATCH]:
+            with open(paths[row], "r") as f:
+                text = _embedding_text(json.load(f))
+            if text:
+                rows.append(row)
+                texts.append(text)
+        if texts:
+            embedded_rows.extend(rows)
+            vectors.append(embedder.embed(texts))
+
+    if source is not None:
+        dim = int(source.manifest["embedding_dim"])
+    else:
+        dim = vectors[0].shape[1] if vectors else _DEFAULT_DIM
+    full = np.zeros((len(opinion_ids), dim), dtype=np.float32)
+    present = np.zeros(len(opinion_ids), dtype=bool)
+    if reuse:
+        rows = np.fromiter(reuse.keys(), dtype=np.int64, count=len(reuse))
+        src = np.fromiter(reuse.values(), dtype=np.int64, count=len(reuse))
+        full[rows] = source.embeddings.full[src]
+        present[rows] = True
+    if embedded_rows:
+        full[embedded_rows] = np.concatenate(vectors)
+        present[embedded_rows] = True
+
+    missing = len(todo) - len(embedded_rows)
+    if missing:
+        logger.warning("%d opinions have no embedding (no reusable vector%s)",
+                       missing, "" if embedder is None else " or empty text")
+    return full, present, model, {"reused": len(reuse),
+                                  "embedded": len(embedded_rows),
+                                  "missing": missing}
+
+
+def _read_index_manifest(path: str | None) -> dict | None:
+    if not path or not os.path.exists(os.path.join(path, MANIFEST)):
+        return None
+    with open(os.path.join(path, MANIFEST), "r") as f:
+        return json.load(f)
+
+
+def main():
+    from backend.search.engine import _INDEX_DIR, _MODEL
+
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.search.build",
+        description="Build the search index from data/extracted.")
+    parser.add_argument("--data-dir", default=_DATA_DIR)
+    parser.add_argument("--out", default=_INDEX_DIR)
+    parser.add_argument("--reuse", default=None,
+                        help="index whose embeddings are reused by opinion id "
+                             f"(default: the served index, {_INDEX_DIR})")
+    parser.add_argument("--no-reuse", action="store_true")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="tokenizer processes (default: one per core)")
+    parser.add_argument("--authority", action=argparse.BooleanOptionalAction,
+                        default=None,
+                        help="add the citation-authority prior afterwards "
+                             "(default: as the reused index has it)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    t0 = time.time()
+    paths = list(opinion_files(args.data_dir))
+    reuse = None if args.no_reuse else (args.reuse or _INDEX_DIR)
+    # Read before building: --out may be the reused index itself
+    source = _read_index_manifest(reuse)
+    dim = source["embedding_dim"] if source is not None else _DEFAULT_DIM
+    prior = source.get("authority") if source is not None else None
+    embedder = make_embedder(settings, _MODEL, dim)
+    manifest = build_index(paths, args.out, reuse, embedder, args.workers or None)
+    if args.authority or (args.authority is None and prior is not None):
+        from backend.metadata import build_metadata_index
+
+        damping = {"damping": prior["damping"]} if prior else {}
+        manifest = add_authority(args.out, build_metadata_index(args.data_dir),
+                                 **damping)
+    counts = manifest["embeddings"]
+    print(f"Wrote {args.out} (index {manifest['index_id']}, {manifest['n_docs']} "
+          f"rows; embeddings {counts['reused']} reused, {counts['embedded']} "
+          f"embedded, {counts['missing']} missing) in {time.time() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Stand-in for the OpenAI embeddings API, backed by HashEmbedder.
+
+Serves POST /v1/embeddings with the OpenAI request/response shape so the
+"http" embedding provider (and load tests of the fused search path) can run
+without network access or an API key.
+
+Usage: python -m backend.search.embed_server --port 8100 --dim 1536
+       EMBEDDING_PROVIDER=http EMBEDDING_BASE_URL=http://127.0.0.1:8100/v1 ...
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+from backend.search.embedders import HashEmbedder
+
+
+class EmbeddingRequest(BaseModel):
+    model: str
+    input: str | list[str]
+
+
+def create_app(dim: int) -> FastAPI:
+    app = FastAPI(title="Embedding stand-in")
+
+    @app.post("/v1/embeddings")
+    def embeddings(req: EmbeddingRequest):
+        texts = [req.input] if isinstance(req.input, str) else req.input
+        matrix = HashEmbedder(dim, req.model).embed(texts)
+        return {
+            "object": "list",
+            "model": req.model,
+            "data": [
+                {"object": "embedding", "index": i, "embedding": row.tolist()}
+                for i, row in enumerate(matrix)
+            ],
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--dim", type=int, default=1536)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    uvicorn.run(create_app(args.dim), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Query-embedding providers.
+
+The fusion path needs one vector per query; where it comes from is a
+deployment choice (settings.embedding_provider):
+
+- "openai": the OpenAI embeddings API (production).
+- "http":   any OpenAI-compatible /embeddings endpoint at embedding_base_url,
+            e.g. the stand-in server in backend.search.embed_server.
+- "hash":   deterministic in-process feature hashing. No network; vectors are
+            not comparable to the index embeddings, so rankings are not
+            meaningful — it exists to exercise and benchmark the fused path.
+
+MicroBatcher sits in front of a provider and coalesces concurrent single-query
+calls arriving within a short window into one embed() request.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import queue
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, InvalidStateError
+
+import numpy as np
+
+from backend.search.utils import tokenize
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
+
+
+class EmbeddingProvider(ABC):
+    """Turns texts into unit-normalized float32 vectors, one row per text."""
+
+    model: str
+
+    @abstractmethod
+    def embed(self, texts: list[str]) -> np.ndarray:
+        ...
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+    async def aembed(self, texts: list[str]) -> np.ndarray:
+        """Async embed(); the default runs embed() in a worker thread."""
+        return await asyncio.to_thread(self.embed, texts)
+
+    async def aembed_one(self, text: str) -> np.ndarray:
+        return (await self.aembed([text]))[0]
+
+
+class OpenAIEmbedder(EmbeddingProvider):
+    """OpenAI (or OpenAI-compatible, via base_url) embeddings endpoint."""
+
+    def __init__(self, model: str, api_key: str, base_url: str | None = None,
+                 timeout: float = 10.0, http_client=None):
+        from openai import OpenAI
+
+        self.model = model
+        self._client_args = {"api_key": api_key, "base_url": base_url,
+                             "timeout": timeout}
+        self._client = OpenAI(**self._client_args, http_client=http_client)
+        self._async_client = None
+        self._async_pid = None
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        resp = self._client.embeddings.create(model=self.model, input=texts)
+        return self._to_matrix(resp)
+
+    async def aembed(self, texts: list[str]) -> np.ndarray:
+        # Created on first use in each worker, inside its event loop
+        if self._async_pid != os.getpid():
+            from openai import AsyncOpenAI
+
+            self._async_client = AsyncOpenAI(**self._client_args)
+            self._async_pid = os.getpid()
+        resp = await self._async_client.embeddings.create(model=self.model,
+                                                          input=texts)
+        return self._to_matrix(resp)
+
+    @staticmethod
+    def _to_matrix(resp) -> np.ndarray:
+        data = sorted(resp.data, key=lambda d: d.index)
+        matrix = np.array([d.embedding for d in data], dtype=np.float32)
+        return _normalize_rows(matrix)
+
+
+class HashEmbedder(EmbeddingProvider):
+    """Deterministic signed feature hashing of query tokens (no network)."""
+
+    def __init__(self, dim: int, model: str | None = None):
+        self.dim = dim
+        self.model = model or f"hash-{dim}"
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for token in tokenize(text):
+                digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+                h = int.from_bytes(digest, "little")
+                matrix[i, h % self.dim] += 1.0 if h >> 63 else -1.0
+        return _normalize_rows(matrix)
+
+
+class MicroBatcher(EmbeddingProvider):
+    """Coalesces concurrent embed_one() calls into batched provider requests.
+
+    The first waiting query opens a window of `window` seconds; everything
+    that arrives before it closes (up to max_batch) shares one request. The
+    worker thread is started lazily per process, so batchers built before
+    the pre-fork server forks work in each worker.
+    """
+
+    def __init__(self, provider: EmbeddingProvider, window: float = 0.005,
+                 max_batch: int = 64):
+        self.provider = provider
+        self.model = provider.model
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker_pid = None
+        self.batches = 0
+        self.batched_texts = 0
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        return self.provider.embed(texts)
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self._submit(text).result()
+
+    async def aembed_one(self, text: str) -> np.ndarray:
+        return await asyncio.wrap_future(self._submit(text))
+
+    def _submit(self, text: str) -> Future:
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def _ensure_worker(self) -> None:
+        if self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker_pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, args=(self._queue,),
+                                 name="embedding-batcher", daemon=True).start()
+                self._worker_pid = os.getpid()
+
+    def _run(self, q: queue.Queue) -> None:
+        while True:
+            batch = [q.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(q.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # Identical texts in one window share a single input row
+            unique = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                vectors = self.provider.embed(unique)
+            except Exception as e:
+                for _, future in batch:
+                    _resolve(future, exception=e)
+                continue
+            self.batches += 1
+            self.batched_texts += len(batch)
+            rows = {text: vectors[i] for i, text in enumerate(unique)}
+            for text, future in batch:
+                _resolve(future, result=rows[text])
+
+
+def _resolve(future: Future, result=None, exception=None) -> None:
+    # The caller may have given up (async timeout cancels the future)
+    try:
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+def make_embedder(settings, default_model: str, dim: int) -> EmbeddingProvider | None:
+    """Build the configured provider, or None when it can't be used."""
+    provider = settings.embedding_provider
+    model = settings.embedding_model or default_model
+    if provider == "openai":
+        if not settings.openai_api_key:
+            print("WARNING: OPENAI_API_KEY not set. Citation-path queries "
+                  "will fall back to BM25-only.", file=sys.stderr)
+            return None
+        embedder = OpenAIEmbedder(model, settings.openai_api_key,
+                                  timeout=settings.embedding_timeout_s)
+    elif provider == "http":
+        if not settings.embedding_base_url:
+            print("WARNING: EMBEDDING_BASE_URL not set for the http embedding "
+                  "provider. Citation-path queries will fall back to "
+                  "BM25-only.", file=sys.stderr)
+            return None
+        embedder = OpenAIEmbedder(model, settings.openai_api_key or "local",
+                                  base_url=settings.embedding_base_url,
+                                  timeout=settings.embedding_timeout_s)
+    elif provider == "hash":
+        embedder = HashEmbedder(dim)
+    else:
+        raise ValueError(f"Unknown embedding provider: {provider!r}")
+
+    if settings.embedding_batch_window_ms > 0:
+        embedder = MicroBatcher(embedder, settings.embedding_batch_window_ms / 1000)
+    return embedder
@@ -0,0 +1,145 @@
+"""
+Query-embedding cache in front of the embedding API.
+
+Keys are (model, normalized query text); values are the unit-normalized
+float32 query vectors. Two tiers:
+
+- an in-process LRU (OrderedDict) bounded by entry count, and
+- an optional SQLite file that survives restarts and is shared by every
+  worker on the box (WAL mode, so readers never block on a writer).
+
+Lookups fall through memory → disk; disk hits are promoted into memory.
+The SQLite connection is opened lazily per process, so a cache created
+before the pre-fork server forks never shares a connection across workers.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """Cache key text: lowercased, with runs of whitespace collapsed."""
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    """LRU + optional SQLite cache of query embeddings, with hit/miss counters."""
+
+    def __init__(self, capacity: int = 2048, path: str | None = None):
+        self.capacity = capacity
+        self._memory: OrderedDict[tuple[str, str], np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._path = path
+        self._db = None
+        self._db_pid = None
+
+    def contains(self, model: str, text: str) -> bool:
+        """True if either tier holds the key (does not touch counters/LRU)."""
+        key = (model, normalize_query(text))
+        with self._lock:
+            if key in self._memory:
+                return True
+            return self._disk_get(key) is not None
+
+    def get(self, model: str, text: str) -> np.ndarray | None:
+        key = (model, normalize_query(text))
+        with self._lock:
+            vec = self._memory.get(key)
+            if vec is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vec
+            vec = self._disk_get(key)
+            if vec is not None:
+                self._remember(key, vec)
+                self.hits += 1
+                self.disk_hits += 1
+                return vec
+            self.misses += 1
+            return None
+
+    def put(self, model: str, text: str, vec: np.ndarray) -> None:
+        key = (model, normalize_query(text))
+        vec = np.asarray(vec, dtype=np.float32)
+        vec.setflags(write=False)
+        with self._lock:
+            self._remember(key, vec)
+            db = self._connection()
+            if db is not None:
+                try:
+                    db.execute(
+                        "INSERT OR REPLACE INTO query_embeddings VALUES (?, ?, ?)",
+                        (key[0], key[1], vec.tobytes()),
+                    )
+                    db.commit()
+                except sqlite3.Error:
+                    logger.exception("Failed to persist query embedding")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._memory),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "persistent": self._path is not None,
+            }
+
+    def _remember(self, key: tuple[str, str], vec: np.ndarray) -> None:
+        self._memory[key] = vec
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def _connection(self) -> sqlite3.Connection | None:
+        if self._path is None:
+            return None
+        if self._db_pid != os.getpid():
+            self._db_pid = os.getpid()
+            try:
+                self._db = sqlite3.connect(self._path, timeout=5.0,
+                                           check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                    " model TEXT NOT NULL, query TEXT NOT NULL,"
+                    " vector BLOB NOT NULL, PRIMARY KEY (model, query))"
+                )
+                self._db.commit()
+            except sqlite3.Error:
+                logger.exception("Embedding cache disabled on disk: %s",
+                                 self._path)
+                self._path = self._db = None
+        return self._db
+
+    def _disk_get(self, key: tuple[str, str]) -> np.ndarray | None:
+        db = self._connection()
+        if db is None:
+            return None
+        try:
+            row = db.execute(
+                "SELECT vector FROM query_embeddings WHERE model = ? AND query = ?",
+                key,
+            ).fetchone()
+        except sqlite3.Error:
+            logger.exception("Embedding cache read failed")
+            return None
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32)
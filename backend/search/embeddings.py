@@ -0,0 +1,81 @@
+"""
+Quantized embedding store for the semantic path.
+
+Vectors are kept in memory as int8 codes with one float32 scale per row
+(symmetric per-row quantization, x ≈ codes * scale), a 4× reduction over the
+float32 matrix. Similarities are only computed for the requested rows — the
+candidate pool — never the whole corpus. The best `rescore` rows of that
+coarse pass are then recomputed against the full-precision vectors, which
+are memory-mapped from the index directory so only touched rows are paged in.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+_QUANT_CHUNK = 4096  # rows quantized per step (bounds float temporaries)
+_SIM_CHUNK = 256  # rows dequantized per step (keeps the float block in cache)
+
+
+class QuantizedEmbeddings:
+    """int8 row-quantized embeddings with optional full-precision rescoring."""
+
+    def __init__(self, codes: np.ndarray, scales: np.ndarray,
+                 full: np.ndarray | None = None):
+        self.codes = codes
+        self.scales = scales
+        self.full = full
+
+    @classmethod
+    def from_dense(cls, matrix: np.ndarray) -> QuantizedEmbeddings:
+        """Quantize a dense float matrix, keeping it for rescoring."""
+        codes, scales = quantize_int8(matrix)
+        return cls(codes, scales, np.asarray(matrix, dtype=np.float32))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the coarse-pass arrays (the full matrix is not counted)."""
+        return self.codes.nbytes + self.scales.nbytes
+
+    def similarities(self, rows: np.ndarray, query_vec: np.ndarray,
+                     rescore: int = 0) -> np.ndarray:
+        """Dot products of query_vec with the given rows.
+
+        All rows get the int8 estimate; the `rescore` highest of them are
+        recomputed in full precision when the full matrix is available.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        query_vec = np.asarray(query_vec, dtype=np.float32)
+        sims = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), _SIM_CHUNK):
+            chunk = rows[start:start + _SIM_CHUNK]
+            sims[start:start + _SIM_CHUNK] = (
+                self.codes[chunk].astype(np.float32) @ query_vec)
+        sims *= self.scales[rows]
+
+        if self.full is not None and rescore > 0 and len(rows):
+            if rescore < len(rows):
+                shortlist = np.argpartition(-sims, rescore - 1)[:rescore]
+            else:
+                shortlist = np.arange(len(rows))
+            # Sorted row order keeps memory-mapped reads sequential
+            shortlist = shortlist[np.argsort(rows[shortlist])]
+            sims[shortlist] = self.full[rows[shortlist]] @ query_vec
+        return sims
+
+
+def quantize_int8(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization: matrix ≈ codes * scales[:, None]."""
+    n, dim = matrix.shape
+    codes = np.empty((n, dim), dtype=np.int8)
+    scales = np.empty(n, dtype=np.float32)
+    for start in range(0, n, _QUANT_CHUNK):
+        block = np.asarray(matrix[start:start + _QUANT_CHUNK], dtype=np.float32)
+        peak = np.abs(block).max(axis=1)
+        scale = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+        codes[start:start + len(block)] = np.rint(block / scale[:, None])
+        scales[start:start + len(block)] = scale
+    return codes, scales
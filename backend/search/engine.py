@@ -9,18 +9,37 @@ Two-path search:
 - Citation queries: build candidate pool from citation matches ∪ BM25 top-100,
   then fuse with 0.4 BM25 / 0.6 semantic using min-max normalized scores.
   Circuit breaker fires when BM25 top1/top2 ratio >= 1.3, returning BM25 only.
+  Optionally (settings.authority_weight) the fused score also adds a
+  precomputed citation-authority prior (PageRank, stored in the index).
+- Citation-only queries ("Section 87103(a)", "Reg. 18702.2") that cannot
+  be fused (no embedding provider) are ranked straight from the citation
+  postings by citation density and recency instead of by BM25, with no
+  tokenizing or BM25 pass. settings.citation_fast_path uses that ranking
+  even when fusion is available; it is off by default because the fused
+  path ranks these queries much better when an embedding is at hand.
 """
 
+import asyncio
+import fcntl
+import json
 import os
-import pickle
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 
 import numpy as np
-from openai import OpenAI
 
 from backend.config import settings
-from backend.search.interface import SearchEngine
-from backend.search.utils import tokenize, parse_query_citations
+from backend.search.embedders import EmbeddingProvider, make_embedder
+from backend.search.embedding_cache import EmbeddingCache
+from backend.search.index_format import (
+    MANIFEST, convert_pickles, open_index, pickle_sources,
+)
+from backend.search.filters import FilterIndex, SearchFilters
+from backend.search.interface import Ranking, SearchEngine
+from backend.search.result_cache import ResultCache, canonical_query_key
+from backend.search.tokenizer import Tokenizer
+from backend.search.utils import citation_only, parse_query_citations
 
 # ---------------------------------------------------------------------------
 # Paths — relative to project root (one level up from backend/)
@@ -35,24 +54,129 @@ _SEM_INDEX = os.path.join(
 _CITATION_INDEX = os.path.join(
     _PROJECT_ROOT, "indexes", "BM25CitationBoost_citation_index.pkl"
 )
+# Memory-mapped index directory (backend.search.index_format), converted from
+# the three pickles above on first start
+_INDEX_DIR = os.path.join(_PROJECT_ROOT, "indexes", "fusion")
 
-_MODEL = "text-embedding-3-small"
+_MODEL = "text-embedding-3-small"  # model the pickled embeddings were built with
 _BM25_POOL = 100  # BM25 top-N to union into candidate pool
+_SEM_RESCORE = 100  # pool members re-scored with full-precision embeddings;
+                    # fixed, not tied to top_k, so a cached ranking sliced to
+                    # a smaller top_k matches a fresh search
+_CITE_RECENCY = 1.0  # weight of recency (0–1 over the corpus years) in
+                     # citation-only rankings; density is 0–1 per citation
 
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
-def _min_max_normalize(pool: dict[str, float]) -> dict[str, float]:
+def _min_max_normalize(scores: np.ndarray) -> np.ndarray:
     """Normalize scores to [0, 1] range within a pool."""
-    if not pool:
-        return pool
-    vals = list(pool.values())
-    lo, hi = min(vals), max(vals)
+    if not len(scores):
+        return scores
+    lo, hi = scores.min(), scores.max()
     rng = hi - lo
     if rng == 0:
-        return {k: 1.0 for k in pool}
-    return {k: (v - lo) / rng for k, v in pool.items()}
+        return np.ones_like(scores)
+    return (scores - lo) / rng
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, descending; ties keep position order."""
+    if k < len(scores):
+        kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        # Every tie at the cut competes, so the selection matches a full sort
+        candidates = np.flatnonzero(scores >= kth)
+    else:
+        candidates = np.arange(len(scores))
+    order = np.argsort(-scores[candidates], kind="stable")
+    return candidates[order[:k]]
+
+
+def _authority_prior(authority: np.ndarray) -> np.ndarray:
+    """PageRank → [0, 1] prior: log of rank relative to uniform, floored at 0.
+
+    Opinions cited less than average get no boost; the long tail of heavily
+    cited ones is compressed so a few hubs don't dominate.
+    """
+    relative = np.asarray(authority, dtype=np.float64) * len(authority)
+    prior = np.log(np.maximum(relative, 1.0))
+    top = prior.max() if len(prior) else 0.0
+    return (prior / top if top > 0 else prior).astype(np.float32)
+
+
+@dataclass
+class _FusionPool:
+    """Path A candidate pool with BM25 scores, waiting for the query embedding."""
+
+    opinion_ids: list[str]  # the index's row → id table
+    rows: np.ndarray  # pool rows, ascending
+    bm25_scores: np.ndarray  # float64, aligned with rows
+    top_k: int
+
+    def ranking(self, scores: np.ndarray) -> Ranking:
+        """Top-k of the pool under scores aligned with rows."""
+        top = _top_k(scores, self.top_k)
+        ids = self.opinion_ids
+        return Ranking([ids[r] for r in self.rows[top].tolist()],
+                       scores[top].tolist(), len(self.rows))
+
+    def bm25_ranking(self) -> Ranking:
+        """BM25-only fallback when the query embedding is unavailable."""
+        return self.ranking(self.bm25_scores)._replace(degraded=True)
+
+
+def _needs_convert() -> bool:
+    """True without an index, or when it was converted from other pickles.
+
+    Indexes built from data/extracted, and converted ones whose pickles are
+    gone, are kept as they are.
+    """
+    try:
+        with open(os.path.join(_INDEX_DIR, MANIFEST), "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return True
+    pickles = (_BM25_INDEX, _SEM_INDEX, _CITATION_INDEX)
+    if (manifest.get("source") != "pickle-convert"
+            or not all(os.path.exists(p) for p in pickles)):
+        return False
+    return manifest.get("sources") != pickle_sources(*pickles)
+
+
+def _convert_once() -> None:
+    """Convert the pickles into _INDEX_DIR unless another process has.
+
+    Workers started side by side (uvicorn --workers) would otherwise all
+    convert and race on IndexWriter.commit; the first to take the lock
+    converts and the rest find its manifest once they get it.
+    """
+    os.makedirs(os.path.dirname(_INDEX_DIR), exist_ok=True)
+    with open(_INDEX_DIR + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if not _needs_convert():
+                return
+            print(f"Converting pickled indexes into {_INDEX_DIR}...")
+            convert_pickles(_BM25_INDEX, _SEM_INDEX, _CITATION_INDEX,
+                            _INDEX_DIR, _MODEL)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+@dataclass
+class _Batch:
+    """search_many() state: one slot per distinct (query, filters) key."""
+
+    queries: list[str]  # distinct queries, by slot
+    keys: list[tuple]
+    slots: list[int]  # input position → slot
+    top_k: int
+    results: list[Ranking | None]
+    pools: dict[int, _FusionPool]  # slots awaiting their query embedding
+
+    def rankings(self) -> list[Ranking]:
+        return [self.results[slot] for slot in self.slots]
 
 
 # ---------------------------------------------------------------------------
@@ -62,154 +186,558 @@ class CitationScoreFusion(SearchEngine):
     """Citation-filtered score fusion: BM25 + semantic within citation pools."""
 
     def __init__(self, cb_threshold: float = 1.3, w_bm25: float = 0.4,
-                 w_sem: float = 0.6):
+                 w_sem: float = 0.6, w_prior: float | None = None):
         self._cb_threshold = cb_threshold
         self._w_bm25 = w_bm25
         self._w_sem = w_sem
-
-        # OpenAI client for query embedding
-        api_key = settings.openai_api_key
-        self._openai_available = bool(api_key)
-        if api_key:
-            self._client = OpenAI(api_key=api_key)
-        else:
-            self._client = None
-            print("WARNING: OPENAI_API_KEY not set. Citation-path queries "
-                  "will fall back to BM25-only.", file=sys.stderr)
-
-        # Load BM25 index
-        print(f"Loading BM25 index from {_BM25_INDEX}...")
-        with open(_BM25_INDEX, "rb") as f:
-            bm25_data = pickle.load(f)
-        self._bm25_ids = bm25_data["opinion_ids"]
-        self._bm25 = bm25_data["bm25"]
-        self._bm25_id_to_idx = {oid: i for i, oid in enumerate(self._bm25_ids)}
-        print(f"  BM25: {len(self._bm25_ids)} opinions")
-
-        # Load semantic index
-        print(f"Loading semantic index from {_SEM_INDEX}...")
-        with open(_SEM_INDEX, "rb") as f:
-            sem_data = pickle.load(f)
-        self._sem_ids = sem_data["opinion_ids"]
-        self._embeddings = sem_data["embeddings"]
-        self._sem_id_to_idx = {oid: i for i, oid in enumerate(self._sem_ids)}
-        print(f"  Semantic: {len(self._sem_ids)} opinions")
-
-        # Load citation index
-        print(f"Loading citation index from {_CITATION_INDEX}...")
-        with open(_CITATION_INDEX, "rb") as f:
-            self._cite_index = pickle.load(f)
-        gc_exact = self._cite_index["gc_exact"]
-        gc_base = self._cite_index["gc_base"]
-        reg_exact = self._cite_index["reg_exact"]
-        print(f"  gc_exact entries: {len(gc_exact)}, "
-              f"gc_base entries: {len(gc_base)}, "
-              f"reg_exact entries: {len(reg_exact)}")
+        self._w_prior = (settings.authority_weight if w_prior is None
+                         else w_prior)
+
+        # Convert the search-lab pickles once (and again when they are
+        # replaced); later starts only map arrays
+        if _needs_convert():
+            _convert_once()
+
+        print(f"Loading search index from {_INDEX_DIR}...")
+        index = open_index(_INDEX_DIR)
+        self._index_version = index.version
+        self._ids = index.opinion_ids
+        self._id_to_row = {oid: i for i, oid in enumerate(self._ids)}
+
+        # BM25 postings (rows past n_bm25_docs have none and always score 0)
+        self._bm25 = index.bm25
+        self._tokenizer = Tokenizer(self._bm25.vocab)
+        print(f"  BM25: {index.manifest['n_bm25_docs']} opinions, "
+              f"{len(self._bm25.doc_ids)} postings")
+
+        # Semantic index, row-aligned with BM25
+        self._embeddings = index.embeddings
+        self._has_embedding = index.has_embedding
+        self._sem_rescore = _SEM_RESCORE
+        print(f"  Semantic: {int(self._has_embedding.sum())} opinions, "
+              f"{self._embeddings.nbytes / 2**20:.1f} MB int8")
+
+        # Citation-authority prior, row-aligned (computed offline)
+        self._prior = (_authority_prior(index.authority)
+                       if index.authority is not None else None)
+        if self._w_prior and self._prior is None:
+            print("WARNING: authority_weight is set but the index has no "
+                  "authority array (python -m backend.search.index_format "
+                  "authority); the prior is disabled.", file=sys.stderr)
+            self._w_prior = 0.0
+
+        # Query embeddings (settings.embedding_provider), cached by model
+        index_model = index.manifest.get("embedding_model", _MODEL)
+        self._embedder: EmbeddingProvider | None = make_embedder(
+            settings, index_model, index.manifest["embedding_dim"])
+        if self._embedder is not None and self._embedder.model != index_model:
+            print(f"WARNING: query embeddings from {self._embedder.model!r} "
+                  f"but the index was built with {index_model!r}; semantic "
+                  f"scores will not be meaningful.", file=sys.stderr)
+        self._embed_model = (self._embedder.model if self._embedder
+                             else index_model)
+        self._embedding_cache = EmbeddingCache(
+            settings.embedding_cache_size, settings.embedding_cache_path or None
+        )
+        self._embed_timeout = settings.embedding_timeout_s
+
+        # Ranked results, dropped whenever a different index is loaded
+        self._result_cache = ResultCache(settings.result_cache_size,
+                                         settings.result_cache_ttl_s)
+        self._result_cache.bind(self._index_version)
+
+        # Filter masks and per-row recency, built once metadata is attached
+        self._filter_index: FilterIndex | None = None
+        self._recency: np.ndarray | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._executor_pid = None
+
+        # Citation index: citation → sorted int32 rows, used in place
+        self._citations = index.citations
+        self._cite_recency = _CITE_RECENCY
+        # Citation-only rankings need the per-posting weights
+        self._cite_ranked = all(t.weights is not None
+                                for t in self._citations.values())
+        self._cite_fast = settings.citation_fast_path
+        if not self._cite_ranked:
+            print("WARNING: the index has no citation weights (python -m "
+                  "backend.search.index_format weights); citation-only "
+                  "queries take the fusion path.", file=sys.stderr)
+        # Rows kept under an empty id (null ids in the source) are masked out
+        # of every ranking; None when every row has an id
+        self._has_id = np.fromiter(map(bool, self._ids), dtype=bool,
+                                   count=len(self._ids))
+        self._id_mask = None if self._has_id.all() else self._has_id
+        print(f"  gc_exact entries: {len(self._citations['gc_exact'])}, "
+              f"gc_base entries: {len(self._citations['gc_base'])}, "
+              f"reg_exact entries: {len(self._citations['reg_exact'])}")
 
     def search(self, query: str, top_k: int = 20) -> list[str]:
-        # --- BM25 scoring (always needed) ---
-        tokens = tokenize(query)
-        if not tokens:
-            return []
-        bm25_scores = self._bm25.get_scores(tokens)
+        return self.search_ranked(query, top_k).ids
+
+    async def asearch(self, query: str, top_k: int = 20) -> list[str]:
+        return (await self.asearch_ranked(query, top_k)).ids
+
+    def attach_metadata(self, metadata) -> None:
+        """Build filter masks and recency aligned to the index rows."""
+        self._filter_index = FilterIndex.from_metadata(self._ids, metadata)
+        years = self._filter_index.years.astype(np.float64)
+        span = max(metadata.year_max - metadata.year_min, 1)
+        self._recency = np.where(
+            years > 0, np.clip((years - metadata.year_min) / span, 0.0, 1.0), 0.0)
+
+    def search_ranked(self, query: str, top_k: int = 20,
+                      filters: SearchFilters | None = None) -> Ranking:
+        key = (self._query_key(query), filters or None)
+        cached = self._result_cache.get(key, top_k)
+        if cached is not None:
+            return cached
+
+        pool = self._retrieve(query, top_k, filters)
+        if isinstance(pool, Ranking):
+            self._result_cache.put(key, top_k, pool)
+            return pool
 
-        # --- Check for citations in query ---
-        parsed = parse_query_citations(query)
-        has_citations = bool(parsed["gov_code"] or parsed["regulations"])
+        # Step 4: Embed query, compute cosine similarities for pool members
+        try:
+            query_vec = self._embed_query(query)
+        except Exception as e:
+            # Provider failure — fall back to BM25-only (not cached)
+            print(f"  [FALLBACK] Query embedding failed: {e}", file=sys.stderr)
+            return pool.bm25_ranking()
+        ranking = self._fuse(pool, query_vec)
+        self._result_cache.put(key, top_k, ranking)
+        return ranking
+
+    async def asearch_ranked(self, query: str, top_k: int = 20,
+                             filters: SearchFilters | None = None) -> Ranking:
+        """search_ranked() without blocking the event loop.
+
+        Scoring runs on a bounded thread pool; the query embedding is awaited
+        directly from the provider, with a timeout.
+        """
+        key = (self._query_key(query), filters or None)
+        cached = self._result_cache.get(key, top_k)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        executor = self._search_executor()
+        pool = await loop.run_in_executor(executor, self._retrieve, query,
+                                          top_k, filters)
+        if isinstance(pool, Ranking):
+            self._result_cache.put(key, top_k, pool)
+            return pool
 
-        if not has_citations or not self._openai_available:
-            # Path B: pure BM25, no API call
-            top_indices = bm25_scores.argsort()[::-1][:top_k]
-            return [self._bm25_ids[i] for i in top_indices if bm25_scores[i] > 0]
+        try:
+            query_vec = await asyncio.wait_for(self._aembed_query(query),
+                                               self._embed_timeout)
+        except Exception as e:
+            reason = "timed out" if isinstance(e, asyncio.TimeoutError) else e
+            print(f"  [FALLBACK] Query embedding failed: {reason}",
+                  file=sys.stderr)
+            return pool.bm25_ranking()
+        ranking = await loop.run_in_executor(executor, self._fuse, pool,
+                                             query_vec)
+        self._result_cache.put(key, top_k, ranking)
+        return ranking
+
+    def search_many(self, queries: list[str], top_k: int = 20,
+                    filters: SearchFilters | None = None) -> list[Ranking]:
+        """Rank many queries: BM25 scored as one batch, one embeddings request.
+
+        Duplicate queries are ranked once. Fusion still runs per candidate
+        pool, so citation-heavy batches gain mostly from the single
+        embeddings request.
+        """
+        batch = self._retrieve_many(queries, top_k, filters)
+        if batch.pools:
+            texts = [batch.queries[slot] for slot in batch.pools]
+            try:
+                vectors = self._embed_queries(texts)
+            except Exception as e:
+                print(f"  [FALLBACK] Batch query embedding failed: {e}",
+                      file=sys.stderr)
+                vectors = None
+            self._fuse_many(batch, vectors)
+        return batch.rankings()
+
+    async def asearch_many(self, queries: list[str], top_k: int = 20,
+                           filters: SearchFilters | None = None) -> list[Ranking]:
+        """search_many() with scoring on the thread pool and an awaited embedding."""
+        loop = asyncio.get_running_loop()
+        executor = self._search_executor()
+        batch = await loop.run_in_executor(executor, self._retrieve_many,
+                                           queries, top_k, filters)
+        if batch.pools:
+            texts = [batch.queries[slot] for slot in batch.pools]
+            try:
+                vectors = await asyncio.wait_for(self._aembed_queries(texts),
+                                                 self._embed_timeout)
+            except Exception as e:
+                reason = "timed out" if isinstance(e, asyncio.TimeoutError) else e
+                print(f"  [FALLBACK] Batch query embedding failed: {reason}",
+                      file=sys.stderr)
+                vectors = None
+            await loop.run_in_executor(executor, self._fuse_many, batch, vectors)
+        return batch.rankings()
+
+    def _retrieve_many(self, queries: list[str], top_k: int,
+                       filters: SearchFilters | None) -> _Batch:
+        """Cache lookups, batched Path B scoring and Path A candidate pools."""
+        slot_of: dict[tuple, int] = {}
+        distinct, keys, slots, encoded = [], [], [], []
+        for query, (tokens, term_ids) in zip(queries,
+                                             self._tokenizer.encode_many(queries)):
+            key = (canonical_query_key(query, tokens), filters or None)
+            if key not in slot_of:
+                slot_of[key] = len(distinct)
+                distinct.append(query)
+                keys.append(key)
+                encoded.append((tokens, term_ids))
+            slots.append(slot_of[key])
+        batch = _Batch(distinct, keys, slots, top_k,
+                       [self._result_cache.get(key, top_k) for key in keys], {})
+
+        mask = self._filter_mask(filters)
+        todo = []
+        for slot, cached in enumerate(batch.results):
+            if cached is not None:
+                continue
+            cited = self._citation_only(distinct[slot])
+            if cited is not None:
+                self._store(batch, slot, self._citation_ranking(cited, top_k, mask))
+            else:
+                todo.append(slot)
+
+        # BM25 for every query in the batch in one pass over the postings
+        scored = self._bm25.score_many([encoded[slot][1] for slot in todo])
+        for slot, (scores, hit) in zip(todo, scored):
+            query_tokens, term_ids = encoded[slot]
+            query = distinct[slot]
+            parsed = self._fusion_citations(query) if query_tokens else None
+            if parsed is None:
+                # Path B
+                rows, top_scores = self._bm25.top_from_scores(scores, top_k, mask)
+                matched = hit if hit is not None else scores > 0
+                if mask is not None:
+                    matched = matched & mask[:len(matched)]
+                self._store(batch, slot, Ranking(
+                    [self._ids[i] for i in rows], top_scores.tolist(),
+                    int(np.count_nonzero(matched))))
+                continue
+            pool = self._retrieve_pool(query, term_ids, parsed, top_k, mask,
+                                       scores)
+            if isinstance(pool, Ranking):
+                self._store(batch, slot, pool)
+            else:
+                batch.pools[slot] = pool
+        return batch
 
-        # --- Path A: citation-pooled score fusion ---
+    def _fuse_many(self, batch: _Batch, vectors: list[np.ndarray] | None) -> None:
+        for i, (slot, pool) in enumerate(batch.pools.items()):
+            if vectors is None:
+                batch.results[slot] = pool.bm25_ranking()  # fallback, not cached
+            else:
+                self._store(batch, slot, self._fuse(pool, vectors[i]))
 
-        # Step 1: Build candidate pool from citation matches
-        pool = set()
-        gc_exact = self._cite_index["gc_exact"]
-        gc_base = self._cite_index["gc_base"]
-        reg_exact = self._cite_index["reg_exact"]
+    def _query_key(self, query: str) -> tuple:
+        return canonical_query_key(query, self._tokenizer.tokens(query))
 
-        for cite in parsed["gov_code"]:
-            pool |= gc_exact.get(cite["raw"], set())
-            pool |= gc_base.get(cite["base"], set())
+    def _store(self, batch: _Batch, slot: int, ranking: Ranking) -> None:
+        batch.results[slot] = ranking
+        self._result_cache.put(batch.keys[slot], batch.top_k, ranking)
 
-        for cite in parsed["regulations"]:
-            pool |= reg_exact.get(cite["raw"], set())
-            if cite["subsection"]:
-                pool |= reg_exact.get(cite["base"], set())
+    def _retrieve(self, query: str, top_k: int,
+                  filters: SearchFilters | None = None) -> Ranking | _FusionPool:
+        """Everything before the embedding call.
 
-        # Union with BM25 top-100 (safety net)
-        bm25_top100 = {
-            self._bm25_ids[i]
-            for i in bm25_scores.argsort()[::-1][:_BM25_POOL]
-            if bm25_scores[i] > 0
-        }
-        candidate_pool = pool | bm25_top100
+        Returns the final ranking for Path B, an empty pool and a tripped
+        circuit breaker, or the scored candidate pool awaiting fusion.
+        Filters are applied as a row mask before any top-k selection.
+        """
+        mask = self._filter_mask(filters)
+
+        # Citation-only queries: answered from the citation postings alone
+        cited = self._citation_only(query)
+        if cited is not None:
+            return self._citation_ranking(cited, top_k, mask)
+
+        tokens, term_ids = self._tokenizer.encode(query)
+        if not tokens:
+            return Ranking([], [], 0)
+
+        # --- Check for citations in query ---
+        parsed = self._fusion_citations(query)
+        if parsed is None:
+            # Path B: pure BM25, no API call — pruned top-k retrieval
+            top_rows, top_scores = self._bm25.top_k(term_ids, top_k, mask)
+            return Ranking([self._ids[i] for i in top_rows], top_scores.tolist(),
+                           self._bm25.match_count(term_ids, mask))
+        return self._retrieve_pool(query, term_ids, parsed, top_k, mask)
+
+    def _citation_only(self, query: str) -> dict | None:
+        """Parsed citations if the query takes the citation fast path, else None.
+
+        Unless settings.citation_fast_path is on, only queries that cannot be
+        fused (no provider, no cached embedding) take it.
+        """
+        if not self._cite_ranked or (self._embedder is not None
+                                     and not self._cite_fast):
+            return None
+        cited = citation_only(query)
+        if cited is not None and not self._cite_fast and self._can_embed(query):
+            return None
+        return cited
+
+    def _fusion_citations(self, query: str) -> dict | None:
+        """Parsed citations if the query takes the fusion path (A), else None."""
+        parsed = parse_query_citations(query)
+        if not (parsed["gov_code"] or parsed["regulations"]):
+            return None
+        if not self._can_embed(query):
+            return None
+        return parsed
+
+    def _can_embed(self, query: str) -> bool:
+        # A cached query embedding serves the citation path even offline
+        return (self._embedder is not None
+                or self._embedding_cache.contains(self._embed_model, query))
+
+    def _retrieve_pool(self, query: str, term_ids: tuple[int, ...], parsed: dict,
+                       top_k: int, mask: np.ndarray | None,
+                       bm25_scores: np.ndarray | None = None
+                       ) -> Ranking | _FusionPool:
+        """Path A up to the embedding: citation pool ∪ BM25 top-100, scored.
+
+        bm25_scores is the query's dense BM25 score row, when a batch has
+        already computed it.
+        """
+        # Step 1: Build candidate pool rows from the citation postings
+        postings = self._citation_postings(parsed)
 
-        if not candidate_pool:
-            return []
+        # Union with BM25 top-100 (safety net)
+        if bm25_scores is None:
+            top_rows, _ = self._bm25.top_k(term_ids, _BM25_POOL, mask)
+        else:
+            top_rows, _ = self._bm25.top_from_scores(bm25_scores, _BM25_POOL, mask)
+        pool_rows = np.unique(np.concatenate([*postings, top_rows]).astype(np.int64))
+        keep = self._has_id[pool_rows]
+        if mask is not None:
+            keep &= mask[pool_rows]
+        pool_rows = pool_rows[keep]
+        if not len(pool_rows):
+            return Ranking([], [], 0)
 
         # Step 2: Extract raw BM25 scores for pool members
-        bm25_pool = {}
-        for oid in candidate_pool:
-            idx = self._bm25_id_to_idx.get(oid)
-            if idx is not None:
-                bm25_pool[oid] = float(bm25_scores[idx])
-            else:
-                bm25_pool[oid] = 0.0
+        if bm25_scores is None:
+            pool_scores = self._bm25.get_batch_scores(term_ids, pool_rows)
+        else:
+            pool_scores = bm25_scores[pool_rows]
+        pool_scores = np.asarray(pool_scores, dtype=np.float64)
 
-        # Step 3: Circuit breaker on pool-scoped BM25 scores
-        sorted_scores = sorted(bm25_pool.values(), reverse=True)
-        if len(sorted_scores) <= 1:
+        # Step 3: Circuit breaker on pool-scoped BM25 scores (top two only)
+        if len(pool_scores) <= 1:
             ratio = float("inf")
         else:
-            ratio = (sorted_scores[0] / sorted_scores[1]
-                     if sorted_scores[1] > 0 else float("inf"))
+            second, first = np.partition(pool_scores, len(pool_scores) - 2)[-2:]
+            ratio = first / second if second > 0 else float("inf")
 
+        fusion = _FusionPool(self._ids, pool_rows, pool_scores, top_k)
         if ratio >= self._cb_threshold:
             print(
                 f"  [CB] ratio={ratio:.2f} >= {self._cb_threshold} — "
                 f"returning BM25-only for: {query[:80]}",
                 file=sys.stderr,
             )
-            return sorted(bm25_pool, key=bm25_pool.get, reverse=True)[:top_k]
-
-        # Step 4: Embed query, compute cosine similarities for pool members
-        try:
-            resp = self._client.embeddings.create(model=_MODEL, input=[query])
-            query_vec = np.array(resp.data[0].embedding, dtype=np.float32)
-            norm = np.linalg.norm(query_vec)
-            if norm > 0:
-                query_vec /= norm
-        except Exception as e:
-            # OpenAI failure — fall back to BM25-only
-            print(f"  [FALLBACK] OpenAI embedding failed: {e}", file=sys.stderr)
-            return sorted(bm25_pool, key=bm25_pool.get, reverse=True)[:top_k]
-
-        cos_scores = self._embeddings @ query_vec
-
-        sem_pool = {}
-        for oid in candidate_pool:
-            idx = self._sem_id_to_idx.get(oid)
-            if idx is not None:
-                sem_pool[oid] = float(cos_scores[idx])
-            else:
-                sem_pool[oid] = 0.0
+            # The breaker's answer is Path A's real result, not a fallback
+            return fusion.ranking(fusion.bm25_scores)
+        return fusion
+
+    def _citation_postings(self, parsed: dict) -> list[np.ndarray]:
+        """Row postings of every citation in a parsed query."""
+        gc_exact = self._citations["gc_exact"]
+        gc_base = self._citations["gc_base"]
+        reg_exact = self._citations["reg_exact"]
+        postings = []
+        for cite in parsed["gov_code"]:
+            postings.append(gc_exact.get(cite["raw"]))
+            postings.append(gc_base.get(cite["base"]))
+        for cite in parsed["regulations"]:
+            postings.append(reg_exact.get(cite["raw"]))
+            if cite["subsection"]:
+                postings.append(reg_exact.get(cite["base"]))
+        return postings
+
+    def _citation_ranking(self, parsed: dict, top_k: int,
+                          mask: np.ndarray | None) -> Ranking:
+        """Rank a citation-only query from the weighted citation postings.
+
+        Per citation, rows citing it exactly score 1 + density and rows
+        citing only its base section (another subsection) score their base
+        density; scores add up over the query's citations, plus recency.
+        """
+        gc_exact = self._citations["gc_exact"]
+        gc_base = self._citations["gc_base"]
+        reg_exact = self._citations["reg_exact"]
+        # The parser also reports "87103" on its own for "87103(a)"
+        with_subsection = {c["base"] for c in parsed["gov_code"] if c["subsection"]}
+        terms = [
+            (gc_exact.get_weighted(c["raw"]), gc_base.get_weighted(c["base"]))
+            for c in parsed["gov_code"]
+            if c["subsection"] or c["base"] not in with_subsection
+        ]
+        terms += [
+            (reg_exact.get_weighted(c["raw"]),
+             reg_exact.get_weighted(c["base"]) if c["subsection"] else None)
+            for c in parsed["regulations"]
+        ]
+
+        scores = np.zeros(len(self._ids), dtype=np.float64)
+        matched = np.zeros(len(self._ids), dtype=bool)
+        for (rows, weights), base in terms:
+            term = np.zeros(len(self._ids), dtype=np.float64)
+            if base is not None:
+                term[base[0]] = base[1]
+                matched[base[0]] = True
+            term[rows] = 1.0 + weights
+            matched[rows] = True
+            scores += term
+
+        keep = matched & self._has_id
+        if mask is not None:
+            keep &= mask
+        rows = np.flatnonzero(keep)
+        row_scores = scores[rows]
+        if self._recency is not None:
+            row_scores += self._cite_recency * self._recency[rows]
+        top = _top_k(row_scores, top_k)
+        return Ranking([self._ids[r] for r in rows[top].tolist()],
+                       row_scores[top].tolist(), len(rows))
+
+    def _fuse(self, pool: _FusionPool, query_vec: np.ndarray) -> Ranking:
+        """Steps 4–7: semantic scores for the pool, then weighted fusion."""
+        pool_rows = pool.rows
+
+        # Only pool rows are scored: int8 pass, full-precision shortlist
+        sem_scores = np.zeros(len(pool_rows), dtype=np.float64)
+        embedded = self._has_embedding[pool_rows]
+        sem_scores[embedded] = self._embeddings.similarities(
+            pool_rows[embedded], query_vec,
+            rescore=self._sem_rescore,
+        )
 
         # Step 5: Min-max normalize both score sets within the pool
-        norm_bm25 = _min_max_normalize(bm25_pool)
-        norm_sem = _min_max_normalize(sem_pool)
+        norm_bm25 = _min_max_normalize(pool.bm25_scores)
+        norm_sem = _min_max_normalize(sem_scores)
 
         # Step 6: Combine with weighted scores
-        combined = {}
-        for oid in candidate_pool:
-            b = norm_bm25.get(oid, 0.0)
-            s = norm_sem.get(oid, 0.0)
-            combined[oid] = self._w_bm25 * b + self._w_sem * s
+        combined = self._w_bm25 * norm_bm25 + self._w_sem * norm_sem
+        if self._w_prior:
+            combined += self._prior[pool_rows] * self._w_prior
 
         # Step 7: Return top-k by combined score
-        return sorted(combined, key=combined.get, reverse=True)[:top_k]
+        return pool.ranking(combined)
+
+    def _filter_mask(self, filters: SearchFilters | None) -> np.ndarray | None:
+        """Rows eligible for a ranking: filters AND a non-empty opinion id."""
+        if not filters:
+            return self._id_mask
+        if self._filter_index is None:
+            raise RuntimeError("search filters need metadata: "
+                               "call attach_metadata() first")
+        # Filter masks never match rows without metadata, empty ids included
+        return self._filter_index.mask(filters)
+
+    def _embed_query(self, query: str) -> np.ndarray:
+        """Unit-normalized query embedding, from the cache or the provider."""
+        cached = self._embedding_cache.get(self._embed_model, query)
+        if cached is not None:
+            return cached
+        if self._embedder is None:
+            raise RuntimeError("no embedding provider configured")
+        query_vec = self._embedder.embed_one(query)
+        self._embedding_cache.put(self._embed_model, query, query_vec)
+        return query_vec
+
+    def _embed_queries(self, queries: list[str]) -> list[np.ndarray]:
+        """_embed_query() for many queries, with one provider request for misses."""
+        vectors = [self._embedding_cache.get(self._embed_model, q) for q in queries]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            if self._embedder is None:
+                raise RuntimeError("no embedding provider configured")
+            embedded = self._embedder.embed([queries[i] for i in missing])
+            for i, vec in zip(missing, embedded):
+                self._embedding_cache.put(self._embed_model, queries[i], vec)
+                vectors[i] = vec
+        return vectors
+
+    async def _aembed_queries(self, queries: list[str]) -> list[np.ndarray]:
+        vectors = [self._embedding_cache.get(self._embed_model, q) for q in queries]
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            if self._embedder is None:
+                raise RuntimeError("no embedding provider configured")
+            embedded = await self._embedder.aembed([queries[i] for i in missing])
+            for i, vec in zip(missing, embedded):
+                self._embedding_cache.put(self._embed_model, queries[i], vec)
+                vectors[i] = vec
+        return vectors
+
+    async def _aembed_query(self, query: str) -> np.ndarray:
+        cached = self._embedding_cache.get(self._embed_model, query)
+        if cached is not None:
+            return cached
+        if self._embedder is None:
+            raise RuntimeError("no embedding provider configured")
+        query_vec = await self._embedder.aembed_one(query)
+        self._embedding_cache.put(self._embed_model, query, query_vec)
+        return query_vec
+
+    def _search_executor(self) -> ThreadPoolExecutor:
+        # Created per process: pool threads don't survive the pre-fork server
+        if self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.search_threads or min(32, os.cpu_count() or 1),
+                thread_name_prefix="search",
+            )
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    @property
+    def embedding_cache(self) -> EmbeddingCache:
+        return self._embedding_cache
+
+    @property
+    def embedding_model(self) -> str:
+        return self._embed_model
+
+    @property
+    def has_embedder(self) -> bool:
+        """Whether a query-embedding provider is configured (not probed)."""
+        return self._embedder is not None
+
+    @property
+    def result_cache(self) -> ResultCache:
+        return self._result_cache
+
+    def index_version(self) -> str:
+        return self._index_version
+
+    def ranking_settings(self) -> dict:
+        return {
+            "cb_threshold": self._cb_threshold,
+            "w_bm25": self._w_bm25,
+            "w_sem": self._w_sem,
+            "w_prior": self._w_prior,  # authority_weight, 0 without the array
+            "embedding_provider": (settings.embedding_provider
+                                   if self._embedder is not None else None),
+            "embedding_model": self._embed_model,
+            "sem_rescore": self._sem_rescore,
+            "cite_recency": self._cite_recency,
+            "citation_fast_path": self._cite_fast,
+        }
 
     def name(self) -> str:
         return "CitationScoreFusion"
@@ -0,0 +1,155 @@
+"""
+Search filters as boolean row masks over the engine's document rows.
+
+FilterIndex is built once from the columnar metadata index, aligned to the
+engine's row order. Topic and document-type masks are precomputed (few
+values), years are a per-row int16 array compared against the range, and
+statute/regulation filters set the rows of a precomputed postings array. mask() ANDs them
+together; the engine applies the result before top-k selection, so filtered
+queries are ranked over every matching document, not a fixed over-fetch.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+def _canonical(values) -> tuple[str, ...]:
+    if values is None:
+        return ()
+    if isinstance(values, str):
+        values = [values]
+    return tuple(sorted(set(values)))
+
+
+@dataclass(frozen=True)
+class SearchFilters:
+    """AND-combined filters; multiple topics or document types are OR-ed."""
+
+    topics: tuple[str, ...] = field(default=())
+    statute: str | None = None
+    regulation: str | None = None
+    year_start: int | None = None
+    year_end: int | None = None
+    document_types: tuple[str, ...] = field(default=())
+
+    def __post_init__(self):
+        # Canonical form, so equal filters hash equal (result cache keys)
+        object.__setattr__(self, "topics", _canonical(self.topics))
+        object.__setattr__(self, "document_types",
+                           _canonical(self.document_types))
+
+    def __bool__(self) -> bool:
+        return bool(self.topics or self.statute or self.regulation
+                    or self.year_start is not None or self.year_end is not None
+                    or self.document_types)
+
+    def applied(self) -> dict:
+        """The active filters, for echoing back in API responses."""
+        out = {}
+        if self.topics:
+            out["topic"] = list(self.topics)
+        if self.statute:
+            out["statute"] = self.statute
+        if self.regulation:
+            out["regulation"] = self.regulation
+        if self.year_start is not None:
+            out["year_start"] = self.year_start
+        if self.year_end is not None:
+            out["year_end"] = self.year_end
+        if self.document_types:
+            out["document_type"] = list(self.document_types)
+        return out
+
+
+class FilterIndex:
+    """Per-row filter attributes for one engine row order."""
+
+    def __init__(self, n_rows: int, years: np.ndarray,
+                 topic_masks: dict[str, np.ndarray],
+                 document_type_masks: dict[str, np.ndarray],
+                 statute_rows: dict[str, np.ndarray],
+                 regulation_rows: dict[str, np.ndarray]):
+        self.n_rows = n_rows
+        self.years = years
+        self.topic_masks = topic_masks
+        self.document_type_masks = document_type_masks
+        self.statute_rows = statute_rows
+        self.regulation_rows = regulation_rows
+
+    @classmethod
+    def from_metadata(cls, ids: list[str], metadata) -> FilterIndex:
+        """Index a MetadataIndex for rows ids[0..n); unknown ids never match."""
+        n = len(ids)
+        rows = metadata.rows(ids)
+        known = rows >= 0
+        meta_rows = rows[known]
+
+        years = np.full(n, -1, dtype=np.int16)
+        years[known] = metadata.years[meta_rows]
+
+        def masks(column) -> dict[str, np.ndarray]:
+            codes = np.full(n, -1, dtype=np.int16)
+            codes[known] = column.codes[meta_rows]
+            return {value: codes == code for code, value in enumerate(column.values)}
+
+        # Metadata row → engine row, to invert the CSR citation columns
+        to_engine = np.full(len(metadata.ids), -1, dtype=np.int64)
+        to_engine[meta_rows] = np.flatnonzero(known)
+
+        def postings(column) -> dict[str, np.ndarray]:
+            engine_rows = to_engine[column.owners()]
+            valid = engine_rows >= 0
+            items, engine_rows = column.items[valid], engine_rows[valid]
+            order = np.argsort(items, kind="stable")
+            items, engine_rows = items[order], engine_rows[order]
+            bounds = np.flatnonzero(np.diff(items)) + 1
+            out = {}
+            for group in np.split(np.arange(len(items)), bounds):
+                if len(group):
+                    out[column.vocab[items[group[0]]]] = np.unique(
+                        engine_rows[group]).astype(np.int32)
+            return out
+
+        return cls(n, years,
+                   masks(metadata.categorical["topic_primary"]),
+                   masks(metadata.categorical["document_type"]),
+                   postings(metadata.lists["government_code_sections"]),
+                   postings(metadata.lists["regulations"]))
+
+    def mask(self, filters: SearchFilters | None) -> np.ndarray | None:
+        """Boolean row mask for the filters, or None when nothing is filtered."""
+        if not filters:
+            return None
+        mask = np.ones(self.n_rows, dtype=bool)
+        if filters.topics:
+            mask &= self._any(self.topic_masks, filters.topics)
+        if filters.document_types:
+            mask &= self._any(self.document_type_masks, filters.document_types)
+        if filters.year_start is not None or filters.year_end is not None:
+            mask &= self.years >= 0
+            if filters.year_start is not None:
+                mask &= self.years >= filters.year_start
+            if filters.year_end is not None:
+                mask &= self.years <= filters.year_end
+        if filters.statute:
+            mask &= self._rows(self.statute_rows, filters.statute)
+        if filters.regulation:
+            mask &= self._rows(self.regulation_rows, filters.regulation)
+        return mask
+
+    def _any(self, masks: dict[str, np.ndarray], keys) -> np.ndarray:
+        out = np.zeros(self.n_rows, dtype=bool)
+        for key in keys:
+            if key in masks:
+                out |= masks[key]
+        return out
+
+    def _rows(self, postings: dict[str, np.ndarray], key: str) -> np.ndarray:
+        out = np.zeros(self.n_rows, dtype=bool)
+        rows = postings.get(key)
+        if rows is not None:
+            out[rows] = True
+        return out
@@ -0,0 +1,600 @@
+"""
+Pickle-free, memory-mapped on-disk format for the search indexes.
+
+An index is a directory of raw .npy arrays plus a small JSON manifest:
+
+    manifest.json                 format name/version, corpus stats, BM25
+                                  parameters, and per-array dtype/shape/sha256
+    opinion_ids.{blob,offsets}    row → opinion id (BM25 rows first)
+    bm25_vocab.{blob,offsets}     sorted term table; term id = position
+    bm25_indptr / bm25_doc_ids / bm25_impacts / bm25_max_impacts
+                                  CSR postings (see backend.search.bm25)
+    bm25_doc_len                  token count per BM25 row
+    emb_codes / emb_scales        int8 row-quantized embeddings (row-aligned)
+    emb_full                      float32 embeddings for rescoring
+    emb_present                   rows that have an embedding
+    emb_text_hash                 uint64 digest of the text each row's vector
+                                  was embedded from (written by
+                                  backend.search.build; optional)
+    cite_{table}_{keys,indptr,rows}
+                                  citation → sorted row ids, for gc_exact,
+                                  gc_base and reg_exact
+    cite_{table}_weights          float32 per posting: how densely the row
+                                  cites it (BM25 impact of the citation's
+                                  token, max-normalized per citation)
+    authority                     float32 PageRank per row over the opinion
+                                  citation graph (optional; written by the
+                                  authority command as a ranking prior)
+
+Every array is opened with np.load(mmap_mode="r"), so loading is near-instant
+and the pages are shared between worker processes through the OS page cache.
+Strings are stored as a UTF-8 blob plus int64 offsets; sorted tables are
+searched by bisection directly over the mapped bytes.
+
+The pickle conversion is the legacy source; backend.search.build builds the
+same arrays straight from data/extracted. A converted index records the
+sha256 of the pickles it came from (manifest "sources"), so the engine
+reconverts when they are replaced.
+
+Usage: python -m backend.search.index_format convert   (from project root)
+       python -m backend.search.index_format authority
+       python -m backend.search.index_format weights   (indexes written
+                                                        before cite_*_weights)
+       python -m backend.search.index_format verify
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import string
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from backend.search.bm25 import SparseBM25
+from backend.search.embeddings import QuantizedEmbeddings, quantize_int8
+from backend.search.utils import tokenize
+
+FORMAT_NAME = "fppc-search-index"
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+CITATION_TABLES = ("gc_exact", "gc_base", "reg_exact")
+
+
+# ---------------------------------------------------------------------------
+# String tables
+# ---------------------------------------------------------------------------
+class StringTable:
+    """Read-only sequence of strings over a UTF-8 blob and offsets array."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+        self._prefixes: np.ndarray | None = None  # see get_many()
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return self._blob.nbytes + self._offsets.nbytes
+
+    @property
+    def blob(self) -> np.ndarray:
+        return self._blob
+
+    @property
+    def offsets(self) -> np.ndarray:
+        return self._offsets
+
+    def __getitem__(self, i: int) -> str:
+        return self._bytes(i).decode("utf-8")
+
+    def _bytes(self, i: int) -> bytes:
+        return self._blob[self._offsets[i]:self._offsets[i + 1]].tobytes()
+
+    def to_list(self) -> list[str]:
+        data = self._blob.tobytes()
+        offsets = self._offsets.tolist()
+        return [data[a:b].decode("utf-8") for a, b in zip(offsets, offsets[1:])]
+
+    def get(self, key: str) -> int | None:
+        """Position of key in a sorted table, or None (binary search)."""
+        target = key.encode("utf-8")
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._bytes(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self._bytes(lo) == target:
+            return lo
+        return None
+
+    def get_many(self, keys: list[str]) -> np.ndarray:
+        """Positions of keys in a sorted table (-1 if absent), as int64.
+
+        Keys are located with one searchsorted over the entries' 8-byte
+        prefixes (built on first use); only keys of 8 bytes or more finish
+        with a binary search, among the entries sharing their prefix.
+        """
+        if self._prefixes is None:
+            self._prefixes = _prefix_keys(self._blob, self._offsets)
+        encoded = [k.encode("utf-8") for k in keys]
+        found = np.full(len(encoded), -1, dtype=np.int64)
+        if not encoded:
+            return found
+        blob = b"".join(k[:8].ljust(8, b"\0") for k in encoded)
+        prefixes = np.frombuffer(blob, dtype=">u8")
+        lo = np.searchsorted(self._prefixes, prefixes, side="left")
+        hi = np.searchsorted(self._prefixes, prefixes, side="right")
+        # A key shorter than 8 bytes is its whole (padded) prefix
+        short = np.fromiter(map(len, encoded), dtype=np.int64,
+                            count=len(encoded)) < 8
+        exact = short & (lo < hi)
+        found[exact] = lo[exact]
+        for i in np.flatnonzero(~short & (lo < hi)).tolist():
+            target, a, b = encoded[i], int(lo[i]), int(hi[i])
+            while a < b:
+                mid = (a + b) // 2
+                if self._bytes(mid) < target:
+                    a = mid + 1
+                else:
+                    b = mid
+            if a < hi[i] and self._bytes(a) == target:
+                found[i] = a
+        return found
+
+
+def _prefix_keys(blob: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """First 8 bytes of every string, zero-padded, as big-endian uint64.
+
+    For strings without NUL bytes these sort like the strings themselves.
+    """
+    starts = offsets[:-1]
+    lengths = np.minimum(np.diff(offsets), 8)
+    columns = np.arange(8)
+    inside = columns < lengths[:, None]
+    prefixes = np.zeros((len(starts), 8), dtype=np.uint8)
+    prefixes[inside] = blob[(starts[:, None] + columns)[inside]]
+    return prefixes.view(">u8").ravel()
+
+
+def encode_strings(strings: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return blob, offsets
+
+
+# ---------------------------------------------------------------------------
+# Loaded index
+# ---------------------------------------------------------------------------
+class CitationTable:
+    """Citation string → sorted int32 row ids (and per-posting weights)."""
+
+    def __init__(self, keys: StringTable, indptr: np.ndarray, rows: np.ndarray,
+                 weights: np.ndarray | None = None):
+        self.keys = keys
+        self.indptr = indptr
+        self.rows = rows
+        self.weights = weights
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def get(self, key: str) -> np.ndarray:
+        i = self.keys.get(key)
+        if i is None:
+            return self.rows[:0]
+        return self.rows[self.indptr[i]:self.indptr[i + 1]]
+
+    def get_weighted(self, key: str) -> tuple[np.ndarray, np.ndarray]:
+        """(rows, weights) of a citation; needs the weights array."""
+        i = self.keys.get(key)
+        if i is None:
+            return self.rows[:0], self.weights[:0]
+        span = slice(self.indptr[i], self.indptr[i + 1])
+        return self.rows[span], self.weights[span]
+
+    def items(self):
+        for i in range(len(self.keys)):
+            yield self.keys[i], self.rows[self.indptr[i]:self.indptr[i + 1]]
+
+
+@dataclass
+class SearchIndex:
+    path: str
+    manifest: dict
+    opinion_ids: list[str]
+    bm25: SparseBM25
+    embeddings: QuantizedEmbeddings
+    has_embedding: np.ndarray
+    citations: dict[str, CitationTable]
+    authority: np.ndarray | None
+
+    @property
+    def version(self) -> str:
+        return self.manifest["index_id"]
+
+
+def open_index(path: str) -> SearchIndex:
+    """Memory-map an index directory written by IndexWriter."""
+    with open(os.path.join(path, MANIFEST), "r") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_NAME:
+        raise ValueError(f"Not a {FORMAT_NAME} directory: {path}")
+    if manifest.get("version") != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported index version {manifest.get('version')} at {path} "
+            f"(expected {FORMAT_VERSION})"
+        )
+
+    def arr(name: str) -> np.ndarray:
+        mapped = np.load(os.path.join(path, manifest["arrays"][name]["file"]),
+                         mmap_mode="r")
+        # Plain ndarray view of the mapping: slicing np.memmap subclasses
+        # carries per-slice overhead on the scoring hot path
+        return np.asarray(mapped)
+
+    def strings(name: str) -> StringTable:
+        return StringTable(arr(f"{name}_blob"), arr(f"{name}_offsets"))
+
+    bm25 = SparseBM25(
+        vocab=strings("bm25_vocab"),
+        indptr=arr("bm25_indptr"),
+        doc_ids=arr("bm25_doc_ids"),
+        impacts=arr("bm25_impacts"),
+        n_docs=manifest["n_docs"],
+        max_impacts=arr("bm25_max_impacts"),
+    )
+    embeddings = QuantizedEmbeddings(
+        arr("emb_codes"), arr("emb_scales"), arr("emb_full")
+    )
+    citations = {
+        table: CitationTable(strings(f"cite_{table}_keys"),
+                             arr(f"cite_{table}_indptr"),
+                             arr(f"cite_{table}_rows"),
+                             arr(f"cite_{table}_weights")
+                             if f"cite_{table}_weights" in manifest["arrays"] else None)
+        for table in CITATION_TABLES
+    }
+    return SearchIndex(
+        path=path,
+        manifest=manifest,
+        opinion_ids=strings("opinion_ids").to_list(),
+        bm25=bm25,
+        embeddings=embeddings,
+        has_embedding=arr("emb_present"),
+        citations=citations,
+        authority=arr("authority") if "authority" in manifest["arrays"] else None,
+    )
+
+
+def verify_index(path: str) -> list[str]:
+    """Re-hash every array; returns the names whose checksum does not match."""
+    with open(os.path.join(path, MANIFEST), "r") as f:
+        manifest = json.load(f)
+    return [
+        name for name, info in manifest["arrays"].items()
+        if _sha256(os.path.join(path, info["file"])) != info["sha256"]
+    ]
+
+
+def _sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+class IndexWriter:
+    """Write arrays into a staging directory, then swap it into place."""
+
+    def __init__(self, path: str, format_name: str = FORMAT_NAME,
+                 version: int = FORMAT_VERSION):
+        self.path = os.path.abspath(path)
+        self.format_name = format_name
+        self.version = version
+        self._staging = f"{self.path}.tmp-{os.getpid()}"
+        shutil.rmtree(self._staging, ignore_errors=True)
+        os.makedirs(self._staging)
+        self._arrays: dict[str, dict] = {}
+
+    def add_array(self, name: str, array: np.ndarray) -> None:
+        filename = f"{name}.npy"
+        file_path = os.path.join(self._staging, filename)
+        np.save(file_path, np.ascontiguousarray(array))
+        self._arrays[name] = {
+            "file": filename,
+            "dtype": str(array.dtype),
+            "shape": list(array.shape),
+            "sha256": _sha256(file_path),
+        }
+
+    def link_array(self, name: str, source_dir: str, info: dict) -> None:
+        """Carry an array of an existing index over unchanged."""
+        target = os.path.join(self._staging, info["file"])
+        try:
+            os.link(os.path.join(source_dir, info["file"]), target)
+        except OSError:
+            shutil.copyfile(os.path.join(source_dir, info["file"]), target)
+        self._arrays[name] = dict(info)
+
+    def add_strings(self, name: str, strings: list[str]) -> None:
+        blob, offsets = encode_strings(strings)
+        self.add_array(f"{name}_blob", blob)
+        self.add_array(f"{name}_offsets", offsets)
+
+    def add_citation_table(self, table: str, postings: dict[str, np.ndarray],
+                           bm25: SparseBM25) -> None:
+        keys = sorted(postings, key=lambda k: k.encode("utf-8"))
+        indptr = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum([len(postings[k]) for k in keys], out=indptr[1:])
+        rows = (np.concatenate([np.sort(postings[k]) for k in keys])
+                if keys else np.empty(0)).astype(np.int32)
+        self.add_strings(f"cite_{table}_keys", keys)
+        self.add_array(f"cite_{table}_indptr", indptr)
+        self.add_array(f"cite_{table}_rows", rows)
+        self.add_array(f"cite_{table}_weights",
+                       citation_weights(bm25, keys, indptr, rows))
+
+    def abort(self) -> None:
+        shutil.rmtree(self._staging, ignore_errors=True)
+
+    def commit(self, **meta) -> dict:
+        """Write the manifest and atomically replace any existing index."""
+        index_id = hashlib.sha256(
+            json.dumps(self._arrays, sort_keys=True).encode("utf-8")
+        ).hexdigest()[:16]
+        manifest = {
+            "format": self.format_name,
+            "version": self.version,
+            "index_id": index_id,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            **meta,
+            "arrays": self._arrays,
+        }
+        with open(os.path.join(self._staging, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        # Processes that still map the old files keep their (unlinked) pages
+        backup = f"{self.path}.old-{os.getpid()}"
+        if os.path.exists(self.path):
+            os.rename(self.path, backup)
+        os.rename(self._staging, self.path)
+        shutil.rmtree(backup, ignore_errors=True)
+        return manifest
+
+
+def citation_weights(bm25: SparseBM25, keys: list[str], indptr: np.ndarray,
+                     rows: np.ndarray) -> np.ndarray:
+    """Citation density of every posting, in [0, 1].
+
+    The BM25 impact of the citation's (first) token in the row already is
+    a length-normalized, saturated mention count; dividing by its largest
+    value per citation makes citations of different rarity comparable. A
+    bare section also counts its lettered subsections ("87103(a)" is
+    tokenized as 87103a).
+    """
+    weights = np.zeros(len(rows), dtype=np.float32)
+    for i, key in enumerate(keys):
+        tokens = tokenize(key)[:1]
+        if key.isdigit():
+            tokens += [key + letter for letter in string.ascii_lowercase]
+        start, end = int(indptr[i]), int(indptr[i + 1])
+        if not tokens or start == end:
+            continue
+        impacts = bm25.get_batch_scores(tokens, rows[start:end])
+        top = impacts.max()
+        if top > 0:
+            weights[start:end] = impacts / top
+    return weights
+
+
+def add_citation_weights(path: str) -> dict:
+    """Add the per-posting citation weights to an index written without them."""
+    index = open_index(path)
+    arrays = {}
+    for table, cites in index.citations.items():
+        arrays[f"cite_{table}_weights"] = citation_weights(
+            index.bm25, cites.keys.to_list(), cites.indptr, cites.rows)
+    return extend_index(path, arrays)
+
+
+def extend_index(path: str, arrays: dict[str, np.ndarray], **meta) -> dict:
+    """Add (or replace) arrays in an existing index, swapped in as a new version.
+
+    Unchanged arrays are hard-linked from the current directory, not copied.
+    """
+    with open(os.path.join(path, MANIFEST), "r") as f:
+        manifest = json.load(f)
+    writer = IndexWriter(path, manifest["format"], manifest["version"])
+    try:
+        for name, info in manifest["arrays"].items():
+            if name not in arrays:
+                writer.link_array(name, path, info)
+        for name, array in arrays.items():
+            writer.add_array(name, array)
+    except BaseException:
+        writer.abort()
+        raise
+    kept = {k: v for k, v in manifest.items()
+            if k not in ("format", "version", "index_id", "created_at", "arrays")}
+    return writer.commit(**{**kept, **meta})
+
+
+def add_authority(path: str, metadata, damping: float = 0.85) -> dict:
+    """Offline stage: PageRank of the citation graph, aligned to index rows.
+
+    Rows without a metadata record (or with an empty id) get 0.
+    """
+    opinion_ids = open_index(path).opinion_ids
+    scores = metadata.citations.pagerank(damping)
+    rows = metadata.rows(opinion_ids)
+    authority = np.zeros(len(opinion_ids), dtype=np.float32)
+    authority[rows >= 0] = scores[rows[rows >= 0]]
+    return extend_index(path, {"authority": authority}, authority={
+        "method": "pagerank",
+        "damping": damping,
+        "citation_edges": metadata.citations.n_edges,
+        "metadata_version": metadata.version,
+    })
+
+
+# ---------------------------------------------------------------------------
+# Converter from the search-lab pickles
+# ---------------------------------------------------------------------------
+def pickle_sources(*paths: str) -> dict[str, str]:
+    """Pickle file name → sha256, as convert_pickles() records them."""
+    return {os.path.basename(p): _sha256(p) for p in paths}
+
+
+def convert_pickles(bm25_path: str, sem_path: str, citation_path: str,
+                    out_dir: str, embedding_model: str) -> dict:
+    """Convert the three search-lab pickles into an index directory.
+
+    Rows follow the BM25 pickle's opinion order; ids that only appear in the
+    semantic or citation index are appended after them (with no postings) so
+    every id the engine can return has a row.
+    """
+    sources = pickle_sources(bm25_path, sem_path, citation_path)
+    with open(bm25_path, "rb") as f:
+        bm25_data = pickle.load(f)
+    okapi = bm25_data["bm25"]
+    bm25 = SparseBM25.from_okapi(okapi)
+    # A few extracted files carry "id": null; keep their rows (so postings
+    # stay aligned) under an empty id that never resolves to an opinion
+    opinion_ids = [oid or "" for oid in bm25_data["opinion_ids"]]
+    n_bm25 = len(opinion_ids)
+    doc_len = np.asarray(okapi.doc_len, dtype=np.int32)
+    bm25_params = {"k1": okapi.k1, "b": okapi.b, "epsilon": okapi.epsilon,
+                   "avgdl": okapi.avgdl}
+    del bm25_data, okapi
+
+    with open(sem_path, "rb") as f:
+        sem_data = pickle.load(f)
+    with open(citation_path, "rb") as f:
+        cite_index = pickle.load(f)
+
+    sem_ids = [oid or "" for oid in sem_data["opinion_ids"]]
+    known = set(opinion_ids)
+    extra = set(sem_ids) - known
+    for table in CITATION_TABLES:
+        for ids in cite_index[table].values():
+            extra |= {oid or "" for oid in ids} - known
+    opinion_ids.extend(sorted(extra))
+    id_to_row = {oid: i for i, oid in enumerate(opinion_ids)}
+    n_docs = len(opinion_ids)
+
+    # Embeddings re-ordered to row order; rows without one stay zero
+    sem_matrix = np.asarray(sem_data["embeddings"], dtype=np.float32)
+    full = np.zeros((n_docs, sem_matrix.shape[1]), dtype=np.float32)
+    sem_rows = np.array([id_to_row[oid] for oid in sem_ids], dtype=np.int64)
+    full[sem_rows] = sem_matrix
+    present = np.zeros(n_docs, dtype=bool)
+    present[sem_rows] = True
+    del sem_data, sem_matrix
+
+    citations = {
+        table: {
+            key: np.array(sorted({id_to_row[oid or ""] for oid in ids}),
+                          dtype=np.int32)
+            for key, ids in cite_index[table].items()
+        }
+        for table in CITATION_TABLES
+    }
+
+    writer = IndexWriter(out_dir)
+    try:
+        _write_arrays(writer, opinion_ids, bm25, doc_len, full, present,
+                      citations)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.commit(
+        source="pickle-convert",
+        sources=sources,
+        n_docs=n_docs,
+        n_bm25_docs=n_bm25,
+        bm25=bm25_params,
+        embedding_model=embedding_model,
+        embedding_dim=int(full.shape[1]),
+    )
+
+
+def _write_arrays(writer: IndexWriter, opinion_ids: list[str], bm25: SparseBM25,
+                  doc_len: np.ndarray, full: np.ndarray, present: np.ndarray,
+                  citations: dict[str, dict[str, np.ndarray]]) -> None:
+    """Write every array of the format into a staged index."""
+    codes, scales = quantize_int8(full)
+    writer.add_strings("opinion_ids", opinion_ids)
+    writer.add_strings("bm25_vocab", _vocab_terms(bm25))
+    writer.add_array("bm25_indptr", bm25.indptr)
+    writer.add_array("bm25_doc_ids", bm25.doc_ids)
+    writer.add_array("bm25_impacts", bm25.impacts)
+    writer.add_array("bm25_max_impacts", bm25.max_impacts)
+    writer.add_array("bm25_doc_len", doc_len)
+    writer.add_array("emb_codes", codes)
+    writer.add_array("emb_scales", scales)
+    writer.add_array("emb_full", full)
+    writer.add_array("emb_present", present)
+    for table in CITATION_TABLES:
+        writer.add_citation_table(table, citations[table], bm25)
+
+
+def _vocab_terms(bm25: SparseBM25) -> list[str]:
+    terms = [""] * len(bm25.vocab)
+    for term, tid in bm25.vocab.items():
+        terms[tid] = term
+    return terms
+
+
+def main():
+    from backend.search.engine import (
+        _BM25_INDEX, _CITATION_INDEX, _INDEX_DIR, _MODEL, _SEM_INDEX,
+    )
+
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "convert":
+        t0 = time.time()
+        manifest = convert_pickles(_BM25_INDEX, _SEM_INDEX, _CITATION_INDEX,
+                                   _INDEX_DIR, _MODEL)
+        print(f"Wrote {_INDEX_DIR} (index {manifest['index_id']}, "
+              f"{manifest['n_docs']} rows) in {time.time() - t0:.1f}s")
+    elif command == "authority":
+        from backend.metadata import build_metadata_index
+
+        t0 = time.time()
+        manifest = add_authority(_INDEX_DIR, build_metadata_index())
+        print(f"Wrote authority prior into {_INDEX_DIR} (index "
+              f"{manifest['index_id']}, {manifest['authority']['citation_edges']} "
+              f"citation edges) in {time.time() - t0:.1f}s")
+    elif command == "weights":
+        t0 = time.time()
+        manifest = add_citation_weights(_INDEX_DIR)
+        print(f"Wrote citation weights into {_INDEX_DIR} (index "
+              f"{manifest['index_id']}) in {time.time() - t0:.1f}s")
+    elif command == "verify":
+        bad = verify_index(_INDEX_DIR)
+        print("OK" if not bad else f"Checksum mismatch: {', '.join(bad)}")
+        sys.exit(1 if bad else 0)
+    else:
+        print(__doc__)
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
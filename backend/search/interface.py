@@ -1,4 +1,29 @@
+from __future__ import annotations
+
+import asyncio
 from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from backend.search.filters import SearchFilters
+
+
+class Ranking(NamedTuple):
+    """Ranked opinion ids with their engine scores (same length, best first).
+
+    total is the number of documents that matched the query (and filters),
+    which can exceed len(ids) when the ranking was cut at top_k. degraded
+    marks a fallback ranking (e.g. BM25 only after the query embedding
+    failed) that must not be cached as the query's answer.
+    """
+
+    ids: list[str]
+    scores: list[float]
+    total: int
+    degraded: bool = False
+
+    def head(self, k: int) -> Ranking:
+        return Ranking(self.ids[:k], self.scores[:k], self.total, self.degraded)
 
 
 class SearchEngine(ABC):
@@ -19,6 +44,56 @@ class SearchEngine(ABC):
         """
         pass
 
+    async def asearch(self, query: str, top_k: int = 20) -> list[str]:
+        """Async search() for request handlers; must not block the event loop.
+
+        The default runs search() in a worker thread. Engines that wait on
+        the network should override it to await that I/O instead.
+        """
+        return await asyncio.to_thread(self.search, query, top_k)
+
+    def search_ranked(self, query: str, top_k: int = 20,
+                      filters: SearchFilters | None = None) -> Ranking:
+        """Ranked search with scores, filters and an exact match count.
+
+        Engines that support filters apply them before top-k selection. The
+        default has no scores or filters and reports what search() returned.
+        """
+        if filters:
+            raise NotImplementedError(f"{self.name()} does not support filters")
+        ids = self.search(query, top_k)
+        return Ranking(ids, [0.0] * len(ids), len(ids))
+
+    async def asearch_ranked(self, query: str, top_k: int = 20,
+                             filters: SearchFilters | None = None) -> Ranking:
+        """Async search_ranked(); the default runs it in a worker thread."""
+        return await asyncio.to_thread(self.search_ranked, query, top_k, filters)
+
+    def search_many(self, queries: list[str], top_k: int = 20,
+                    filters: SearchFilters | None = None) -> list[Ranking]:
+        """Rank several queries at once (same top_k and filters for each).
+
+        The default calls search_ranked() per query; engines override it to
+        share work across the batch.
+        """
+        return [self.search_ranked(query, top_k, filters) for query in queries]
+
+    async def asearch_many(self, queries: list[str], top_k: int = 20,
+                           filters: SearchFilters | None = None) -> list[Ranking]:
+        """Async search_many(); the default runs it in a worker thread."""
+        return await asyncio.to_thread(self.search_many, queries, top_k, filters)
+
+    def attach_metadata(self, metadata) -> None:
+        """Receive the metadata index (e.g. to build filter masks)."""
+
+    def index_version(self) -> str:
+        """Identifier of the loaded index data ("" if not versioned)."""
+        return ""
+
+    def ranking_settings(self) -> dict:
+        """JSON-serializable settings that change rankings for the same index."""
+        return {}
+
     def name(self) -> str:
         """Human-readable name for this search engine (used in reports)."""
         return self.__class__.__name__
@@ -0,0 +1,99 @@
+"""
+Ranked-result cache for the search engine.
+
+Pagination re-runs the same search for every page, and popular queries
+recur. Entries hold the full ranked id list with scores, keyed on the
+canonical form of the query — its tokens plus its sorted citations — so
+queries differing only in case, punctuation or spacing share an entry;
+callers add the active search filters to the key.
+Keys carry the index version, and binding the cache to a new version
+drops everything, so results never outlive the index they came from.
+
+A cached ranking of depth N answers any request for top_k <= N by slicing.
+Eviction is LRU by entry count, plus a TTL.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+
+from backend.search.interface import Ranking
+from backend.search.utils import parse_query_citations, tokenize
+
+
+def canonical_query_key(query: str, tokens: tuple[str, ...] | None = None) -> tuple:
+    """(tokens, gov code citations, regulation citations) for a query.
+
+    tokens: tokenize(query), if the caller already has it.
+    """
+    parsed = parse_query_citations(query)
+    return (
+        tuple(tokenize(query)) if tokens is None else tuple(tokens),
+        tuple(sorted(c["raw"] for c in parsed["gov_code"])),
+        tuple(sorted(c["raw"] for c in parsed["regulations"])),
+    )
+
+
+class ResultCache:
+    """LRU + TTL cache of Rankings keyed on (index version, canonical query)."""
+
+    def __init__(self, capacity: int = 1024, ttl: float = 600.0):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.version: str | None = None
+        self._entries: OrderedDict[tuple, tuple[float, int, Ranking]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def bind(self, version: str) -> None:
+        """Attach to an index version, dropping entries from any other."""
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self.version = version
+
+    def get(self, key: tuple, top_k: int) -> Ranking | None:
+        with self._lock:
+            entry = self._entries.get((self.version, key))
+            if entry is not None:
+                created, depth, ranking = entry
+                # A shorter-than-requested ranking is only complete if the
+                # engine had nothing more to return at that depth
+                deep_enough = top_k <= depth or len(ranking.ids) < depth
+                if time.monotonic() - created > self.ttl:
+                    del self._entries[(self.version, key)]
+                elif deep_enough:
+                    self._entries.move_to_end((self.version, key))
+                    self.hits += 1
+                    return ranking.head(top_k)
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple, top_k: int, ranking: Ranking) -> None:
+        if ranking.degraded:
+            return  # a fallback must not be served as the query's answer
+        with self._lock:
+            full_key = (self.version, key)
+            existing = self._entries.get(full_key)
+            if (existing is not None and existing[1] > top_k
+                    and time.monotonic() - existing[0] <= self.ttl):
+                return  # keep the deeper ranking
+            self._entries[full_key] = (time.monotonic(), top_k, ranking)
+            self._entries.move_to_end(full_key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "version": self.version,
+            }
@@ -0,0 +1,89 @@
+"""
+Tokenizer bound to a BM25 index vocabulary.
+
+tokenize() yields strings, and SparseBM25 resolves each one against the
+vocabulary — a binary search over the memory-mapped string table per token,
+per call (top_k, match_count and get_batch_scores each repeat it). A
+Tokenizer resolves a query once, to the in-vocabulary term ids that the BM25
+methods accept directly; out-of-vocabulary tokens are dropped there.
+
+Tokens are exactly tokenize()'s, so rankings are unchanged. Recent queries
+are kept in a small LRU, and encode_many() resolves the distinct tokens of a
+whole batch (queries or documents) with one vectorized vocabulary lookup.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+
+from backend.search.utils import tokenize
+
+# (tokens, in-vocabulary term ids) of one text
+Encoded = tuple[tuple[str, ...], tuple[int, ...]]
+
+
+class Tokenizer:
+    """tokenize() plus vocabulary term ids, with an LRU of recent texts."""
+
+    def __init__(self, vocab, capacity: int = 1024):
+        # vocab: term → id mapping with .get(); a StringTable adds get_many()
+        self.vocab = vocab
+        self.capacity = capacity
+        self._cache: OrderedDict[str, Encoded] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encode(self, text: str) -> Encoded:
+        """(tokens, term ids) of text; ids keep repeats, in token order."""
+        with self._lock:
+            encoded = self._cache.get(text)
+            if encoded is not None:
+                self._cache.move_to_end(text)
+                return encoded
+        return self.encode_many([text])[0]
+
+    def tokens(self, text: str) -> tuple[str, ...]:
+        return self.encode(text)[0]
+
+    def term_ids(self, text: str) -> tuple[int, ...]:
+        return self.encode(text)[1]
+
+    def encode_many(self, texts: list[str], cache: bool = True) -> list[Encoded]:
+        """encode() of every text, with one vocabulary lookup for the batch.
+
+        cache=False neither reads nor fills the LRU (e.g. when tokenizing
+        documents for an index build).
+        """
+        results: list[Encoded | None] = [None] * len(texts)
+        if cache:
+            with self._lock:
+                for i, text in enumerate(texts):
+                    results[i] = self._cache.get(text)
+        todo = [i for i, encoded in enumerate(results) if encoded is None]
+        tokens = [tokenize(texts[i]) for i in todo]
+
+        distinct = list(dict.fromkeys(t for toks in tokens for t in toks))
+        term_id = dict(zip(distinct, self._lookup(distinct)))
+        for i, toks in zip(todo, tokens):
+            ids = tuple(term_id[t] for t in toks if term_id[t] >= 0)
+            results[i] = (tuple(toks), ids)
+
+        if cache and todo:
+            with self._lock:
+                for i in todo:
+                    self._cache[texts[i]] = results[i]
+                    self._cache.move_to_end(texts[i])
+                while len(self._cache) > self.capacity:
+                    self._cache.popitem(last=False)
+        return results
+
+    def _lookup(self, tokens: list[str]) -> list[int]:
+        """Term id of every token, -1 when out of vocabulary."""
+        if hasattr(self.vocab, "get_many"):
+            return self.vocab.get_many(tokens).tolist()
+        ids = (self.vocab.get(t) for t in tokens)
+        return [-1 if i is None else int(i) for i in ids]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
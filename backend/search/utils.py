@@ -3,6 +3,7 @@ Utility functions extracted from the search lab engines.
 
 tokenize() — from bm25_full_text.py (experiment 001b)
 parse_query_citations() — from bm25_citation_boost.py (experiment 004)
+citation_only() — queries that are nothing but statute/regulation citations
 """
 
 import re
@@ -126,3 +127,31 @@ def parse_query_citations(query: str) -> dict:
             regulations.append({"raw": full, "base": base, "subsection": sub})
 
     return {"gov_code": gov_code, "regulations": regulations}
+
+
+# Words that may surround citations in a citation-only query ("Gov. Code
+# § 1090", "Cal. Code Regs., tit. 2, § 18702.2", "Sections 87100 and 87103")
+_CITATION_WORDS = frozenset([
+    "section", "sections", "sec", "secs", "gov", "government", "code",
+    "reg", "regs", "regulation", "regulations", "cal", "ccr", "tit", "title",
+    "2", "fppc", "subd", "subdivision",
+])
+_CITATION_PATTERNS = (_RE_PREFIXED_STATUTE, _RE_PREFIXED_REG,
+                      _RE_BARE_STATUTE, _RE_BARE_REG)
+
+
+def citation_only(query: str) -> dict | None:
+    """Parsed citations if the query is only citations, else None.
+
+    Whatever remains once every citation is removed must be punctuation or
+    citation boilerplate (_CITATION_WORDS).
+    """
+    parsed = parse_query_citations(query)
+    if not (parsed["gov_code"] or parsed["regulations"]):
+        return None
+    rest = query
+    for pattern in _CITATION_PATTERNS:
+        rest = pattern.sub(" ", rest)
+    if any(t not in _CITATION_WORDS for t in tokenize(rest)):
+        return None
+    return parsed
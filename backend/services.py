@@ -0,0 +1,92 @@
+"""
+Search and opinion-summary helpers shared by the REST routers and the MCP
+tools, so both serve the same ranking depth, summaries and batch limits.
+"""
+
+from __future__ import annotations
+
+import logging
+
+from backend.models import OpinionBatchResponse, OpinionSummary, SearchResult
+from backend.search.filters import SearchFilters
+from backend.search.interface import Ranking
+
+logger = logging.getLogger(__name__)
+
+# Minimum ranking depth requested from the engine (pages within it are cached)
+RANK_DEPTH = 200
+MAX_BATCH_IDS = 1000
+
+
+def truncate(text: str | None, max_len: int = 300) -> str | None:
+    if not text or len(text) <= max_len:
+        return text
+    # Truncate at last space before max_len
+    truncated = text[:max_len]
+    last_space = truncated.rfind(" ")
+    if last_space > 0:
+        truncated = truncated[:last_space]
+    return truncated + "..."
+
+
+def opinion_summary(opinion_id: str, meta, model=OpinionSummary, **extra):
+    """Summary record (the search-result fields) of one opinion."""
+    return model(
+        opinion_id=opinion_id,
+        opinion_number=meta["opinion_number"],
+        date=meta["date"],
+        year=meta["year"],
+        question=meta["question"],
+        conclusion=truncate(meta["conclusion"]),
+        topics=[
+            t
+            for t in [meta["topic_primary"], meta["topic_secondary"]]
+            if t is not None
+        ],
+        statutes=meta["government_code_sections"],
+        document_type=meta["document_type"],
+        **extra,
+    )
+
+
+def opinion_summaries(ids: list[str], metadata) -> OpinionBatchResponse:
+    """Summary records for ids (in order, duplicates once) from the metadata index."""
+    opinions, missing = [], []
+    for opinion_id in dict.fromkeys(ids):
+        meta = metadata.opinions.get(opinion_id)
+        if meta is None:
+            missing.append(opinion_id)
+        else:
+            opinions.append(opinion_summary(opinion_id, meta))
+    return OpinionBatchResponse(opinions=opinions, missing=missing)
+
+
+def search_results(opinion_ids: list[str], metadata,
+                   first_rank: int = 1) -> list[SearchResult]:
+    """Ranked summaries; ids missing from the metadata are skipped."""
+    results = []
+    for i, opinion_id in enumerate(opinion_ids, start=first_rank):
+        meta = metadata.opinions.get(opinion_id)
+        if meta is not None:
+            results.append(opinion_summary(opinion_id, meta, SearchResult, rank=i))
+    return results
+
+
+async def search_page(engine, query: str, filters: SearchFilters | None,
+                      page: int, per_page: int) -> Ranking:
+    """One page of the engine's ranking; total still counts every match.
+
+    Ranking at least RANK_DEPTH deep lets the result cache serve the next
+    pages. An engine error is logged and gives an empty, degraded page.
+    """
+    start = (page - 1) * per_page
+    try:
+        ranking = await engine.asearch_ranked(
+            query, top_k=max(RANK_DEPTH, start + per_page), filters=filters
+        )
+    except Exception:
+        logger.exception("Search engine error for query: %s", query)
+        return Ranking([], [], 0, degraded=True)
+    return Ranking(ranking.ids[start : start + per_page],
+                   ranking.scores[start : start + per_page],
+                   ranking.total, ranking.degraded)
@@ -5,18 +5,21 @@ from __future__ import annotations
 import json
 import os
 import tempfile
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
 
 from backend.metadata import MetadataIndex
 from backend.middleware import rate_limiter
+from backend.opinion_detail import detail_cache
+from backend.search.filters import FilterIndex
+from backend.search.interface import Ranking
 
 
 def _build_test_metadata() -> MetadataIndex:
     """Build a MetadataIndex with 3 realistic test opinions backed by temp JSON files."""
-    index = MetadataIndex()
+    records = {}
 
     opinions_data = [
         {
@@ -30,6 +33,9 @@ def _build_test_metadata() -> MetadataIndex:
             "government_code_sections": ["87100", "87103"],
             "regulations": ["18700"],
             "document_type": "opinion",
+            # A-75-999 is not in the corpus
+            "prior_opinions": ["A-22-100", "A-75-999"],
+            "cited_by": [],
         },
         {
             "id": "I-23-045",
@@ -42,6 +48,8 @@ def _build_test_metadata() -> MetadataIndex:
             "government_code_sections": ["86100"],
             "regulations": [],
             "document_type": "informal",
+            "prior_opinions": [],
+            "cited_by": [],
         },
         {
             "id": "A-22-100",
@@ -54,6 +62,8 @@ def _build_test_metadata() -> MetadataIndex:
             "government_code_sections": ["89503"],
             "regulations": ["18940"],
             "document_type": "opinion",
+            "prior_opinions": [],
+            "cited_by": ["A-24-001", "I-23-045"],
         },
     ]
 
@@ -81,8 +91,8 @@ def _build_test_metadata() -> MetadataIndex:
             "citations": {
                 "government_code": op["government_code_sections"],
                 "regulations": op["regulations"],
-                "prior_opinions": [],
-                "cited_by": [],
+                "prior_opinions": op["prior_opinions"],
+                "cited_by": op["cited_by"],
             },
             "classification": {
                 "topic_primary": op["topic_primary"],
@@ -95,7 +105,7 @@ def _build_test_metadata() -> MetadataIndex:
         with open(file_path, "w") as f:
             json.dump(full_data, f)
 
-        index.opinions[op["id"]] = {
+        records[op["id"]] = {
             "opinion_number": op["id"],
             "date": op["date"],
             "year": op["year"],
@@ -105,39 +115,57 @@ def _build_test_metadata() -> MetadataIndex:
             "topic_secondary": op["topic_secondary"],
             "government_code_sections": op["government_code_sections"],
             "regulations": op["regulations"],
-            "prior_opinions": [],
-            "cited_by": [],
+            "prior_opinions": op["prior_opinions"],
+            "cited_by": op["cited_by"],
             "document_type": op["document_type"],
             "file_path": file_path,
             "local_pdf_path": None,
         }
 
-    index.topic_counts = {"conflicts_of_interest": 1, "lobbying": 1, "gifts": 1}
-    index.statute_counts = {"87100": 1, "87103": 1, "86100": 1, "89503": 1}
-    index.year_min = 2022
-    index.year_max = 2024
-    index.total_opinions = 3
+    return MetadataIndex.from_records(records)
 
-    return index
+
+@pytest.fixture()
+def mock_metadata():
+    return _build_test_metadata()
 
 
 @pytest.fixture()
-def mock_engine():
+def mock_engine(mock_metadata):
     engine = MagicMock()
     engine.name.return_value = "MockEngine"
+    engine.index_version.return_value = "test-index"
+    engine.ranking_settings.return_value = {"w_bm25": 0.4}
+    engine.embedding_model = "test-embedding"
+    engine.has_embedder = False
     engine.search.return_value = ["A-24-001", "I-23-045", "A-22-100"]
-    return engine
-
 
-@pytest.fixture()
-def mock_metadata():
-    return _build_test_metadata()
+    # Routers await asearch_ranked(); delegate so tests only configure
+    # search(), and filter its ranking through the real mask code
+    def ranked(query, top_k=20, filters=None):
+        ids = engine.search(query, top_k=top_k)
+        mask = FilterIndex.from_metadata(ids, mock_metadata).mask(filters)
+        if mask is not None:
+            ids = [oid for oid, keep in zip(ids, mask) if keep]
+        return Ranking(ids[:top_k], [0.0] * len(ids[:top_k]), len(ids))
+
+    engine.asearch = AsyncMock(
+        side_effect=lambda query, top_k=20: engine.search(query, top_k=top_k)
+    )
+    engine.asearch_ranked = AsyncMock(side_effect=ranked)
+    engine.asearch_many = AsyncMock(
+        side_effect=lambda queries, top_k=20, filters=None: [
+            ranked(query, top_k, filters) for query in queries
+        ]
+    )
+    return engine
 
 
 @pytest.fixture()
 def client(mock_engine, mock_metadata):
     with patch("backend.main.CitationScoreFusion", return_value=mock_engine), \
-         patch("backend.main.build_metadata_index", return_value=mock_metadata):
+         patch("backend.main.build_metadata_index", return_value=mock_metadata), \
+         patch("backend.main.ensure_corpus_store", return_value=None):
         from backend.main import app
         with TestClient(app) as tc:
             yield tc
@@ -146,5 +174,7 @@ def client(mock_engine, mock_metadata):
 @pytest.fixture(autouse=True)
 def _reset_rate_limiter():
     rate_limiter.reset()
+    detail_cache.clear()
     yield
     rate_limiter.reset()
+    detail_cache.clear()
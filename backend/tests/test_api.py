@@ -2,6 +2,18 @@
 
 from __future__ import annotations
 
+import json
+import os
+import shutil
+
+from backend.corpus import (
+    build_corpus_store, ensure_corpus_store, open_corpus_store,
+)
+from backend.http_cache import data_version
+from backend.metadata import file_fingerprints, fingerprints_version
+from backend.opinion_detail import DetailCache, detail_cache
+from backend.search.interface import Ranking
+
 
 def test_search_returns_results(client):
     resp = client.get("/api/search?q=conflict+of+interest")
@@ -12,6 +24,13 @@ def test_search_returns_results(client):
     assert data["query"] == "conflict of interest"
 
 
+def test_search_awaits_async_engine(client, mock_engine):
+    resp = client.get("/api/search?q=conflict")
+    assert resp.status_code == 200
+    mock_engine.asearch_ranked.assert_awaited_once()
+    assert mock_engine.asearch_ranked.await_args.args == ("conflict",)
+
+
 def test_search_empty_query(client):
     resp = client.get("/api/search?q=")
     assert resp.status_code == 200
@@ -58,14 +77,151 @@ def test_opinion_not_found(client):
 
 
 def test_opinion_file_read_error(client, mock_metadata):
-    # Point the file_path to a nonexistent file to trigger OSError
-    mock_metadata.opinions["A-24-001"]["file_path"] = "/tmp/nonexistent_opinion.json"
+    # Remove the backing file to trigger OSError
+    os.remove(mock_metadata.opinions["A-24-001"]["file_path"])
     resp = client.get("/api/opinions/A-24-001")
     assert resp.status_code == 500
     data = resp.json()
     assert data["error"] == "Failed to load opinion data"
 
 
+def test_opinion_served_from_corpus_store(client, mock_metadata, tmp_path):
+    files = [mock_metadata.opinions[oid]["file_path"] for oid in mock_metadata.ids]
+    expected = client.get("/api/opinions/A-24-001").json()
+    build_corpus_store(files, str(tmp_path / "corpus"))
+    client.app.state.corpus = open_corpus_store(str(tmp_path / "corpus"))
+    detail_cache.clear()
+
+    # The store answers without touching the JSON files
+    for file_path in files:
+        os.remove(file_path)
+    resp = client.get("/api/opinions/A-24-001")
+    assert resp.status_code == 200
+    assert resp.json() == expected
+    assert resp.json()["facts"] == "Test facts for this opinion."
+
+
+def test_corpus_store_refused_for_other_data(mock_metadata, tmp_path):
+    files = [mock_metadata.opinions[oid]["file_path"] for oid in mock_metadata.ids]
+    manifest = build_corpus_store(files, str(tmp_path / "corpus"))
+    path = str(tmp_path / "corpus")
+    assert open_corpus_store(path, manifest["data_version"]) is not None
+
+    # A touched file is the same data; an edited one is not
+    os.utime(files[0], ns=(0, 0))
+    assert fingerprints_version(file_fingerprints(files)) == manifest["data_version"]
+    with open(files[0], "a") as f:
+        f.write("\n")
+    current = fingerprints_version(file_fingerprints(files))
+    assert current != manifest["data_version"]
+    assert open_corpus_store(path, current) is None
+
+
+def test_corpus_store_built_at_startup_when_stale(mock_metadata, tmp_path):
+    data_dir = tmp_path / "extracted"
+    (data_dir / "2024").mkdir(parents=True)
+    for oid in mock_metadata.ids:
+        shutil.copy(mock_metadata.opinions[oid]["file_path"], data_dir / "2024")
+    files = sorted(str(p) for p in (data_dir / "2024").iterdir())
+    path = str(tmp_path / "corpus")
+
+    version = fingerprints_version(file_fingerprints(files))
+    store = ensure_corpus_store(version, str(data_dir), path)
+    assert store is not None and len(store) == 3
+    # Built for this data: opened as is
+    assert ensure_corpus_store(version, str(data_dir), path).version == store.version
+
+    os.remove(files[0])
+    version = fingerprints_version(file_fingerprints(files[1:]))
+    rebuilt = ensure_corpus_store(version, str(data_dir), path)
+    assert rebuilt.version != store.version and len(rebuilt) == 2
+
+
+def test_opinion_detail_cache_shared_with_mcp(client, mock_metadata):
+    from backend.mcp_server import get_opinion as mcp_get_opinion
+
+    first = client.get("/api/opinions/A-24-001")
+    # Later reads are served from the rendered bytes, not the file
+    os.remove(mock_metadata.opinions["A-24-001"]["file_path"])
+    second = client.get("/api/opinions/A-24-001")
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert json.loads(mcp_get_opinion("A-24-001")) == first.json()
+
+    stats = client.get("/api/health").json()["detail_cache"]
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 2, 1)
+
+
+def test_opinions_batch_from_metadata(client, mock_metadata):
+    from backend.mcp_server import get_opinion_summaries
+
+    # Summaries never touch the per-opinion files
+    for meta in mock_metadata.opinions.values():
+        os.remove(meta["file_path"])
+    resp = client.get("/api/opinions/batch?ids=I-23-045,NOPE&ids=A-24-001&ids=I-23-045")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [o["opinion_id"] for o in data["opinions"]] == ["I-23-045", "A-24-001"]
+    assert data["missing"] == ["NOPE"]
+    assert data["opinions"][1]["topics"] == ["conflicts_of_interest", "voting"]
+    assert "ETag" in resp.headers
+
+    post = client.post("/api/opinions/batch",
+                       json={"ids": ["I-23-045", "NOPE", "A-24-001"]})
+    assert post.json() == data
+    assert json.loads(get_opinion_summaries(["I-23-045", "NOPE", "A-24-001"])) == data
+
+
+def test_opinions_batch_validation(client):
+    assert client.get("/api/opinions/batch").status_code == 422
+    assert client.post("/api/opinions/batch", json={"ids": []}).status_code == 422
+    too_many = ",".join(f"X-{i}" for i in range(1001))
+    assert client.get(f"/api/opinions/batch?ids={too_many}").status_code == 422
+
+
+def test_citation_neighborhood(client):
+    resp = client.get("/api/citations/A-24-001/neighborhood?hops=2")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["total"] == 2
+    assert [(n["opinion_id"], n["hops"]) for n in data["nodes"]] == [
+        ("A-22-100", 1), ("I-23-045", 2)]
+    assert data["nodes"][0]["question"] == "Is this gift reportable?"
+
+    cited_by = client.get("/api/citations/A-22-100/neighborhood?direction=cited_by&limit=1")
+    assert cited_by.json()["total"] == 2
+    assert len(cited_by.json()["nodes"]) == 1
+    assert client.get("/api/citations/NOPE/neighborhood").status_code == 404
+    assert client.get("/api/citations/A-24-001/neighborhood?direction=up").status_code == 422
+
+
+def test_citation_path_and_co_citation(client):
+    path = client.get("/api/citations/path?source=A-24-001&target=I-23-045").json()
+    assert path["hops"] == 2
+    assert [o["opinion_id"] for o in path["path"]] == ["A-24-001", "A-22-100", "I-23-045"]
+
+    directed = client.get(
+        "/api/citations/path?source=A-24-001&target=I-23-045&direction=cites").json()
+    assert (directed["hops"], directed["path"]) == (None, [])
+
+    co = client.get("/api/citations/A-22-100/co-cited").json()
+    assert (co["citing_opinions"], co["total"], co["results"]) == (2, 0, [])
+
+
+def test_detail_cache_byte_budget():
+    cache = DetailCache(max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    assert cache.get("a") == b"1234"  # "b" is now least recently used
+    cache.put("c", b"1234")
+    assert cache.get("b") is None
+    assert cache.get("c") == b"1234"
+    cache.put("huge", b"x" * 11)  # larger than the budget: not cached
+    assert cache.get("huge") is None
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (2, 8, 1)
+
+
 def test_rate_limit_exceeded(client):
     for _ in range(60):
         resp = client.get("/api/search?q=test")
@@ -113,6 +269,39 @@ def test_search_filter_multi_topic(client):
     assert len(data["filters_applied"]["topic"]) == 2
 
 
+def test_search_filter_regulation_and_document_type(client, mock_engine):
+    resp = client.get("/api/search?q=test&regulation=18700&document_type=opinion")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [r["opinion_id"] for r in data["results"]] == ["A-24-001"]
+    assert data["total_results"] == 1
+    assert data["filters_applied"] == {"regulation": "18700", "document_type": ["opinion"]}
+    filters = mock_engine.asearch_ranked.await_args.kwargs["filters"]
+    assert filters.regulation == "18700"
+
+
+def test_search_batch(client, mock_engine):
+    resp = client.post("/api/search/batch", json={
+        "queries": ["conflict", "lobbyist"], "top_k": 2,
+        "document_type": ["opinion"],
+    })
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["filters_applied"] == {"document_type": ["opinion"]}
+    assert [item["query"] for item in data["results"]] == ["conflict", "lobbyist"]
+    first = data["results"][0]
+    assert first["total_results"] == 2
+    assert [r["opinion_id"] for r in first["results"]] == ["A-24-001", "A-22-100"]
+    assert [r["rank"] for r in first["results"]] == [1, 2]
+    mock_engine.asearch_many.assert_awaited_once()
+
+
+def test_search_batch_validation(client):
+    assert client.post("/api/search/batch", json={"queries": []}).status_code == 422
+    resp = client.post("/api/search/batch", json={"queries": ["a"], "top_k": 500})
+    assert resp.status_code == 422
+
+
 def test_filters_endpoint(client):
     resp = client.get("/api/filters")
     assert resp.status_code == 200
@@ -122,3 +311,112 @@ def test_filters_endpoint(client):
     assert data["year_min"] == 2022
     assert data["year_max"] == 2024
     assert data["total_opinions"] == 3
+
+
+def test_conditional_get_returns_304(client, mock_engine):
+    for url in ("/api/filters", "/api/opinions/A-24-001", "/api/search?q=gift"):
+        resp = client.get(url)
+        assert resp.status_code == 200
+        etag = resp.headers["etag"]
+        assert resp.headers["cache-control"].startswith("public")
+
+        resp = client.get(url, headers={"If-None-Match": f'W/"x", {etag}'})
+        assert resp.status_code == 304
+        assert resp.content == b""
+        assert resp.headers["etag"] == etag
+    # A 304 skips the search itself
+    assert mock_engine.asearch_ranked.await_count == 1
+
+
+def test_etag_depends_on_query_and_data_version(client):
+    a = client.get("/api/search?q=gift&topic=a&topic=b").headers["etag"]
+    assert client.get("/api/search?topic=a&q=gift&topic=b").headers["etag"] == a
+    assert client.get("/api/search?q=gifts&topic=a&topic=b").headers["etag"] != a
+
+    # Repeated values keep their order: it can order the response body
+    assert (client.get("/api/opinions/batch?ids=A-24-001&ids=I-23-045").headers["etag"]
+            != client.get("/api/opinions/batch?ids=I-23-045&ids=A-24-001").headers["etag"])
+    # Values are encoded, so a "&" inside one doesn't read as a separator
+    assert (client.get("/api/search?q=gift%26topic%3Da&topic=b").headers["etag"]
+            != client.get("/api/search?q=gift&topic=a&topic=b").headers["etag"])
+
+    client.app.state.data_version = "reloaded"
+    resp = client.get("/api/search?q=gift&topic=a&topic=b",
+                      headers={"If-None-Match": a})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != a
+
+
+def test_data_version_covers_ranking_settings(mock_engine, mock_metadata):
+    before = data_version(mock_engine, mock_metadata, None)
+    mock_engine.ranking_settings.return_value = {"w_bm25": 0.5}
+    assert data_version(mock_engine, mock_metadata, None) != before
+
+
+def test_degraded_ranking_is_not_cacheable(client, mock_engine):
+    mock_engine.asearch_ranked.side_effect = None
+    mock_engine.asearch_ranked.return_value = Ranking(["A-24-001"], [1.0], 1,
+                                                      degraded=True)
+    resp = client.get("/api/search?q=Section+87103+gift")
+    assert resp.status_code == 200
+    assert resp.json()["results"][0]["opinion_id"] == "A-24-001"
+    assert "etag" not in resp.headers
+    assert resp.headers["cache-control"] == "no-store"
+
+
+def test_search_engine_error_is_not_cacheable(client, mock_engine):
+    mock_engine.search.side_effect = RuntimeError("Engine crashed")
+    resp = client.get("/api/search?q=conflict")
+    assert resp.status_code == 200
+    assert "etag" not in resp.headers
+    assert resp.headers["cache-control"] == "no-store"
+
+
+def _ndjson(resp) -> list[dict]:
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in resp.text.splitlines()]
+
+
+def test_export_filters_without_query(client):
+    resp = client.get("/api/export?document_type=opinion")
+    assert resp.status_code == 200
+    lines = _ndjson(resp)
+    assert {line["id"] for line in lines} == {"A-24-001", "A-22-100"}
+    assert lines[0]["government_code_sections"]
+    assert "facts" not in lines[0]
+
+    assert len(_ndjson(client.get("/api/export"))) == 3
+    assert len(_ndjson(client.get("/api/export?limit=2"))) == 2
+
+
+def test_export_query_and_detail_fields(client, mock_engine):
+    resp = client.get("/api/export?q=conflict&fields=facts,year&fields=cited_by")
+    lines = _ndjson(resp)
+    assert [line["id"] for line in lines] == ["A-24-001", "I-23-045", "A-22-100"]
+    assert lines[0] == {"id": "A-24-001", "facts": "Test facts for this opinion.",
+                        "year": 2024, "cited_by": []}
+    # Every match is ranked, not just the first page
+    assert mock_engine.asearch_ranked.await_args.kwargs["top_k"] >= 3
+
+
+def test_export_rejects_unknown_fields(client):
+    resp = client.get("/api/export?fields=question,full_text")
+    assert resp.status_code == 422
+    assert "full_text" in resp.json()["error"]
+
+
+def test_lifespan_uses_preloaded_state(mock_engine, mock_metadata):
+    from unittest.mock import patch
+
+    from fastapi.testclient import TestClient
+
+    from backend import main
+
+    main._preloaded.update(engine=mock_engine, metadata=mock_metadata)
+    try:
+        with patch("backend.main.CitationScoreFusion") as engine_cls, \
+             TestClient(main.app) as tc:
+            assert tc.get("/api/health").json()["opinions_indexed"] == 3
+        engine_cls.assert_not_called()
+    finally:
+        main._preloaded.clear()
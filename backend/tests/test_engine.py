@@ -0,0 +1,194 @@
+"""Engine-level tests of CitationScoreFusion over a small built fixture index."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+import backend.search.engine as engine_module
+from backend.config import settings
+from backend.corpus import opinion_files
+from backend.metadata import build_metadata_index
+from backend.search.build import build_index
+from backend.search.embedders import HashEmbedder
+from backend.search.filters import SearchFilters
+from backend.search.interface import Ranking
+
+# (id, year, topic, full text, government code sections, regulations)
+OPINIONS = [
+    ("A-24-001", 2024, "conflicts_of_interest",
+     "The council member may not vote on the contract under Section 1090 "
+     "because of a financial interest in the contract.", ["1090"], []),
+    ("A-23-002", 2023, "conflicts_of_interest",
+     "A contract made by a council member in violation of Section 1090 is "
+     "void; the financial interest need not be large.", ["1090"], []),
+    ("A-22-003", 2022, "conflicts_of_interest",
+     "Section 87103(a) disqualification applies to the official's investment "
+     "in the business entity.", ["87103(a)", "87103"], []),
+    ("A-21-004", 2021, "conflicts_of_interest",
+     "The official's investment in a business entity is an economic interest "
+     "under Section 87103; Regulation 18702.2 applies to the decision.",
+     ["87103"], ["18702.2"]),
+    ("I-20-005", 2020, "lobbying",
+     "A lobbyist must register and file quarterly reports with the council.",
+     [], []),
+    ("I-19-006", 2019, "gifts_honoraria",
+     "Gifts to public officials above the limit must be reported under "
+     "Section 89503.", ["89503"], []),
+    ("A-18-007", 2018, "campaign_finance",
+     "Campaign contributions and the contribution limit for the council race.",
+     [], []),
+    ("A-17-008", 2017, "conflicts_of_interest",
+     "The planning commissioner owns property near the project site; "
+     "Regulation 18702.2 governs the decision.", [], ["18702.2"]),
+    # Files with "id": null exist in the real corpus
+    (None, 2016, "other",
+     "The carvalheiro billboard scoring memo mentions the council contract.",
+     [], []),
+]
+
+
+def write_corpus(data_dir) -> None:
+    for oid, year, topic, text, sections, regs in OPINIONS:
+        path = data_dir / str(year) / f"{oid}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({
+            "id": oid,
+            "year": year,
+            "parsed": {"date": f"{year}-01-15", "document_type": "opinion"},
+            "sections": {"question": text, "conclusion": text},
+            "content": {"full_text": text},
+            "citations": {"government_code": sections, "regulations": regs,
+                          "prior_opinions": [], "cited_by": []},
+            "classification": {"topic_primary": topic, "topic_secondary": None},
+            "embedding": {"qa_text": text},
+        }))
+
+
+@pytest.fixture()
+def engine(tmp_path, monkeypatch):
+    data_dir = tmp_path / "extracted"
+    write_corpus(data_dir)
+    index_dir = str(tmp_path / "index")
+    build_index(list(opinion_files(str(data_dir))), index_dir,
+                embedder=HashEmbedder(16), workers=1)
+    monkeypatch.setattr(engine_module, "_INDEX_DIR", index_dir)
+    monkeypatch.setattr(settings, "embedding_provider", "hash")
+    monkeypatch.setattr(settings, "embedding_batch_window_ms", 0.0)
+    monkeypatch.setattr(settings, "embedding_cache_path", "")
+    engine = engine_module.CitationScoreFusion()
+    engine.attach_metadata(build_metadata_index(str(data_dir), snapshot_dir=None))
+    return engine
+
+
+def clear_result_cache(engine) -> None:
+    version = engine.index_version()
+    engine.result_cache.bind("")
+    engine.result_cache.bind(version)
+
+
+def test_bm25_path_ranks_and_counts_matches(engine):
+    ranking = engine.search_ranked("lobbyist quarterly reports", top_k=5)
+    assert ranking.ids == ["I-20-005"]
+    assert ranking.total == 1 and not ranking.degraded
+
+    # total counts every match, not just the top_k returned
+    ranking = engine.search_ranked("council", top_k=2)
+    assert len(ranking.ids) == 2 and ranking.total > 2
+    assert ranking.scores == sorted(ranking.scores, reverse=True)
+
+
+def test_citation_queries_fuse_within_the_pool(engine):
+    ranking = engine.search_ranked("Section 1090 council member contract", top_k=10)
+    assert set(ranking.ids[:2]) == {"A-24-001", "A-23-002"}
+    assert not ranking.degraded
+    assert engine.search_ranked("Section 1090 council member contract",
+                                top_k=10) == ranking  # result cache
+
+
+def test_rows_without_an_id_are_never_returned(engine):
+    query = "carvalheiro billboard scoring"
+    assert "" in engine._ids  # the "id": null file keeps its index row
+    assert engine.search_ranked(query, top_k=10) == Ranking([], [], 0)
+    ranking = engine.search_ranked("council contract", top_k=10)
+    assert "" not in ranking.ids
+    assert ranking.total == len(ranking.ids)
+    assert engine.search_many([query, "council contract"], top_k=10) == [
+        Ranking([], [], 0), ranking]
+
+
+def test_circuit_breaker_ranking_is_cacheable(engine, capsys):
+    query = "Section 89503 gifts reported above the limit"
+    ranking = engine.search_ranked(query, top_k=10)
+    assert "[CB]" in capsys.readouterr().err
+    assert ranking.ids[0] == "I-19-006" and not ranking.degraded
+    hits = engine.result_cache.hits
+    assert engine.search_ranked(query, top_k=10) == ranking
+    assert engine.result_cache.hits == hits + 1
+
+
+def test_embedding_failure_falls_back_uncached(engine, monkeypatch):
+    def fail(texts):
+        raise RuntimeError("provider down")
+
+    query = "Section 1090 council member contract"
+    with monkeypatch.context() as m:
+        m.setattr(engine._embedder, "embed", fail)
+        ranking = engine.search_ranked(query, top_k=10)
+        assert ranking.degraded
+        assert set(ranking.ids[:2]) == {"A-24-001", "A-23-002"}
+        assert asyncio.run(engine.asearch_ranked(query, top_k=10)).degraded
+        assert all(r.degraded for r in engine.search_many([query], top_k=10))
+        assert engine.result_cache.stats()["entries"] == 0
+
+    assert not engine.search_ranked(query, top_k=10).degraded
+
+
+def test_filters_apply_before_top_k(engine):
+    filters = SearchFilters(topics=("conflicts_of_interest",), year_start=2022)
+    ranking = engine.search_ranked("council contract interest", top_k=10,
+                                   filters=filters)
+    assert ranking.ids and set(ranking.ids) <= {"A-24-001", "A-23-002",
+                                                "A-22-003"}
+    assert ranking.total == len(ranking.ids)
+
+    lobbying = SearchFilters(topics=("lobbying",))
+    assert engine.search_ranked("council", 10, lobbying).ids == ["I-20-005"]
+
+
+def test_citation_only_queries_fast_path(engine, monkeypatch):
+    query = "Regulation 18702.2"
+    calls = []
+    monkeypatch.setattr(engine, "_citation_ranking",
+                        lambda *args, real=engine._citation_ranking:
+                        calls.append(args) or real(*args))
+
+    # Off by default while the query can be fused
+    fused = engine.search_ranked(query, top_k=10)
+    assert not calls and {"A-21-004", "A-17-008"} <= set(fused.ids)
+
+    clear_result_cache(engine)
+    monkeypatch.setattr(engine, "_cite_fast", True)
+    fast = engine.search_ranked(query, top_k=10)
+    assert len(calls) == 1
+    assert set(fast.ids) == {"A-21-004", "A-17-008"} and fast.total == 2
+
+    # Without an embedder (and no cached query embedding) it replaces BM25
+    monkeypatch.setattr(engine, "_cite_fast", False)
+    monkeypatch.setattr(engine, "_embedder", None)
+    clear_result_cache(engine)
+    assert engine.search_ranked("Reg. 18702.2", top_k=10) == fast
+    clear_result_cache(engine)
+    assert engine.search_many(["Reg. 18702.2"], top_k=10) == [fast]
+    assert len(calls) == 3
+
+
+def test_search_many_matches_single_queries(engine):
+    queries = ["council contract", "Section 87103(a)", "lobbyist",
+               "Section 1090 council member contract", "council contract"]
+    batch = engine.search_many(queries, top_k=5)
+    clear_result_cache(engine)  # drop the batch's cached rankings
+    assert batch == [engine.search_ranked(q, top_k=5) for q in queries]
+    assert batch[0] == batch[-1]
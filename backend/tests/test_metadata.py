@@ -0,0 +1,159 @@
+"""Tests for the columnar metadata index."""
+
+from __future__ import annotations
+
+import json
+import os
+
+import backend.metadata as metadata_module
+from backend.metadata import MetadataIndex, build_metadata_index
+
+
+def _record(i: int) -> dict:
+    return {
+        "opinion_number": f"A-{i:03d}",
+        "date": None if i % 3 else f"2020-01-{i % 28 + 1:02d}",
+        "year": 1990 + i % 30,
+        "question": f"Question {i}: may the official participate? " * (i % 4),
+        "conclusion": None if i % 5 == 0 else f"Conclusion {i} — ünïcode",
+        "topic_primary": [None, "gifts", "lobbying"][i % 3],
+        "topic_secondary": None,
+        "government_code_sections": [str(87100 + i % 4), "1090"][: i % 3],
+        "regulations": ["18700"] if i % 2 else [],
+        "prior_opinions": [f"A-{i - 1:03d}"] if i else [],
+        "cited_by": [],
+        "document_type": "opinion",
+        "file_path": f"/data/{i}.json",
+        "local_pdf_path": None,
+    }
+
+
+def test_from_records_round_trip():
+    # More rows than one compressed text block
+    records = {f"A-{i:03d}": _record(i) for i in range(150)}
+    index = MetadataIndex.from_records(records)
+
+    assert len(index.opinions) == 150
+    assert "A-149" in index.opinions and "missing" not in index.opinions
+    assert index.opinions.get("missing") is None
+    for oid, record in records.items():
+        assert index.opinions[oid] == record
+    assert index.row("A-010") == 10
+    assert index.rows(["A-002", "missing"]).tolist() == [2, -1]
+
+
+def test_aggregates():
+    records = {f"A-{i:03d}": _record(i) for i in range(30)}
+    index = MetadataIndex.from_records(records)
+
+    assert index.topic_counts == {"gifts": 10, "lobbying": 10}
+    assert index.statute_counts["1090"] == 10
+    assert sum(index.statute_counts.values()) == sum(
+        len(r["government_code_sections"]) for r in records.values())
+    assert (index.year_min, index.year_max) == (1990, 2019)
+    assert index.total_opinions == 30
+
+    empty = MetadataIndex.from_records({})
+    assert (empty.year_min, empty.year_max, empty.total_opinions) == (0, 0, 0)
+
+
+def test_citation_graph():
+    records = {f"A-{i:03d}": _record(i) for i in range(6)}
+    # Edges also come from cited_by; unknown ids and self-citations are dropped
+    records["A-005"]["prior_opinions"] = ["A-004", "A-001", "A-005", "X-1"]
+    records["A-001"]["cited_by"] = ["A-003", "A-005", "X-2"]
+    graph = MetadataIndex.from_records(records).citations
+
+    assert graph.n_edges == 7  # 1→0 2→1 3→2 4→3 5→4 5→1 3→1
+    assert graph.cites(5).tolist() == [1, 4]
+    assert graph.cited_by(1).tolist() == [2, 3, 5]
+    assert graph.in_degree().tolist() == [1, 3, 1, 1, 1, 0]
+
+    rows, dist = graph.neighborhood([1], 2, "cited_by")
+    assert list(zip(rows.tolist(), dist.tolist())) == [(2, 1), (3, 1), (5, 1), (4, 2)]
+    rows, _ = graph.neighborhood([5], 6, "cites")
+    assert rows.tolist() == [1, 4, 0, 3, 2]
+    assert graph.neighborhood([0], 3, "cites")[0].tolist() == []
+
+    assert graph.shortest_path(0, 5, "both") == [0, 1, 5]
+    assert graph.shortest_path(0, 5, "cites") is None
+    assert graph.shortest_path(5, 0, "cites") == [5, 1, 0]
+    assert graph.shortest_path(5, 2, "cites", max_hops=1) is None
+
+    # Cited together with 1 by 3 (with 2) and by 5 (with 4)
+    rows, counts = graph.co_cited(1)
+    assert (rows.tolist(), counts.tolist()) == ([2, 4], [1, 1])
+
+    rank = graph.pagerank()
+    assert abs(rank.sum() - 1) < 1e-9
+    assert rank.argmax() == 0  # everything flows down the chain to A-000
+    assert rank[1] > rank[2] > rank[5]
+
+
+def test_save_load_round_trip(tmp_path):
+    records = {f"A-{i:03d}": _record(i) for i in range(150)}
+    index = MetadataIndex.from_records(records)
+    index.save(str(tmp_path / "index.npz"))
+    loaded = MetadataIndex.load(str(tmp_path / "index.npz"))
+
+    assert loaded.ids == index.ids
+    for oid, record in records.items():
+        assert loaded.opinions[oid] == record
+    assert loaded.topic_counts == index.topic_counts
+    assert loaded.statute_counts == index.statute_counts
+    assert (loaded.year_min, loaded.year_max) == (index.year_min, index.year_max)
+
+
+def _write_opinion(data_dir, year: int, oid: str, question: str) -> None:
+    os.makedirs(data_dir / str(year), exist_ok=True)
+    with open(data_dir / str(year) / f"{oid}.json", "w") as f:
+        json.dump({"id": oid, "year": year, "sections": {"question": question},
+                   "content": {"full_text": "..."}}, f)
+
+
+def test_snapshot_reuse_and_incremental_rebuild(tmp_path, monkeypatch):
+    data_dir, snapshot_dir = tmp_path / "extracted", str(tmp_path / "snapshot")
+    for year in (1990, 1991, 1992):
+        for i in range(3):
+            _write_opinion(data_dir, year, f"{year}-{i}", f"Q {year}-{i}")
+
+    parsed = []
+    read_record = metadata_module._read_record
+
+    def counting_read(file_path, filename):
+        parsed.append(filename)
+        return read_record(file_path, filename)
+
+    monkeypatch.setattr(metadata_module, "_read_record", counting_read)
+
+    first = build_metadata_index(str(data_dir), snapshot_dir)
+    assert len(parsed) == 9 and first.total_opinions == 9
+
+    # Unchanged corpus: nothing is parsed, touched files included
+    parsed.clear()
+    os.utime(data_dir / "1990" / "1990-0.json", ns=(1, 1))
+    again = build_metadata_index(str(data_dir), snapshot_dir)
+    assert parsed == []
+    assert again.ids == first.ids and again.version == first.version
+    assert again.opinions["1991-2"] == first.opinions["1991-2"]
+
+    # One year changes: only that directory is re-parsed
+    _write_opinion(data_dir, 1991, "1991-1", "Revised question")
+    _write_opinion(data_dir, 1991, "1991-9", "New opinion")
+    os.utime(data_dir / "1991" / "1991-1.json", ns=(1, 1))
+    parsed.clear()
+    updated = build_metadata_index(str(data_dir), snapshot_dir)
+    assert sorted(parsed) == ["1991-0.json", "1991-1.json", "1991-2.json",
+                              "1991-9.json"]
+    assert updated.total_opinions == 10
+    assert updated.opinions["1991-1"]["question"] == "Revised question"
+    assert updated.opinions["1990-0"] == first.opinions["1990-0"]
+
+    # A removed year drops out of the index and the snapshot
+    for name in os.listdir(data_dir / "1992"):
+        os.remove(data_dir / "1992" / name)
+    os.rmdir(data_dir / "1992")
+    trimmed = build_metadata_index(str(data_dir), snapshot_dir)
+    assert trimmed.total_opinions == 7
+    assert sorted(os.listdir(os.path.join(snapshot_dir, "years"))) == [
+        "1990.json.z", "1991.json.z"]
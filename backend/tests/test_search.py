@@ -0,0 +1,532 @@
+"""Tests for search engine building blocks (no index files required)."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import pickle
+import threading
+import time
+
+import numpy as np
+from fastapi.testclient import TestClient
+from rank_bm25 import BM25Okapi
+
+import backend.search.build as build_module
+import backend.search.engine as engine_module
+from backend.metadata import MetadataIndex
+from backend.search.bm25 import SparseBM25
+from backend.search.embed_server import create_app
+from backend.search.embedders import (
+    EmbeddingProvider,
+    HashEmbedder,
+    MicroBatcher,
+    OpenAIEmbedder,
+)
+from backend.search.embedding_cache import EmbeddingCache
+from backend.search.embeddings import QuantizedEmbeddings
+from backend.search.engine import (
+    _authority_prior,
+    _convert_once,
+    _FusionPool,
+    _min_max_normalize,
+    _needs_convert,
+    _top_k,
+)
+from backend.search.index_format import (
+    IndexWriter,
+    StringTable,
+    _write_arrays,
+    add_authority,
+    encode_strings,
+    open_index,
+    verify_index,
+)
+from backend.search.filters import FilterIndex, SearchFilters
+from backend.search.interface import Ranking
+from backend.search.result_cache import ResultCache, canonical_query_key
+from backend.search.tokenizer import Tokenizer
+from backend.search.utils import citation_only, tokenize
+
+CORPUS = [
+    "The council member may not vote on the contract under Section 1090.",
+    "A lobbyist must register and file quarterly reports.",
+    "Gifts to public officials above the limit must be reported.",
+    "The planning commissioner owns property near the project site.",
+    "Section 87103(a) disqualification applies to the business entity investment.",
+    "Campaign contributions and the contribution limit for the council race.",
+    "The council member owns stock in the business entity.",
+]
+
+
+def _okapi() -> BM25Okapi:
+    return BM25Okapi([tokenize(doc) for doc in CORPUS])
+
+
+def test_sparse_bm25_matches_okapi_scores():
+    okapi = _okapi()
+    sparse = SparseBM25.from_okapi(okapi)
+    for query in [
+        "council member vote contract",
+        "Section 87103(a) business entity",
+        "council council stock",
+        "unknown words only",
+    ]:
+        tokens = tokenize(query)
+        np.testing.assert_allclose(
+            sparse.get_scores(tokens), okapi.get_scores(tokens), rtol=1e-6
+        )
+
+
+def test_top_k_matches_exhaustive_ranking():
+    sparse = SparseBM25.from_okapi(_okapi())
+    for query in ["council member business entity", "lobbyist gifts council"]:
+        tokens = tokenize(query)
+        scores = sparse.get_scores(tokens)
+        for k in (1, 3, 10):
+            rows, top_scores = sparse.top_k(tokens, k)
+            expected = np.sort(scores[scores > 0])[::-1][:k]
+            np.testing.assert_array_equal(top_scores, expected)
+            np.testing.assert_array_equal(scores[rows], top_scores)
+
+
+def test_masked_top_k_and_match_count():
+    sparse = SparseBM25.from_okapi(_okapi())
+    tokens = tokenize("council member business entity")
+    scores = sparse.get_scores(tokens)
+    for allowed in ([6], [0, 4, 5], [0, 1, 2, 3, 4, 5, 6]):
+        mask = np.zeros(len(CORPUS) + 2, dtype=bool)  # engine rows may be longer
+        mask[allowed] = True
+        rows, top_scores = sparse.top_k(tokens, 2, mask)
+        eligible = [r for r in allowed if scores[r] > 0]
+        expected = sorted(eligible, key=lambda r: (-scores[r], r))[:2]
+        assert rows.tolist() == expected
+        np.testing.assert_array_equal(top_scores, scores[expected])
+        assert sparse.match_count(tokens, mask) == len(eligible)
+    assert sparse.match_count(tokens) == int((scores > 0).sum())
+
+
+def test_top_k_many_matches_single_queries(monkeypatch):
+    sparse = SparseBM25.from_okapi(_okapi())
+    queries = [tokenize(q) for q in (
+        "council member business entity", "lobbyist gifts council",
+        "unknown words only", "", "council council stock",
+    )]
+    mask = np.ones(len(CORPUS), dtype=bool)
+    mask[[0, 6]] = False
+    # One query per chunk as well as all of them in one
+    for batch_bytes in (2**20, 1):
+        monkeypatch.setattr("backend.search.bm25._BATCH_BYTES", batch_bytes)
+        for m in (None, mask):
+            batched = sparse.top_k_many(queries, 3, m)
+            for tokens, (rows, scores, total) in zip(queries, batched):
+                single_rows, single_scores = sparse.top_k(tokens, 3, m)
+                assert rows.tolist() == single_rows.tolist()
+                np.testing.assert_allclose(scores, single_scores, rtol=1e-12)
+                assert total == sparse.match_count(tokens, m)
+
+
+def test_filter_index_masks():
+    def record(year, topic, doc_type, statutes, regulations):
+        return {"opinion_number": "", "date": None, "year": year,
+                "question": None, "conclusion": None, "topic_primary": topic,
+                "topic_secondary": None, "government_code_sections": statutes,
+                "regulations": regulations, "prior_opinions": [],
+                "cited_by": [], "document_type": doc_type, "file_path": "",
+                "local_pdf_path": None}
+
+    metadata = MetadataIndex.from_records({
+        "C": record(1995, "gifts", "opinion", ["84308"], ["18700"]),
+        "A": record(2020, "gifts", "opinion", ["1090"], ["18700"]),
+        "B": record(1992, "lobbying", "informal", ["84308", "1090"], []),
+    })
+    index = FilterIndex.from_metadata(["A", "B", "C", "no-metadata"], metadata)
+
+    def rows(**kw):
+        return np.flatnonzero(index.mask(SearchFilters(**kw))).tolist()
+
+    assert index.mask(SearchFilters()) is None
+    assert rows(topics=["gifts"]) == [0, 2]
+    assert rows(topics=["gifts", "lobbying"]) == [0, 1, 2]
+    assert rows(statute="84308", year_start=1990, year_end=1995) == [1, 2]
+    assert rows(regulation="18700", document_types=["opinion"]) == [0, 2]
+    assert rows(year_end=2000) == [1, 2]
+    assert rows(statute="99999") == []
+    assert SearchFilters(topics=["b", "a", "a"]) == SearchFilters(topics=("a", "b"))
+
+
+def test_get_batch_scores_matches_dense_scores():
+    sparse = SparseBM25.from_okapi(_okapi())
+    tokens = tokenize("council member stock business entity")
+    rows = np.array([6, 0, 4, 2])
+    np.testing.assert_allclose(
+        sparse.get_batch_scores(tokens, rows), sparse.get_scores(tokens)[rows]
+    )
+
+
+def test_quantized_embeddings_rescore_shortlist():
+    rng = np.random.default_rng(0)
+    matrix = rng.normal(size=(50, 32)).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    query = matrix[7]
+    rows = np.array([3, 7, 11, 20, 42])
+
+    store = QuantizedEmbeddings.from_dense(matrix)
+    assert store.nbytes < matrix.nbytes / 3
+
+    exact = matrix[rows] @ query
+    coarse = store.similarities(rows, query)
+    np.testing.assert_allclose(coarse, exact, atol=0.02)
+
+    rescored = store.similarities(rows, query, rescore=2)
+    top2 = np.argsort(-exact)[:2]
+    np.testing.assert_allclose(rescored[top2], exact[top2], rtol=1e-6)
+
+
+def test_top_k_matches_stable_sort_with_ties():
+    rng = np.random.default_rng(0)
+    scores = rng.integers(0, 5, size=200).astype(np.float64)  # many ties
+    expected = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+    for k in (1, 7, 50, 199, 200, 500):
+        assert _top_k(scores, k).tolist() == expected[:k]
+    assert _top_k(scores[:0], 5).tolist() == []
+
+    np.testing.assert_array_equal(_min_max_normalize(np.array([2.0, 4.0, 3.0])),
+                                  [0.0, 1.0, 0.5])
+    np.testing.assert_array_equal(_min_max_normalize(np.array([3.0, 3.0])), [1.0, 1.0])
+
+
+def test_bm25_fallback_ranking_is_degraded():
+    pool = _FusionPool(["a", "b", "c"], np.array([0, 2]), np.array([1.0, 3.0]), 5)
+    fused = pool.ranking(np.array([0.9, 0.1]))
+    fallback = pool.bm25_ranking()
+    assert (fused.ids, fused.degraded) == (["a", "c"], False)
+    assert (fallback.ids, fallback.total, fallback.degraded) == (["c", "a"], 2, True)
+    assert fallback.head(1) == Ranking(["c"], [3.0], 2, True)
+
+
+def test_string_table_get_many_matches_get():
+    terms = sorted(["a", "ab", "abcdefgh", "abcdefghi", "abcdefgz", "b",
+                    "section", "sections", "87103", "87103a", "zz"],
+                   key=lambda t: t.encode("utf-8"))
+    table = StringTable(*encode_strings(terms))
+    keys = terms + ["", "aa", "abcdefg", "abcdefghij", "abcdefgha", "zzz", "0"]
+    expected = [-1 if table.get(k) is None else table.get(k) for k in keys]
+    assert table.get_many(keys).tolist() == expected
+    assert table.get_many(terms).tolist() == list(range(len(terms)))
+    assert len(table.get_many([])) == 0
+
+
+def test_tokenizer_term_ids_match_string_tokens():
+    sparse = SparseBM25.from_okapi(_okapi())
+    terms = sorted(sparse.vocab, key=sparse.vocab.get)
+    table = StringTable(*encode_strings(terms))
+    queries = ["Council member business entity", "Section 87103(a) council council",
+               "unknown words only", "the of and", ""]
+    for vocab in (sparse.vocab, table):
+        tokenizer = Tokenizer(vocab, capacity=2)
+        encoded = tokenizer.encode_many(queries)
+        for query, (tokens, term_ids) in zip(queries, encoded):
+            assert list(tokens) == tokenize(query)
+            assert term_ids == tuple(sparse.vocab[t] for t in tokens
+                                     if t in sparse.vocab)
+            np.testing.assert_array_equal(sparse.get_scores(term_ids),
+                                          sparse.get_scores(tokens))
+            assert sparse.top_k(term_ids, 3)[0].tolist() == \
+                sparse.top_k(tokens, 3)[0].tolist()
+        assert tokenizer.encode("council council") == (("council", "council"),
+                                                       (sparse.vocab["council"],) * 2)
+        assert len(tokenizer._cache) == 2  # LRU capacity
+        assert tokenizer.term_ids("unknown words only") == ()
+
+
+def test_index_format_round_trip(tmp_path):
+    okapi = _okapi()
+    sparse = SparseBM25.from_okapi(okapi)
+    terms = sorted(sparse.vocab, key=sparse.vocab.get)
+    ids = [f"A-24-{i:03d}" for i in range(len(CORPUS))]
+    matrix = np.eye(len(CORPUS), 8, dtype=np.float32)
+
+    writer = IndexWriter(str(tmp_path / "index"))
+    _write_arrays(writer, ids, sparse, np.asarray(okapi.doc_len), matrix,
+                  np.ones(len(CORPUS), dtype=bool),
+                  {"gc_exact": {"1090": np.array([0])},
+                   "gc_base": {"87103": np.array([4, 6])},
+                   "reg_exact": {}})
+    writer.commit(n_docs=len(ids), n_bm25_docs=len(ids))
+
+    index = open_index(str(tmp_path / "index"))
+    assert index.opinion_ids == ids
+    assert isinstance(index.bm25.vocab, StringTable)
+    assert [index.bm25.vocab.get(t) for t in terms] == list(range(len(terms)))
+    assert index.bm25.vocab.get("nonexistent") is None
+    tokens = tokenize("council member business entity")
+    np.testing.assert_array_equal(index.bm25.get_scores(tokens),
+                                  sparse.get_scores(tokens))
+    assert index.citations["gc_base"].get("87103").tolist() == [4, 6]
+    assert len(index.citations["reg_exact"].get("18700")) == 0
+    # Citation density: "87103(a)" counts toward the bare section
+    rows, weights = index.citations["gc_base"].get_weighted("87103")
+    assert rows.tolist() == [4, 6] and weights.tolist() == [1.0, 0.0]
+    assert index.citations["gc_exact"].get_weighted("1090")[1].tolist() == [1.0]
+    assert index.authority is None
+
+
+def test_pickles_reconverted_when_replaced(tmp_path, monkeypatch):
+    ids = [f"A-24-{i:03d}" for i in range(len(CORPUS))]
+    paths = {name: str(tmp_path / f"{name}.pkl") for name in ("bm25", "sem", "cite")}
+
+    def write_pickles(okapi):
+        for name, data in (
+            ("bm25", {"bm25": okapi, "opinion_ids": ids}),
+            ("sem", {"opinion_ids": ids,
+                     "embeddings": np.eye(len(ids), 8, dtype=np.float32)}),
+            ("cite", {"gc_exact": {"1090": [ids[0]]}, "gc_base": {},
+                      "reg_exact": {}}),
+        ):
+            with open(paths[name], "wb") as f:
+                pickle.dump(data, f)
+
+    monkeypatch.setattr(engine_module, "_BM25_INDEX", paths["bm25"])
+    monkeypatch.setattr(engine_module, "_SEM_INDEX", paths["sem"])
+    monkeypatch.setattr(engine_module, "_CITATION_INDEX", paths["cite"])
+    monkeypatch.setattr(engine_module, "_INDEX_DIR", str(tmp_path / "fusion"))
+
+    write_pickles(_okapi())
+    assert _needs_convert()
+    _convert_once()
+    assert not _needs_convert()
+    first = open_index(str(tmp_path / "fusion"))
+
+    # New pickles (e.g. downloaded over the old ones): converted again
+    write_pickles(BM25Okapi([tokenize(doc) for doc in CORPUS[::-1]]))
+    assert _needs_convert()
+    _convert_once()
+    assert not _needs_convert()
+    second = open_index(str(tmp_path / "fusion"))
+    assert second.version != first.version
+    assert second.manifest["sources"] != first.manifest["sources"]
+
+
+def test_citation_only_queries():
+    parsed = citation_only("Cal. Code Regs., tit. 2, § 18702.2")
+    assert [c["raw"] for c in parsed["regulations"]] == ["18702.2"]
+    assert citation_only("Gov. Code § 1090")["gov_code"][0]["raw"] == "1090"
+    assert citation_only("Section 87103(a) and Regulation 18702.2") is not None
+    assert citation_only("Section 87103(a) disqualification") is None
+    assert citation_only("conflict of interest") is None
+
+
+def test_build_index_matches_okapi_and_is_deterministic(tmp_path, monkeypatch):
+    paths = []
+    for i, text in enumerate(CORPUS):
+        path = tmp_path / "extracted" / "2024" / f"A-24-{i:03d}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({
+            "id": f"A-24-{i:03d}" if i != 3 else None,
+            "content": {"full_text": text},
+            "citations": {"government_code": ["87103(a)"] if "87103" in text else [],
+                          "regulations": []},
+            "embedding": {"qa_text": text},
+        }))
+        paths.append(str(path))
+    monkeypatch.setattr(build_module, "_CHUNK_FILES", 2)  # several chunks
+
+    embedder = HashEmbedder(8)
+    first = build_module.build_index(paths, str(tmp_path / "a"), embedder=embedder,
+                                     workers=1)
+    index = open_index(str(tmp_path / "a"))
+    okapi = _okapi()
+    sparse = SparseBM25.from_okapi(okapi)
+    assert index.opinion_ids[3] == "" and first["embeddings"]["embedded"] == 6
+    assert first["bm25"]["avgdl"] == okapi.avgdl
+    np.testing.assert_array_equal(index.bm25.indptr, sparse.indptr)
+    np.testing.assert_array_equal(index.bm25.doc_ids, sparse.doc_ids)
+    np.testing.assert_array_equal(index.bm25.impacts, sparse.impacts)
+    assert index.citations["gc_base"].get("87103").tolist() == [4]
+
+    # Same index from a process pool, reusing every vector
+    second = build_module.build_index(paths, str(tmp_path / "b"),
+                                      reuse_dir=str(tmp_path / "a"),
+                                      embedder=embedder, workers=2)
+    assert second["index_id"] == first["index_id"]
+    assert second["embeddings"] == {"reused": 6, "embedded": 0, "missing": 0}
+
+    # Changed embedding text: only that row is embedded again
+    record = json.loads(open(paths[0]).read())
+    record["embedding"]["qa_text"] = "a different question"
+    open(paths[0], "w").write(json.dumps(record))
+    third = build_module.build_index(paths, str(tmp_path / "c"),
+                                     reuse_dir=str(tmp_path / "b"),
+                                     embedder=embedder, workers=1)
+    assert third["embeddings"] == {"reused": 5, "embedded": 1, "missing": 0}
+
+    # A malformed file is skipped; later rows keep their own vectors
+    broken = tmp_path / "extracted" / "2024" / "A-24-002x.json"
+    broken.write_text("{not json")
+    fourth = build_module.build_index(paths[:3] + [str(broken)] + paths[3:],
+                                      str(tmp_path / "d"),
+                                      reuse_dir=str(tmp_path / "c"),
+                                      embedder=embedder, workers=1)
+    assert fourth["index_id"] == third["index_id"]
+    assert fourth["embeddings"] == {"reused": 6, "embedded": 0, "missing": 0}
+
+
+def test_add_authority_aligns_pagerank_to_index_rows(tmp_path):
+    okapi = _okapi()
+    ids = [f"A-24-{i:03d}" for i in range(len(CORPUS))]
+    path = str(tmp_path / "index")
+    writer = IndexWriter(path)
+    _write_arrays(writer, ids, SparseBM25.from_okapi(okapi),
+                  np.asarray(okapi.doc_len), np.eye(len(CORPUS), 8, dtype=np.float32),
+                  np.ones(len(CORPUS), dtype=bool),
+                  {"gc_exact": {}, "gc_base": {}, "reg_exact": {}})
+    before = writer.commit(n_docs=len(ids), n_bm25_docs=len(ids))
+
+    # Metadata in a different order, and missing A-24-006; everyone cites 000
+    def record(oid):
+        return {"opinion_number": oid, "date": None, "year": 2024, "question": None,
+                "conclusion": None, "topic_primary": None, "topic_secondary": None,
+                "government_code_sections": [], "regulations": [],
+                "prior_opinions": [] if oid == ids[0] else [ids[0]], "cited_by": [],
+                "document_type": None, "file_path": "", "local_pdf_path": None}
+    metadata = MetadataIndex.from_records({oid: record(oid) for oid in ids[5::-1]})
+    manifest = add_authority(path, metadata)
+
+    index = open_index(path)
+    assert manifest["index_id"] != before["index_id"]
+    assert manifest["n_docs"] == len(ids) and verify_index(path) == []
+    assert index.authority.dtype == np.float32
+    assert index.authority[6] == 0
+    assert index.authority.argmax() == 0
+    np.testing.assert_allclose(index.authority[1:6], index.authority[1])
+    tokens = tokenize("council member business entity")
+    np.testing.assert_array_equal(index.bm25.get_scores(tokens),
+                                  SparseBM25.from_okapi(okapi).get_scores(tokens))
+
+    prior = _authority_prior(index.authority)
+    assert prior[0] == 1.0 and (prior[1:] == 0).all()
+
+
+def test_embedding_cache_lru_and_disk_tier(tmp_path):
+    path = str(tmp_path / "emb.sqlite")
+    cache = EmbeddingCache(capacity=2, path=path)
+    vec = np.array([0.6, 0.8], dtype=np.float32)
+
+    assert cache.get("m", "Section 1090") is None
+    cache.put("m", "Section 1090", vec)
+    cache.put("m", "gifts", vec)
+    cache.put("m", "lobbying", vec)  # evicts "section 1090" from memory
+    assert cache.stats()["entries"] == 2
+    np.testing.assert_array_equal(cache.get("m", "  section   1090 "), vec)
+    assert cache.get("other-model", "gifts") is None
+    assert cache.stats() | {"hit_rate": 0} == {
+        "entries": 2, "capacity": 2, "hits": 1, "disk_hits": 1,
+        "misses": 2, "hit_rate": 0, "persistent": True,
+    }
+
+    # A fresh process sees entries written by the previous one
+    reopened = EmbeddingCache(capacity=2, path=path)
+    assert reopened.contains("m", "lobbying")
+    np.testing.assert_array_equal(reopened.get("m", "gifts"), vec)
+
+
+def test_hash_embedder_is_deterministic_and_normalized():
+    embedder = HashEmbedder(64)
+    a = embedder.embed(["Section 1090 contract", "gifts"])
+    b = embedder.embed(["Section 1090 contract"])
+    np.testing.assert_array_equal(a[0], b[0])
+    np.testing.assert_allclose(np.linalg.norm(a, axis=1), 1.0, rtol=1e-6)
+
+
+def test_http_embedder_against_stand_in_server():
+    with TestClient(create_app(dim=32)) as http:
+        embedder = OpenAIEmbedder("hash-32", "local",
+                                  base_url="http://testserver/v1",
+                                  http_client=http)
+        texts = ["council member stock", "lobbyist registration"]
+        np.testing.assert_allclose(embedder.embed(texts),
+                                   HashEmbedder(32).embed(texts), rtol=1e-6)
+
+
+def test_micro_batcher_coalesces_concurrent_queries():
+    class Recording(EmbeddingProvider):
+        model = "hash-16"
+
+        def __init__(self):
+            self.calls = []
+
+        def embed(self, texts):
+            self.calls.append(list(texts))
+            return HashEmbedder(16).embed(texts)
+
+    provider = Recording()
+    batcher = MicroBatcher(provider, window=0.2)
+    texts = ["gifts", "lobbying", "gifts", "conflict of interest"]
+    results = [None] * len(texts)
+
+    def run(i):
+        results[i] = batcher.embed_one(texts[i])
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(texts))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(provider.calls) == 1
+    assert sorted(provider.calls[0]) == sorted(set(texts))
+    for text, vec in zip(texts, results):
+        np.testing.assert_array_equal(vec, HashEmbedder(16).embed_one(text))
+
+
+def test_micro_batcher_async_callers_and_timeouts():
+    class Slow(EmbeddingProvider):
+        model = "hash-16"
+
+        def embed(self, texts):
+            time.sleep(0.1)
+            return HashEmbedder(16).embed(texts)
+
+    batcher = MicroBatcher(Slow(), window=0.01)
+
+    async def run():
+        # A caller that gives up must not break the batcher for the others
+        with_timeout = asyncio.wait_for(batcher.aembed_one("gifts"), 0.01)
+        results = await asyncio.gather(
+            with_timeout, batcher.aembed_one("lobbying"),
+            return_exceptions=True,
+        )
+        assert isinstance(results[0], asyncio.TimeoutError)
+        np.testing.assert_array_equal(results[1],
+                                      HashEmbedder(16).embed_one("lobbying"))
+        return await batcher.aembed_one("gifts")
+
+    np.testing.assert_array_equal(asyncio.run(run()),
+                                  HashEmbedder(16).embed_one("gifts"))
+
+
+def test_result_cache_canonical_keys_depth_and_version(monkeypatch):
+    key = canonical_query_key("Section 1090 and 87103(a)  Contract")
+    assert key == canonical_query_key("section 1090 AND 87103(a), contract!")
+    assert key != canonical_query_key("Section 1090 and 87103 contract")
+
+    cache = ResultCache(capacity=2, ttl=60)
+    cache.bind("v1")
+    ranking = Ranking(["a", "b", "c"], [3.0, 2.0, 1.0], 3)
+    cache.put(key, 200, ranking)
+    assert cache.get(key, 2) == Ranking(["a", "b"], [3.0, 2.0], 3)
+    # Fewer ids than the depth asked for means the ranking is exhaustive
+    assert cache.get(key, 500) == ranking
+
+    shallow = canonical_query_key("gifts")
+    cache.put(shallow, 2, Ranking(["x", "y"], [1.0, 0.5], 9))
+    assert cache.get(shallow, 20) is None
+
+    cache.bind("v2")
+    assert cache.get(key, 2) is None
+
+    cache.put(key, 20, ranking)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    assert cache.get(key, 2) is None